@@ -1,7 +1,27 @@
 import os
 import re
+import time
+import array
+import zlib
+import heapq
+import json
+import hashlib
+import tempfile
+import collections
+import contextlib
+import sqlite3
+from stat import S_ISDIR
 import yaml
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# all unity text serialized files start with a %YAML directive
+UNITY_YAML_FILE_HEADER = '%YAML'
+
 
 class UnityFile:
     def __init__(self, path, data=None, asset=None):
@@ -9,6 +29,7 @@ class UnityFile:
         self.data = data
         self.error = None
         self.asset = asset
+        self.bytes_read = 0
 
     @property
     def exists(self):
@@ -27,10 +48,23 @@ class UnityFile:
         try:
             with open(self.path, 'r') as f:
                 self.data = f.read()
-        except IOError as e:
+            self.bytes_read = len(self.data)
+        except (IOError, UnicodeDecodeError) as e:
             self.error = e
         return self
 
+    def load_unity_yaml(self):
+        """ load(), but fails (sets error) unless this is a unity text (yaml)
+        serialized file, ie. for binary serialized assets """
+        self.load()
+        if self.error is None and \
+                not self.data.startswith(UNITY_YAML_FILE_HEADER):
+            self.error = Exception(
+                "'{}' is not a unity yaml file (binary serialized?)".format(
+                    self.path))
+            self.data = None
+        return self
+
 
 class UnityYamlFile(UnityFile):
     def __init__(self, *args, **kwargs):
@@ -47,22 +81,104 @@ class UnityYamlFile(UnityFile):
         return self
 
 
+UNITY_META_HEADER_SIZE = 512
+UNITY_META_HEADER_FIELD = re.compile(
+    r'^(fileFormatVersion|guid):[ \t]*(\S+)[ \t]*$', re.MULTILINE)
+UNITY_META_GUID = re.compile(r'[0-9a-fA-F]{32}$')
+
+
 class UnityMetaFile(UnityYamlFile):
     def __init__(self, *args, **kwargs):
         super(UnityYamlFile, self).__init__(*args, **kwargs)
         self.guid = None
-
-    def load(self):
+        self.header_only = False
+
+    def load(self, full=False):
+        """ Loads this .meta file's guid (+ fileFormatVersion); reads just the
+        file header (see load_header) unless full=True, or the header scan
+        fails. Use importer_settings to get everything else. """
+        if not full:
+            self.load_header()
+            if self.error is None and self.guid is not None:
+                return self
+        self.header_only = False
         super().load()
         if self.error is None:
-            if 'guid' not in self.data:
+            if type(self.data) != dict or 'guid' not in self.data:
                 self.error = Exception("No 'guid' field in data (keys: '%s')\n\t%s" % (
-                    self.data.keys(), self.data))
+                    self.data.keys() if type(self.data) == dict else None,
+                    self.data))
                 self.guid = None
             else:
                 self.guid = self.data['guid']
         return self
 
+    def load_header(self):
+        """ Reads only the first UNITY_META_HEADER_SIZE bytes of this file,
+        and pulls out the (top-level) fileFormatVersion + guid fields.
+        Sets guid = None if they aren't there (ie. needs a full parse). """
+        self.error = None
+        self.guid = None
+        try:
+            with open(self.path, 'r') as f:
+                header = f.read(UNITY_META_HEADER_SIZE)
+        except (IOError, UnicodeDecodeError) as e:
+            self.error = e
+            return self
+        self.bytes_read = len(header)
+        if len(header) == UNITY_META_HEADER_SIZE:
+            # ignore the last (possibly truncated) line
+            header = header[:header.rfind('\n') + 1]
+        fields = dict(UNITY_META_HEADER_FIELD.findall(header))
+        if 'guid' in fields and UNITY_META_GUID.match(fields['guid']):
+            self.data = fields
+            self.guid = fields['guid']
+            self.header_only = True
+        return self
+
+    @property
+    def importer_settings(self):
+        """ Everything in this .meta file other than fileFormatVersion + guid
+        (forces a full parse if only the header has been read) """
+        if self.data is None or self.header_only:
+            self.load(full=True)
+        if self.error is not None:
+            return None
+        return {
+            k: v for k, v in self.data.items()
+            if k not in ('fileFormatVersion', 'guid')
+        }
+
+
+UNITY_YAML_DOCUMENT_HEADER = re.compile(
+    r'^---[ \t]+!u!(\d+)[ \t]+&(-?\d+)([ \t]+stripped)?[^\n]*(?:\n|$)',
+    re.MULTILINE)
+
+
+def find_unity_yaml_document_spans(content):
+    """ Locates all unity .yaml sub-documents within a unity .yaml file.
+
+    Generates a tuple (object_type, object_id, start, end, stripped) for
+    each `--- !u!<type> &<id> [stripped]` document in this file, where
+    content[start:end] is the yaml body of that document (header excluded).
+    object_type and object_id are ints; stripped is a bool.
+
+    Walks the buffer exactly once (no slicing / copying), so this is linear
+    in the size of the file. Anything before the first document header
+    (ie. the %YAML / %TAG preamble) is skipped.
+    """
+    prev_match = None
+    for match in UNITY_YAML_DOCUMENT_HEADER.finditer(content):
+        if prev_match is not None:
+            yield (int(prev_match.group(1)), int(prev_match.group(2)),
+                   prev_match.end(), match.start(),
+                   prev_match.group(3) is not None)
+        prev_match = match
+    if prev_match is not None:
+        yield (int(prev_match.group(1)), int(prev_match.group(2)),
+               prev_match.end(), len(content),
+               prev_match.group(3) is not None)
+
 
 def find_unity_yaml_objects(content):
     """ Locates all unity .yaml objects within a unity .yaml file.
@@ -74,24 +190,39 @@ def find_unity_yaml_objects(content):
     which is simpler than fully supporting unity's full tag spec +
     serialization format.
 
-    Used to implement read_unity_yaml_objects(content)
+    Implemented using find_unity_yaml_document_spans(content); each
+    document is sliced out exactly once.
     """
-    regex = re.compile(r'---\s+!u!(\d+)\s+&(\d+)[^\n]*\n')
-    prev_match = None
-    while True:
-        match = re.search(regex, content)
-        if prev_match is not None:
-            object_type, object_id = prev_match.group(1, 2)
-            if match is not None:
-                yield object_type, object_id, content[:match.start()]
-            else:
-                yield object_type, object_id, content
-                return
-        elif match is None:
-            return
-        if match is not None:
-            content = content[match.end():]
-        prev_match = match
+    for object_type, object_id, start, end, _ in \
+            find_unity_yaml_document_spans(content):
+        yield str(object_type), str(object_id), content[start:end]
+
+
+def read_unity_yaml_type_name(content, object_type, start, end):
+    """ Returns the type name of the document content[start:end], ie. the
+    `Name:` key on its first line; falls back to the type id from its
+    header (as a str) if that line isn't a key """
+    eol = content.find('\n', start, end)
+    colon = content.find(':', start, eol if eol >= 0 else end)
+    if colon < 0:
+        return str(object_type)
+    return content[start:colon].strip() or str(object_type)
+
+
+def index_unity_yaml_objects(content):
+    """ Builds a compact object index for a unity .yaml file: a tuple of
+    (object_id, object_type, type name, start, end, stripped) per
+    sub-document (see find_unity_yaml_document_spans). The type name is read
+    from the first line of each document (see read_unity_yaml_type_name);
+    nothing is parsed.
+    """
+    return tuple(
+        (object_id, object_type,
+         read_unity_yaml_type_name(content, object_type, start, end),
+         start, end, stripped)
+        for object_type, object_id, start, end, stripped
+        in find_unity_yaml_document_spans(content)
+    )
 
 
 def read_yaml(data, loader=yaml.CBaseLoader):
@@ -102,7 +233,225 @@ def read_yaml(data, loader=yaml.CBaseLoader):
         return e, data
 
 
-def read_unity_yaml_objects(content):
+class UnityYamlFastPathError(Exception):
+    """ Raised by parse_unity_yaml_document() when a document uses yaml
+    features outside of the subset handled by the fast path """
+    pass
+
+
+def _split_unity_yaml_lines(content, start, end):
+    lines = []
+    pos = start
+    while pos < end:
+        eol = content.find('\n', pos, end)
+        if eol < 0:
+            eol = end
+        line = content[pos:eol]
+        pos = eol + 1
+        # tabs are only separators in some positions (and can't indent)
+        if '\t' in line:
+            raise UnityYamlFastPathError(line)
+        line = line.rstrip()
+        text = line.lstrip(' ')
+        if not text:
+            continue
+        if text[0] == '#' or ' #' in text:
+            raise UnityYamlFastPathError(line)
+        lines.append((len(line) - len(text), text))
+    return lines
+
+
+def _is_yaml_sequence_item(text):
+    return text[0] == '-' and (len(text) == 1 or text[1] == ' ')
+
+
+def _parse_fast_yaml_scalar(text):
+    c = text[0]
+    if c == '{':
+        return _parse_fast_yaml_flow_mapping(text)
+    if c == '[':
+        if text == '[]':
+            return []
+        raise UnityYamlFastPathError(text)
+    if c == '"':
+        inner = text[1:-1]
+        if len(text) < 2 or text[-1] != '"' or '"' in inner or '\\' in inner:
+            raise UnityYamlFastPathError(text)
+        return inner
+    if c == "'":
+        inner = text[1:-1]
+        if len(text) < 2 or text[-1] != "'":
+            raise UnityYamlFastPathError(text)
+        if "'" in inner:
+            if "'" in inner.replace("''", ''):
+                raise UnityYamlFastPathError(text)
+            inner = inner.replace("''", "'")
+        return inner
+    if c in ',]}#&*!|>%@`' or \
+            (c in '-?:' and (len(text) == 1 or text[1] == ' ')) or \
+            ': ' in text or ' #' in text or text[-1] == ':':
+        raise UnityYamlFastPathError(text)
+    return text
+
+
+def _parse_fast_yaml_flow_mapping(text):
+    if text[-1] != '}':
+        raise UnityYamlFastPathError(text)
+    inner = text[1:-1]
+    mapping = {}
+    if not inner.strip():
+        return mapping
+    for c in '{}[]"\'#':
+        if c in inner:
+            raise UnityYamlFastPathError(text)
+    for item in inner.split(','):
+        # (unlike block mappings, `{a:}` is an error: ':' needs a space)
+        sep = item.find(': ')
+        if sep < 0:
+            raise UnityYamlFastPathError(text)
+        key, value = item[:sep].strip(), item[sep + 2:].strip()
+        if not key or key[0] in '-?:&*!|>%@`' or ':' in key or \
+                ':' in value or (value and (
+                    value[0] in '?&*!|>%@`' or
+                    (value[0] == '-' and value[1:2] in ('', ' ')))):
+            raise UnityYamlFastPathError(text)
+        mapping[key] = value
+    return mapping
+
+
+def _parse_fast_yaml_block(lines, i, indent):
+    if _is_yaml_sequence_item(lines[i][1]):
+        return _parse_fast_yaml_sequence(lines, i, indent)
+    return _parse_fast_yaml_mapping(lines, i, indent)
+
+
+def _parse_fast_yaml_mapping(lines, i, indent):
+    mapping = {}
+    n = len(lines)
+    while i < n:
+        line_indent, text = lines[i]
+        if line_indent < indent:
+            break
+        if line_indent > indent or _is_yaml_sequence_item(text):
+            raise UnityYamlFastPathError(text)
+        sep = text.find(': ')
+        if sep >= 0:
+            key, value = text[:sep].rstrip(), text[sep + 2:].lstrip()
+        elif text[-1] == ':':
+            key, value = text[:-1].rstrip(), ''
+        else:
+            raise UnityYamlFastPathError(text)
+        if not key or key[0] in '-?:,[]{}#&*!|>\'"%@`':
+            raise UnityYamlFastPathError(text)
+        i += 1
+        if value:
+            mapping[key] = _parse_fast_yaml_scalar(value)
+        elif i < n and (lines[i][0] > indent or (
+                lines[i][0] == indent and _is_yaml_sequence_item(lines[i][1]))):
+            # nested block, or an (unindented) sequence owned by this key
+            mapping[key], i = _parse_fast_yaml_block(lines, i, lines[i][0])
+        else:
+            mapping[key] = ''
+    return mapping, i
+
+
+def _parse_fast_yaml_sequence(lines, i, indent):
+    sequence = []
+    n = len(lines)
+    while i < n:
+        line_indent, text = lines[i]
+        if line_indent > indent:
+            raise UnityYamlFastPathError(text)
+        if line_indent < indent or not _is_yaml_sequence_item(text):
+            break
+        item = text[1:].lstrip(' ')
+        if not item:
+            i += 1
+            if i < n and lines[i][0] > indent:
+                value, i = _parse_fast_yaml_block(lines, i, lines[i][0])
+            else:
+                value = ''
+        elif _is_yaml_sequence_item(item):
+            raise UnityYamlFastPathError(text)
+        elif item[0] not in '{["\'' and (': ' in item or item[-1] == ':'):
+            # mapping that starts on the same line as its '- ' indicator
+            item_indent = indent + len(text) - len(item)
+            lines[i] = (item_indent, item)
+            value, i = _parse_fast_yaml_mapping(lines, i, item_indent)
+        else:
+            value = _parse_fast_yaml_scalar(item)
+            i += 1
+        sequence.append(value)
+    return sequence, i
+
+
+def parse_unity_yaml_document(content, start=0, end=None):
+    """ Parses one unity yaml sub-document (content[start:end]) without
+    going through pyYAML.
+
+    Handles the restricted subset of yaml that unity serializes: block
+    mappings, block sequences (including unity's unindented `- ` style),
+    plain / simple quoted scalars and single-line flow mappings like
+    `{fileID: 123, guid: abc, type: 2}`. Produces the same output as
+    yaml.CBaseLoader (all scalars are strings).
+
+    Raises UnityYamlFastPathError for anything else (multi-line scalars,
+    escapes, anchors, comments, tabs, ...), including anything that pyYAML
+    would reject; see read_unity_yaml_document()
+    """
+    if end is None:
+        end = len(content)
+    lines = _split_unity_yaml_lines(content, start, end)
+    if not lines or lines[0][0] != 0:
+        raise UnityYamlFastPathError(content[start:end])
+    data, i = _parse_fast_yaml_block(lines, 0, 0)
+    if i != len(lines):
+        raise UnityYamlFastPathError(lines[i][1])
+    return data
+
+
+def read_unity_yaml_document(content, start, end, fast=True):
+    """ Parses the sub-document content[start:end] (see
+    find_unity_yaml_document_spans); returns error, data like read_yaml()
+
+    Uses parse_unity_yaml_document() when possible (fast=True), and falls
+    back to pyYAML for documents that it can't handle.
+    """
+    if fast:
+        try:
+            return None, parse_unity_yaml_document(content, start, end)
+        except UnityYamlFastPathError:
+            pass
+    return read_yaml(content[start:end])
+
+
+def read_unity_yaml_object(content, start, end, fast=True):
+    """ Reads in / parses one object (ie. one span from
+    find_unity_yaml_document_spans) from a unity .yaml file.
+
+    Follows the non-throwing `return error, data`, where:
+        error: None (success), or an exception (parsing error / invalid format)
+        data:  a tuple (object type name, object data dict) (iff successful),
+            or the raw document text (if failed)
+    """
+    error, data = read_unity_yaml_document(content, start, end, fast=fast)
+    if error is not None:
+        return error, content[start:end]
+    if type(data) != dict:
+        return Exception("Invalid object data format! %s: %s"
+                         % (type(data), data)), content[start:end]
+    if len(data) != 1:
+        return Exception("Invalid object data (expected 1 object, got %d): %s"
+                         % (len(data), data)), content[start:end]
+    for key, value in data.items():
+        object_name, data = key, value
+    if type(data) != dict:
+        return Exception("Invalid object data format (expected nested element to be dict, got %s): %s"
+                         % (type(data), data)), content[start:end]
+    return None, (object_name, data)
+
+
+def read_unity_yaml_objects(content, fast=True):
     """ Reads in / parses all objects from a unity .yaml file (as a string).
 
     Returns a dictionary of objects with the following format:
@@ -112,33 +461,246 @@ def read_unity_yaml_objects(content):
         error: None (success), or an exception (parsing error / invalid format)
         data:  the dictionary above (iff successful)
 
-    Implemented using find_unity_yaml_objects and the pyYAML library
-    (using C backend for speed); called by load_unity_yaml_objects(<filepath>)
+    Implemented using find_unity_yaml_document_spans and
+    read_unity_yaml_object (fast path, falling back to the pyYAML C backend
+    if fast=False or for unusual documents); called by
+    load_unity_yaml_objects(<filepath>)
     """
     objects = {}
-    for object_type, object_id, content in find_unity_yaml_objects(content):
-        error, data = read_yaml(content)
+    for object_type, object_id, start, end, _ in \
+            find_unity_yaml_document_spans(content):
+        error, data = read_unity_yaml_object(content, start, end, fast=fast)
         if error is not None:
-            return error, content
-        if type(data) != dict:
-            return Exception("Invalid object data format! %s: %s"
-                             % (type(data), data)), content
-        if len(data) != 1:
-            return Exception("Invalid object data (expected 1 object, got %d): %s"
-                             % (len(data), data)), content
-        for key, value in data.items():
-            object_name, data = key, value
-        if type(data) != dict:
-            return Exception("Invalid object data format (expected nested element to be dict, got %s): %s"
-                             % (type(data), data)), content
-        objects[object_id] = {
+            return error, data
+        object_name, data = data
+        objects[str(object_id)] = {
             'type': object_name,
-            'typeid': object_type,
+            'typeid': str(object_type),
             'data': data
         }
     return None, objects
 
 
+UNITY_YAML_FILE_REF = re.compile(
+    r'\{fileID: (-?\d+)(?:, guid: ([0-9a-fA-F]+))?(?:, type: (-?\d+))?\}$')
+
+
+def _scan_yaml_ref_value(value):
+    match = UNITY_YAML_FILE_REF.match(value)
+    if match is not None:
+        ref_id, ref_guid, ref_type = match.group(1, 2, 3)
+        return int(ref_id), ref_guid, int(ref_type) if ref_type else None
+    data = _parse_fast_yaml_flow_mapping(value)
+    if 'fileID' not in data:
+        return None
+    return (int(data['fileID']), data.get('guid'),
+            int(data['type']) if 'type' in data else None)
+
+
+def _format_property_path(stack):
+    path = ''
+    for _, key, index in stack:
+        if key is None:
+            path += '[{:d}]'.format(index)
+        elif path:
+            path += '.' + key
+        else:
+            path = key
+    return path
+
+
+# lines that can affect the property path of a ref (sequence items, block
+# openers, quoted / flow values), or that contain one; plain `key: value`
+# leaf lines never do, so are skipped without leaving the regex engine
+UNITY_YAML_REF_SCAN_LINE = re.compile(
+    r'^( *)(?:- |-$|[^\n:]*:(?:$| +["\'|>\[{&*!]|[^\n]*fileID))[^\n]*$',
+    re.MULTILINE)
+
+
+def scan_unity_yaml_document_refs(content, start, end):
+    """ Extracts all {fileID, guid, type} refs from one unity yaml
+    sub-document (content[start:end]), without building its property dict.
+
+    Returns a list of tuples (property path, ref fileID, ref guid, ref type),
+    where property path matches the names from list_flat_properties(), ref
+    fileID / type are ints (type may be None), and guid is the raw hex str
+    (or None).
+
+    This is a single tokenizer-like pass that only tracks the current key /
+    sequence index path by indentation. Raises UnityYamlFastPathError for
+    documents where that isn't safe (multi-line quoted scalars / flow
+    collections, block style refs, ...); see scan_unity_yaml_refs()
+    """
+    refs = []
+    last_ref = content.rfind('fileID', start, end)
+    if last_ref < 0:
+        return refs
+    eol = content.find('\n', last_ref, end)
+    end = eol if eol >= 0 else end
+
+    stack = []
+    for match in UNITY_YAML_REF_SCAN_LINE.finditer(content, start, end):
+        col = match.end(1) - match.start(1)
+        if col == 0:
+            continue
+        text = content[match.end(1):match.end()].rstrip()
+
+        # sequence item(s): push the item's index onto the path
+        while text[0] == '-' and (len(text) == 1 or text[1] == ' '):
+            while stack and stack[-1][0] > col:
+                stack.pop()
+            index = 0
+            if stack and stack[-1][0] == col and stack[-1][1] is None:
+                index = stack.pop()[2] + 1
+            stack.append((col, None, index))
+            item = text[1:].lstrip(' ')
+            col += len(text) - len(item)
+            text = item
+            if not text:
+                break
+        if not text:
+            continue
+        if text[0] in '#\t':
+            raise UnityYamlFastPathError(text)
+
+        sep = text.find(': ')
+        if text[0] in '{["\'' or (sep < 0 and text[-1] != ':'):
+            # scalar sequence item, or continuation of a multi-line scalar
+            value = text
+        else:
+            if sep >= 0:
+                key, value = text[:sep].rstrip(), text[sep + 2:].lstrip()
+            else:
+                key, value = text[:-1].rstrip(), ''
+            if key == 'fileID':
+                raise UnityYamlFastPathError(text)
+            while stack and stack[-1][0] >= col:
+                stack.pop()
+            stack.append((col, key, 0))
+            if not value:
+                continue
+
+        c = value[0]
+        if c == '{':
+            if value[-1] != '}':
+                raise UnityYamlFastPathError(text)
+            if 'fileID' in value:
+                ref = _scan_yaml_ref_value(value)
+                if ref is not None:
+                    refs.append((_format_property_path(stack),) + ref)
+        elif c == '[':
+            if value[-1] != ']':
+                raise UnityYamlFastPathError(text)
+        elif c in '"\'':
+            _parse_fast_yaml_scalar(value)
+        elif c in '|>&*!':
+            raise UnityYamlFastPathError(text)
+    return refs
+
+
+def _find_raw_yaml_refs(data, path=''):
+    if type(data) == dict:
+        if 'fileID' in data:
+            yield (path, int(data['fileID']), data.get('guid'),
+                   int(data['type']) if 'type' in data else None)
+            return
+        for k, v in data.items():
+            for ref in _find_raw_yaml_refs(v, path + '.' + k if path else k):
+                yield ref
+    elif type(data) == list:
+        for i, v in enumerate(data):
+            for ref in _find_raw_yaml_refs(v, '{}[{:d}]'.format(path, i)):
+                yield ref
+
+
+def scan_unity_yaml_refs(content, spans=None, fast=True):
+    """ Extracts all refs from a unity .yaml file (as a string), without
+    parsing / building objects ("refs-only" mode).
+
+    Generates tuples (object fileID, property path, ref fileID, ref guid,
+    ref type); see scan_unity_yaml_document_refs(). Documents that the
+    scanner can't handle fall back to a full parse of that document only.
+
+    spans: optional {object id: (type, start, end, ...)} document index
+        (ie. UnitySceneGraphObjectTable.spans), to avoid re-splitting content
+    """
+    if spans is None:
+        spans = {
+            object_id: (object_type, start, end)
+            for object_type, object_id, start, end, _
+            in find_unity_yaml_document_spans(content)
+        }
+    for object_id, span in spans.items():
+        start, end = span[1], span[2]
+        refs = None
+        if fast:
+            try:
+                refs = scan_unity_yaml_document_refs(content, start, end)
+            except UnityYamlFastPathError:
+                pass
+        if refs is None:
+            error, data = read_unity_yaml_object(content, start, end)
+            if error is not None:
+                raise Exception("Failed to parse object {}: {}\n{}".format(
+                    object_id, error, data))
+            refs = _find_raw_yaml_refs(data[1])
+        for ref in refs:
+            yield (object_id,) + ref
+
+
+# an external ref, as unity writes it (flow mappings may wrap across lines)
+UNITY_YAML_EXTERNAL_REF = re.compile(
+    rb'\{fileID:\s*(-?\d+),\s*guid:\s*([0-9a-fA-F]{32})(?:,\s*type:\s*-?\d+)?\s*\}')
+
+
+def make_ref_rewrites(rewrites):
+    """ Normalizes a {(old guid, old fileID): (new guid, new fileID)} map
+    (guids as hex strs or ints; fileIDs as ints / strs, or None = any
+    fileID / keep the fileID) for patch_unity_refs """
+    def key(guid, file_id):
+        return canonical_guid(guid), int(file_id) if file_id is not None else None
+    return {
+        key(*old): key(*new)
+        for old, new in rewrites.items()
+    }
+
+
+def patch_unity_refs(data, rewrites):
+    """ Retargets every external ref in data (unity yaml, as bytes) that
+    matches rewrites (see make_ref_rewrites), by patching the fileID / guid
+    digits in place; everything else (formatting, ref type) is left as is.
+
+    Returns (patched data, [(byte offset, old ref text, new ref text)]),
+    with offsets into the original data.
+    """
+    parts, patches, last = [], [], 0
+    for match in UNITY_YAML_EXTERNAL_REF.finditer(data):
+        file_id, guid = int(match.group(1)), int(match.group(2), 16)
+        target = rewrites.get((guid, file_id)) or rewrites.get((guid, None))
+        if target is None:
+            continue
+        new_guid, new_file_id = target
+        start = match.start()
+        old = match.group(0)
+        id_start, id_end = match.start(1) - start, match.end(1) - start
+        guid_start, guid_end = match.start(2) - start, match.end(2) - start
+        new = b''.join((
+            old[:id_start],
+            b'%d' % (new_file_id if new_file_id is not None else file_id),
+            old[id_end:guid_start],
+            b'%032x' % new_guid,
+            old[guid_end:]))
+        if new == old:
+            continue
+        parts += (data[last:start], new)
+        last = match.end()
+        patches.append((start, old, new))
+    if not patches:
+        return data, patches
+    parts.append(data[last:])
+    return b''.join(parts), patches
+
+
 class UnitySceneDataFile(UnityFile):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -161,10 +723,28 @@ class UnityAsset:
         self.db = None
         self.loadable = loadable
 
-    def load_metafile(self):
-        self.metafile.load()
+    def load_metafile(self, full=False):
+        self.metafile.load(full=full)
         self.guid = self.metafile.guid
 
+    def apply_job_result(self, kind, error, result):
+        """ Folds the (compact) result of a parallel_job_load() job for this
+        asset into it """
+        if kind == JOB_LOAD_METAFILE:
+            self.metafile.error = error
+            if error is None:
+                guid, file_format_version = result
+                self.metafile.data = {
+                    'fileFormatVersion': file_format_version,
+                    'guid': guid
+                }
+                self.metafile.header_only = True
+                self.metafile.guid = guid
+            self.guid = self.metafile.guid
+        else:
+            raise Exception("Unhandled job kind '{}' for {}".format(
+                kind, self.path))
+
     def __repr__(self):
         return ("{asset_type} {guid} needs load? {needs_load} loaded? {loaded}" +
                 "\n  file {file_path} exists? {file_exists}" +
@@ -181,9 +761,15 @@ class UnityAsset:
                     metafile_path=self.metafile.path,
                     metafile_exists=self.metafile.exists)
 
+    # object fileIDs in this asset (see UnityAssetDB.resolve_refs)
+    object_ids = frozenset()
+
     def find_object_by_id(self, id):
         return None
 
+    def has_object(self, id):
+        return int(id) in self.object_ids
+
 
 class IgnoredAsset(UnityAsset):
     def __init__(self, path, *args, **kwargs):
@@ -195,26 +781,42 @@ class UnityDirectoryAsset(UnityAsset):
         super().__init__(UnityDirectoryAsset, path, *args, **kwargs)
 
 
+def canonical_guid(guid):
+    """ Returns guid (a hex string, or int) as an int: the canonical
+    representation of guids, used for all guid keys (ie.
+    UnityAssetDB.assets_by_guid) and by UnityFileRef """
+    return int(guid, 16) if isinstance(guid, str) else guid
+
+
+# guids of unity's builtin resources (type: 0 refs); always resolve
+UNITY_BUILTIN_GUIDS = frozenset((
+    0x0000000000000000e000000000000000,
+    0x0000000000000000f000000000000000,
+))
+
+
 class UnityFileRef:
-    def __init__(self, db, asset, guid, fileid):
-        self.db = db
+    """ A (guid, fileID) reference, held by `asset` (which provides the db
+    used to resolve it) """
+    __slots__ = ('asset', 'id', 'guid')
+
+    def __init__(self, asset, guid, fileid):
         self.asset = asset
         self.id = int(fileid)
-        self.guid = guid if self.id != 0 else None
-        if self.guid is not None and type(self.guid) != int:
-            self.guid = int(self.guid, base=16)
+        self.guid = canonical_guid(guid) if self.id != 0 else None
+
+    @property
+    def db(self):
+        return self.asset.db if self.asset is not None else None
 
     @property
     def is_missing(self):
-        if self.empty:
+        if self.empty or self.is_builtin:
             return False
         asset = self.db.find_asset_by_guid(self.guid)
         if not asset:
             return True
-        obj = asset.find_object_by_id(self.id)
-        if not obj:
-            return True
-        return False
+        return not asset.has_object(self.id)
 
     @property
     def uuid(self):
@@ -224,6 +826,10 @@ class UnityFileRef:
     def empty(self):
         return self.id == 0
 
+    @property
+    def is_builtin(self):
+        return self.guid in UNITY_BUILTIN_GUIDS
+
     def __cmp__(self, other):
         return cmp(self.uuid, other.uuid)
 
@@ -233,11 +839,14 @@ class UnityFileRef:
     def print_relative_to(self, parent_asset=None):
         if self.empty:
             return "null"
+        if self.is_builtin:
+            return "builtin {id:d} (&{guid:032x}:{id:d})".format(
+                guid=self.guid, id=self.id)
 
-        if parent_asset and self.guid == parent_asset.guid:
+        if parent_asset and self.guid == canonical_guid(parent_asset.guid):
             obj = parent_asset.find_object_by_id(self.id)
             if obj is None:
-                return "missing internal reference to object {id:d} (&{guid:x}:{id:d})".format(
+                return "missing internal reference to object {id:d} (&{guid:032x}:{id:d})".format(
                     guid=self.guid, id=self.id)
 
             return "{type} &:{id:d}".format(
@@ -245,45 +854,69 @@ class UnityFileRef:
         else:
             asset = self.db.find_asset_by_guid(self.guid)
             if asset is None:
-                return "missing reference to asset {guid:x} (&{guid:x}:{id:d})".format(
+                return "missing reference to asset {guid:032x} (&{guid:032x}:{id:d})".format(
                     guid=self.guid, id=self.id)
 
             path = os.path.relpath(asset.path, self.asset.path) \
                 if self.asset is not None else asset.path
 
             obj = asset.find_object_by_id(self.id)
-            if obj is None:
-                return "missing reference to object {id:d} in {type} {path} (&{guid:x}:{id:d})".format(
+            if obj is None and not asset.has_object(self.id):
+                return "missing reference to object {id:d} in {type} {path} (&{guid:032x}:{id:d})".format(
                     type=asset.asset_type.__name__, path=path,
                     guid=self.guid, id=self.id)
 
-            return "{type} {id:d} in {path} (&{guid:x}:{id:d})".format(
-                type=obj.type.name, asset_type=asset.asset_type, path=path,
+            # assets themselves (ie. textures, prefab assets) have no type
+            type_name = obj.type.name if hasattr(obj, 'type') else \
+                asset.asset_type.__name__
+            return "{type} {id:d} in {path} (&{guid:032x}:{id:d})".format(
+                type=type_name, asset_type=asset.asset_type, path=path,
                 guid=self.guid, id=self.id)
 
     @staticmethod
-    def parse_from(db, data, asset=None, parent_guid=None):
-        if parent_guid and type(parent_guid) != int:
-            parent_guid = int(parent_guid, base=16)
-
-        ref_id = data['fileID']
-        ref_guid = data['guid'] if 'guid' in data else None
-        if 'type' in data and int(data['type']) == 0:
-            if ref_guid not in (
-                    '0000000000000000e000000000000000',
-                    '0000000000000000f000000000000000'):
-                raise Exception(str(data))
-            ref_guid = None
-        elif 'type' in data and int(data['type']) not in (2, 3):
-            raise Exception(str(data))
+    def parse_from(data, asset=None, parent_guid=None):
+        return UnityFileRef.from_raw(
+            asset=asset, parent_guid=parent_guid,
+            ref_id=data['fileID'],
+            ref_guid=data['guid'] if 'guid' in data else None,
+            ref_type=data['type'] if 'type' in data else None)
+
+    @staticmethod
+    def from_raw(ref_id, ref_guid=None, ref_type=None,
+                 asset=None, parent_guid=None):
+        """ Builds a ref from raw {fileID, guid, type} values (as strs / ints,
+        ie. from parse_properties or scan_unity_yaml_refs) """
+        parent_guid = canonical_guid(parent_guid)
+
+        if ref_type is not None and int(ref_type) == 0:
+            if canonical_guid(ref_guid) not in UNITY_BUILTIN_GUIDS:
+                raise Exception(str((ref_id, ref_guid, ref_type)))
+        elif ref_type is not None and int(ref_type) not in (2, 3):
+            raise Exception(str((ref_id, ref_guid, ref_type)))
         return UnityFileRef(
-            db=db, asset=asset, guid=(ref_guid or parent_guid), fileid=ref_id)
+            asset=asset, guid=(ref_guid or parent_guid), fileid=ref_id)
 
 
 class UnityType:
-    def __init__(self, name, typeid):
-        self.name = name
-        self.typeid = int(typeid)
+    """ Unity object type (name + class id); instances are interned per
+    (name, typeid), so UnityType(name, typeid) always returns the same
+    object for the same type """
+    __slots__ = ('name', 'typeid')
+    _interned = {}
+
+    def __new__(cls, name, typeid):
+        typeid = int(typeid)
+        key = (name, typeid)
+        unity_type = cls._interned.get(key)
+        if unity_type is None:
+            unity_type = object.__new__(cls)
+            unity_type.name = name
+            unity_type.typeid = typeid
+            unity_type = cls._interned.setdefault(key, unity_type)
+        return unity_type
+
+    def __reduce__(self):
+        return UnityType, (self.name, self.typeid)
 
     def __cmp__(self, other):
         if type(other) != UnityType:
@@ -294,12 +927,176 @@ class UnityType:
         return '{}!{:d}'.format(self.name, self.typeid)
 
 
+UNITY_NUMERIC_SCALAR = re.compile(r'-?[0-9]+\.?[0-9]*[eE]?-?[0-9]*$')
+UNITY_NUMERIC_FIRST_CHARS = frozenset('-0123456789')
+
+
+def coerce_unity_scalar(data):
+    """ Converts a raw yaml scalar (str) to an int / float if it looks like
+    one; returns it unchanged otherwise """
+    if not data or data[0] not in UNITY_NUMERIC_FIRST_CHARS or \
+            UNITY_NUMERIC_SCALAR.match(data) is None:
+        return data
+    try:
+        if '.' in data or 'e' in data or 'E' in data:
+            return float(data)
+        return int(data)
+    except ValueError:
+        return data
+
+
+# numeric array types (see coerce_unity_scalar_list)
+UNITY_NUMERIC_ARRAY_TYPES = (array.array,) + \
+    ((numpy.ndarray,) if numpy is not None else ())
+
+
+def coerce_unity_scalar_list(data, numeric_arrays):
+    """ Batch converts a list of raw numeric scalars (strs) into an
+    array.array (numeric_arrays='array') or numpy array
+    (numeric_arrays='numpy'). Returns None if the list isn't homogeneous
+    (ie. contains anything that isn't a numeric scalar) """
+    if not data:
+        return None
+    is_float = False
+    for value in data:
+        if type(value) != str or not value or \
+                value[0] not in UNITY_NUMERIC_FIRST_CHARS or \
+                UNITY_NUMERIC_SCALAR.match(value) is None:
+            return None
+        if not is_float and ('.' in value or 'e' in value or 'E' in value):
+            is_float = True
+    try:
+        if is_float:
+            return make_unity_numeric_array(map(float, data), 'd', numeric_arrays)
+        return make_unity_numeric_array(map(int, data), 'q', numeric_arrays)
+    except (ValueError, OverflowError):
+        return None
+
+
+def make_unity_numeric_array(values, typecode, numeric_arrays):
+    """ Returns numbers (floats for typecode 'd', ints for 'q') as a numpy
+    array if numeric_arrays is 'numpy' (and numpy is installed), otherwise
+    as an array.array """
+    if numeric_arrays == 'numpy' and numpy is not None:
+        return numpy.array(
+            list(values),
+            dtype=numpy.float64 if typecode == 'd' else numpy.int64)
+    return array.array(typecode, values)
+
+
+def unity_numeric_array_typecode(values):
+    """ Returns the array.array typecode ('d' / 'q') of a numeric array """
+    if isinstance(values, array.array):
+        return values.typecode
+    return 'd' if values.dtype.kind == 'f' else 'q'
+
+
+class UnityLazyProperties(dict):
+    """ Property dict whose scalar values are kept as raw strs, and only
+    coerced (see coerce_unity_scalar) when accessed """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if type(value) == str:
+            value = coerce_unity_scalar(value)
+            if type(value) != str:
+                dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        for key in self:
+            yield self[key]
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+
+class UnityLazyPropertyList(list):
+    """ Property list whose scalar values are kept as raw strs, and only
+    coerced (see coerce_unity_scalar) when accessed """
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        value = list.__getitem__(self, index)
+        if type(index) == slice:
+            return [coerce_unity_scalar(v) if type(v) == str else v
+                    for v in value]
+        if type(value) == str:
+            value = coerce_unity_scalar(value)
+            if type(value) != str:
+                list.__setitem__(self, index, value)
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def make_unity_property_parser(lazy_scalars=False, numeric_arrays=None):
+    """ Returns a function parse_properties(data, make_ref) that converts
+    raw yaml data (as read by read_unity_yaml_object) into typed properties:
+        - {fileID: ...} dicts => make_ref(dict)
+        - numeric strs => int / float (see coerce_unity_scalar); or left
+            as raw strs until accessed, if lazy_scalars
+        - lists of numeric strs => array.array / numpy arrays, if
+            numeric_arrays is 'array' / 'numpy' (see coerce_unity_scalar_list)
+    Use get_unity_property_parser(), which shares parsers between calls.
+    """
+    def parse_properties(data, make_ref):
+        if type(data) == str:
+            if lazy_scalars:
+                return data
+            return coerce_unity_scalar(data)
+        elif type(data) == list:
+            if numeric_arrays:
+                values = coerce_unity_scalar_list(data, numeric_arrays)
+                if values is not None:
+                    return values
+            if lazy_scalars:
+                return UnityLazyPropertyList(
+                    [parse_properties(v, make_ref) for v in data])
+            return [parse_properties(v, make_ref) for v in data]
+        elif type(data) == dict:
+            if 'fileID' in data:
+                return make_ref(data)
+            elif lazy_scalars:
+                return UnityLazyProperties(
+                    (k, parse_properties(v, make_ref)) for k, v in data.items())
+            else:
+                return {k: parse_properties(v, make_ref)
+                        for k, v in data.items()}
+        else:
+            raise Exception(
+                "Unhandled type {}: {}".format(type(data), data))
+    return parse_properties
+
+
+# (lazy_scalars, numeric_arrays) => parser; see get_unity_property_parser
+UNITY_PROPERTY_PARSERS = {}
+
+
+def get_unity_property_parser(lazy_scalars=False, numeric_arrays=None):
+    """ Returns the make_unity_property_parser() parser for these options;
+    built once per set of options, and shared by all assets """
+    key = (bool(lazy_scalars), numeric_arrays or None)
+    parser = UNITY_PROPERTY_PARSERS.get(key)
+    if parser is None:
+        parser = UNITY_PROPERTY_PARSERS[key] = \
+            make_unity_property_parser(*key)
+    return parser
+
+
 def fmt_prop(name, value):
     if value is None:
         return "{name}: null".format(name=name)
     elif type(value) == UnityFileRef:
         return "{name}: {value}".format(name=name, value=value)
-    elif type(value) == str:
+    elif isinstance(value, str):
         if '\n' not in value:
             return '{name}: {type} "{value}"'.format(
                 name=name, type='str', value=value)
@@ -312,18 +1109,24 @@ def fmt_prop(name, value):
 
 
 def list_flat_properties(props):
+    """ Generates (property path, value) for all leaf properties; numeric
+    arrays (see make_unity_property_parser) are listed per element, like
+    lists """
     def dump_props(props, name_prefix):
-        if type(props) == dict:
+        if isinstance(props, dict):
             for k, v in props.items():
                 for result in dump_props(v, "{}.{}".format(name_prefix, k)):
                     yield result
-        elif type(props) == list:
+        elif isinstance(props, list):
             for i, v in enumerate(props):
                 for result in dump_props(v, "{}[{:d}]".format(name_prefix, i)):
                     yield result
+        elif isinstance(props, UNITY_NUMERIC_ARRAY_TYPES):
+            for i, v in enumerate(props.tolist()):
+                yield "{}[{:d}]".format(name_prefix, i), v
         else:
             yield name_prefix, props
-    if type(props) != dict:
+    if not isinstance(props, dict):
         raise Exception(
             "properties must be a dictionary, got {}!".format(type(props)))
     for k, v in props.items():
@@ -332,48 +1135,310 @@ def list_flat_properties(props):
 
 
 class UnityPropertyReference:
-    def __init__(self, obj, name, ref):
-        self.object = obj
+    """ A reference (ref) stored in property `name` of object `object_id`
+    in `asset`; the referencing object itself is only looked up (and parsed,
+    if the asset is lazy) on demand """
+    __slots__ = ('asset', 'object_id', 'name', 'ref', '_object')
+
+    def __init__(self, asset, object_id, name, ref, obj=None):
+        self.asset = asset
+        self.object_id = object_id
         self.name = name
         self.ref = ref
+        self._object = obj
+
+    @property
+    def object(self):
+        if self._object is None:
+            self._object = self.asset.find_object_by_id(self.object_id)
+        return self._object
+
+    @property
+    def object_type(self):
+        if self._object is not None:
+            return self._object.type
+        return self.asset.get_object_type(self.object_id)
 
     @property
     def is_missing(self):
         return self.ref.is_missing
 
     def __repr__(self):
-        return "{status} {object} &{guid:x}:{id:d} {name}: {ref}\n in {path}".format(
+        return "{status} {object} &{guid}:{id:d} {name}: {ref}\n in {path}".format(
             status="Missing reference" if self.is_missing else "ref",
-            object=self.object.type,
-            guid=self.object.ref.guid,
-            id=self.object.ref.id,
+            object=self.object_type,
+            guid=self.asset.guid,
+            id=self.object_id,
             name=self.name,
             ref=self.ref,
             path=os.path.relpath(
-                self.object.asset.path, self.object.asset.db.root_dir)
+                self.asset.path, self.asset.db.root_dir)
         )
 
 
+class UnityPropertyTable:
+    """ Columnar flat-property table for the (parsed) objects of one asset.
+
+    Holds one row per leaf property (see list_flat_properties) across all
+    objects, as parallel columns:
+        path_column:   interned property path ids (index into paths)
+        object_column: owning object fileIDs
+        values:        leaf values
+    Each object's rows are contiguous (object_rows: object id => (start, end)).
+    Empty dicts / lists get a row too (with the empty container as value),
+    so that build_properties() can rebuild objects' nested properties
+    exactly; rows() skips them. Numeric arrays (see
+    make_unity_property_parser) are stored as one row, but rows() lists
+    them per element (ie. m_Arr[0], m_Arr[1]), like lists; select() finds
+    them by the array's path (m_Arr).
+
+    Property paths are interned per (parent path id, key / index), so each
+    distinct path is only formatted once per asset, not once per leaf.
+    The table is the only copy of parsed properties: objects read their
+    rows, and only build nested dicts on demand (see build_properties).
+
+    select() looks rows up by path in path_rows (path id => row indices),
+    which is built on first use, and extended as rows are added.
+
+    to_columns() / from_columns() convert to / from plain columns (no refs
+    or other objects), for shipping tables between processes; everything
+    else (paths, path_index, object_column, ...) is rebuilt from those.
+    """
+
+    def __init__(self, lazy_scalars=False):
+        self.paths = []
+        self.path_ids = {}
+        self.path_index = {}
+        self.path_parents = array.array('l')
+        self.path_keys = []
+        self.path_column = array.array('l')
+        self.object_column = array.array('q')
+        self.values = []
+        self.object_rows = {}
+        self.path_rows = {}
+        self.indexed_rows = 0
+        self.lazy_scalars = lazy_scalars
+
+    def __len__(self):
+        return len(self.values)
+
+    def _path_id(self, parent, key):
+        path_id = self.path_ids.get((parent, key))
+        if path_id is None:
+            if parent < 0:
+                path = key
+            elif type(key) == int:
+                path = '{}[{:d}]'.format(self.paths[parent], key)
+            else:
+                path = '{}.{}'.format(self.paths[parent], key)
+            path_id = len(self.paths)
+            self.paths.append(path)
+            self.path_parents.append(parent)
+            self.path_keys.append(key)
+            self.path_ids[(parent, key)] = path_id
+            self.path_index[path] = path_id
+        return path_id
+
+    def _append_rows(self, object_id, parent, props):
+        # note: uses dict / list base methods, so lazy scalars stay raw
+        if isinstance(props, dict):
+            items = dict.items(props)
+        else:
+            items = enumerate(list.__iter__(props))
+        for key, value in items:
+            path_id = self._path_id(parent, key)
+            if isinstance(value, (dict, list)) and value:
+                self._append_rows(object_id, path_id, value)
+            else:
+                self.path_column.append(path_id)
+                self.object_column.append(object_id)
+                self.values.append(value)
+
+    def append_object(self, object_id, properties):
+        """ Adds rows for all of an object's properties; returns the
+        object's (start, end) row range """
+        if not isinstance(properties, dict):
+            raise Exception(
+                "properties must be a dictionary, got {}!".format(type(properties)))
+        start = len(self.values)
+        self._append_rows(object_id, -1, properties)
+        self.object_rows[object_id] = (start, len(self.values))
+        return start, len(self.values)
+
+    def to_columns(self):
+        """ Returns this table as plain data (lists of strs / numbers), for
+        from_columns():
+            path parents, path keys: the interned paths, in order
+            path column
+            object rows: [(object id, start, end)], in row order
+            values: with refs and numeric arrays replaced by None
+            refs: [(row, ref fileID, ref guid as hex, or None)]
+            numeric arrays: [(row, typecode ('d' / 'q'), [numbers])]
+        """
+        values, refs, arrays = list(self.values), [], []
+        for i, value in enumerate(values):
+            if type(value) == UnityFileRef:
+                refs.append((i, value.id, '{:032x}'.format(value.guid)
+                             if value.guid is not None else None))
+                values[i] = None
+            elif isinstance(value, UNITY_NUMERIC_ARRAY_TYPES):
+                arrays.append((
+                    i, unity_numeric_array_typecode(value), value.tolist()))
+                values[i] = None
+        object_rows = sorted(
+            ((object_id, start, end)
+             for object_id, (start, end) in self.object_rows.items()),
+            key=lambda row: row[1])
+        return (self.path_parents.tolist(), list(self.path_keys),
+                self.path_column.tolist(), object_rows, values, refs, arrays)
+
+    @classmethod
+    def from_columns(cls, columns, make_ref, lazy_scalars=False,
+                     numeric_arrays=None):
+        """ Rebuilds a table from to_columns(); make_ref(ref fileID, ref guid
+        as hex or None) makes the refs, and numeric_arrays picks the numeric
+        array type (see make_unity_numeric_array) """
+        path_parents, path_keys, path_column, object_rows, values, refs, \
+            arrays = columns
+        table = cls(lazy_scalars=lazy_scalars)
+        for parent, key in zip(path_parents, path_keys):
+            table._path_id(parent, key)
+        table.path_column = array.array('l', path_column)
+        values = list(values)
+        for row, ref_id, ref_guid in refs:
+            values[row] = make_ref(ref_id, ref_guid)
+        for row, typecode, elements in arrays:
+            values[row] = make_unity_numeric_array(
+                elements, typecode, numeric_arrays)
+        table.values = values
+        object_column = table.object_column
+        for object_id, start, end in object_rows:
+            table.object_rows[object_id] = (start, end)
+            object_column.extend(array.array('q', (object_id,)) * (end - start))
+        return table
+
+    def rows(self, start=0, end=None):
+        """ Generates (property path, value) for the leaf rows in
+        [start, end) """
+        paths, path_column, values = self.paths, self.path_column, self.values
+        lazy_scalars = self.lazy_scalars
+        for i in range(start, len(values) if end is None else end):
+            value = values[i]
+            if lazy_scalars and type(value) == str:
+                value = coerce_unity_scalar(value)
+            elif isinstance(value, (dict, list)):
+                continue
+            elif isinstance(value, UNITY_NUMERIC_ARRAY_TYPES):
+                path = paths[path_column[i]]
+                for j, element in enumerate(value.tolist()):
+                    yield '{}[{:d}]'.format(path, j), element
+                continue
+            yield paths[path_column[i]], value
+
+    def build_properties(self, start, end):
+        """ Rebuilds the nested properties dict (as from parse_properties)
+        of the object with rows [start, end) """
+        lazy_scalars = self.lazy_scalars
+        make_dict = UnityLazyProperties if lazy_scalars else dict
+        make_list = UnityLazyPropertyList if lazy_scalars else list
+        path_parents, path_keys = self.path_parents, self.path_keys
+        properties = make_dict()
+        containers = {-1: properties}
+
+        def get_container(path_id, child_key):
+            container = containers.get(path_id)
+            if container is None:
+                container = make_list() if type(child_key) == int \
+                    else make_dict()
+                add(path_id, container)
+                containers[path_id] = container
+            return container
+
+        def add(path_id, value):
+            key = path_keys[path_id]
+            parent = get_container(path_parents[path_id], key)
+            if type(key) == int:
+                list.append(parent, value)
+            else:
+                dict.__setitem__(parent, key, value)
+
+        path_column, values = self.path_column, self.values
+        for i in range(start, end):
+            value = values[i]
+            if isinstance(value, dict):
+                value = make_dict()
+            elif isinstance(value, list):
+                value = make_list()
+            add(path_column[i], value)
+        return properties
+
+    def refs(self, start=0, end=None):
+        """ Generates (property path, ref) for all UnityFileRefs in rows
+        [start, end) """
+        paths, path_column, values = self.paths, self.path_column, self.values
+        for i in range(start, len(values) if end is None else end):
+            if type(values[i]) == UnityFileRef:
+                yield paths[path_column[i]], values[i]
+
+    def index_rows(self):
+        """ Adds rows added since the last call to path_rows """
+        path_rows, path_column = self.path_rows, self.path_column
+        for i in range(self.indexed_rows, len(path_column)):
+            rows = path_rows.get(path_column[i])
+            if rows is None:
+                rows = path_rows[path_column[i]] = array.array('l')
+            rows.append(i)
+        self.indexed_rows = len(path_column)
+
+    def select(self, path):
+        """ Generates (object id, value) for every row with property `path` """
+        path_id = self.path_index.get(path)
+        if path_id is None:
+            return
+        if self.indexed_rows != len(self.path_column):
+            self.index_rows()
+        object_column, values = self.object_column, self.values
+        lazy_scalars = self.lazy_scalars
+        for i in self.path_rows.get(path_id, ()):
+            value = values[i]
+            if lazy_scalars and type(value) == str:
+                value = coerce_unity_scalar(value)
+            yield object_column[i], value
+
+
 class UnitySceneGraphObject:
-    def __init__(self, asset, ref, object_type, properties):
+    """ A parsed object; its properties live in rows [start, end) of its
+    asset's UnityPropertyTable (rows = (table, start, end)) """
+    __slots__ = ('asset', 'ref', 'type', 'rows')
+
+    def __init__(self, asset, ref, object_type, rows):
         self.asset = asset
         self.ref = ref
         self.type = object_type
-        self.properties = properties
-        self._flat_properties = None
+        self.rows = rows
+
+    @property
+    def properties(self):
+        """ Nested properties dict; rebuilt from the table on each access """
+        table, start, end = self.rows
+        return table.build_properties(start, end)
+
+    def iter_flat_properties(self):
+        """ Generates (property path, value) for all leaf properties """
+        table, start, end = self.rows
+        return table.rows(start, end)
 
     def get_references(self):
+        table, start, end = self.rows
+        refs = table.refs(start, end)
         return [
-            UnityPropertyReference(self, name, ref)
-            for name, ref in self.flat_properties.items()
-            if type(ref) == UnityFileRef
+            UnityPropertyReference(self.asset, self.ref.id, name, ref, obj=self)
+            for name, ref in refs
         ]
 
     @property
     def flat_properties(self):
-        if self._flat_properties is None:
-            self._flat_properties = dict(list_flat_properties(self.properties))
-        return self._flat_properties
+        return dict(self.iter_flat_properties())
 
     def __repr__(self):
         return "{type} {id} {path}\n{properties}".format(
@@ -382,29 +1447,255 @@ class UnitySceneGraphObject:
             path=self.asset.path if self.asset else '',
             properties='\n'.join([
                 '  %s' % fmt_prop(name, value)
-                for name, value in self.flat_properties.items()
+                for name, value in self.iter_flat_properties()
             ])
         )
 
 
+class UnitySceneGraphObjectTable:
+    """ Object table (fileID => UnitySceneGraphObject) for a scene / prefab.
+
+    Built from an offset index of the documents in a unity .yaml file
+    (see find_unity_yaml_document_spans); each object is only parsed (and
+    wrapped) the first time it's accessed via [], get(), values() or items(),
+    at which point its properties are added to the asset-wide
+    UnityPropertyTable (properties).
+    Membership tests / len() / iterating over ids never parse anything.
+
+    Parsed objects (+ content) count against the db's memory budget (see
+    UnityAssetResidency), and may be evicted (see evict()), after which
+    they're transparently reparsed on access.
+    """
+
+    def __init__(self, asset, content=None, index=None):
+        self.asset = asset
+        self.content = content
+        self.set_index(
+            index if index is not None else index_unity_yaml_objects(content))
+        self.reset()
+        self.update_residency()
+
+    def reset(self):
+        self.parsed = {}
+        self.parsed_bytes = 0
+        self.properties = UnityPropertyTable(
+            lazy_scalars=self.asset.db is not None and self.asset.db.lazy_scalars)
+
+    def evict(self):
+        """ Drops all parsed objects, properties and content; keeps the
+        index (object ids + types) """
+        self.reset()
+        self.content = None
+
+    @property
+    def resident_size(self):
+        """ Estimated memory used by parsed objects + content, in bytes """
+        return self.parsed_bytes * UNITY_PARSED_BYTES_PER_YAML_BYTE + \
+            (len(self.content) if self.content is not None else 0)
+
+    def update_residency(self):
+        db = self.asset.db
+        if db is not None:
+            db.residency.update(self.asset, self.resident_size)
+
+    def set_index(self, index):
+        """ Sets the document index (see index_unity_yaml_objects) """
+        self.index = index
+        self.spans = {
+            object_id: (object_type, start, end, stripped)
+            for object_id, object_type, _, start, end, stripped in index
+        }
+        self.types = {
+            object_id: UnityType(name=type_name, typeid=object_type)
+            for object_id, object_type, type_name, _, _, _ in index
+        }
+        self.prefab_instance_ids = frozenset(
+            object_id for object_id, object_type, _, _, _, _ in index
+            if object_type == UNITY_PREFAB_INSTANCE_TYPE)
+
+    def load_content(self):
+        """ (Re)reads the asset's file, if this table was built from an index
+        alone (ie. loaded by a worker process) or has been fully parsed """
+        if self.content is None:
+            self.content = \
+                UnityFile(self.asset.path).load_unity_yaml().data or ''
+            self.set_index(index_unity_yaml_objects(self.content))
+            self.update_residency()
+        return self.content
+
+    @property
+    def is_fully_parsed(self):
+        return len(self.parsed) == len(self.spans)
+
+    def parse_all(self):
+        for object_id in self.spans:
+            self[object_id]
+        return self
+
+    def __contains__(self, object_id):
+        return object_id in self.spans
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def keys(self):
+        return self.spans.keys()
+
+    def values(self):
+        for object_id in self.spans:
+            yield self[object_id]
+
+    def items(self):
+        for object_id in self.spans:
+            yield object_id, self[object_id]
+
+    def get(self, object_id, default=None):
+        if object_id not in self.spans:
+            return default
+        return self[object_id]
+
+    def __getitem__(self, object_id):
+        obj = self.parsed.get(object_id)
+        db = self.asset.db
+        if obj is not None:
+            if db is not None:
+                db.residency.hit(self.asset)
+            return obj
+        if db is not None:
+            db.residency.miss(self.asset)
+        content = self.load_content()
+        object_type, start, end, _ = self.spans[object_id]
+        error, data = read_unity_yaml_object(content, start, end)
+        if error is not None:
+            raise Exception("Failed to parse object {} in '{}': {}\n{}".format(
+                object_id, self.asset.path, error, data))
+        object_name, data = data
+        start, end = self.properties.append_object(
+            object_id, self.asset.parse_properties(data))
+        obj = self.asset.make_object(
+            object_id, object_name, object_type, (self.properties, start, end))
+        self.parsed[object_id] = obj
+        self.parsed_bytes += self.spans[object_id][2] - self.spans[object_id][1]
+        if self.is_fully_parsed:
+            self.content = None
+        self.update_residency()
+        return obj
+
+    def set_properties(self, columns):
+        """ Adopts the property table of a worker that parsed all objects
+        (see parse_unity_yaml_objects), as UnityPropertyTable.to_columns(),
+        and adds those objects """
+        asset, db = self.asset, self.asset.db
+        guid = canonical_guid(asset.guid)
+
+        def make_ref(ref_id, ref_guid):
+            return UnityFileRef(
+                asset=asset, guid=ref_guid or guid, fileid=ref_id)
+
+        properties = UnityPropertyTable.from_columns(
+            columns, make_ref,
+            lazy_scalars=db is not None and db.lazy_scalars,
+            numeric_arrays=db.numeric_arrays if db is not None else None)
+        self.properties = properties
+        self.parsed = {}
+        self.parsed_bytes = 0
+        for object_id, (start, end) in properties.object_rows.items():
+            object_type, span_start, span_end, _ = self.spans[object_id]
+            self.parsed[object_id] = asset.make_object(
+                object_id, self.types[object_id].name, object_type,
+                (properties, start, end))
+            self.parsed_bytes += span_end - span_start
+        if self.is_fully_parsed:
+            self.content = None
+        self.update_residency()
+
+
 class UnityAssetSceneGraph(UnityAsset):
-    def __init__(self, asset_type, path, *args, **kwargs):
+    def __init__(self, asset_type, path, lazy=None, *args, **kwargs):
         self.objects = None
+        self.ref_table = None
+        self._lazy = lazy
         super().__init__(
             asset_type, path, loadable=True, *args, **kwargs)
 
+    @property
+    def lazy(self):
+        """ parse objects on first access? (defaults to db.lazy) """
+        if self._lazy is not None:
+            return self._lazy
+        return self.db is not None and self.db.lazy
+
     def find_object_by_id(self, object_id):
         if self.objects is None:
             self.load()
             self.db.update_asset(self)
-        if str(object_id) in self.objects:
-            return self.objects[str(object_id)]
-        if int(object_id) in self.objects:
-            return self.objects[int(object_id)]
-        return None
+        obj = self.objects.get(int(object_id))
+        if obj is None and self.db is not None and \
+                self.objects.prefab_instance_ids:
+            # an object from a nested prefab instance
+            return self.db.resolve_object(self, object_id)
+        return obj
+
+    def has_object(self, object_id):
+        return int(object_id) in self.object_ids
 
-    def get_all_refs(self):
-        if not self.objects:
+    @property
+    def object_ids(self):
+        """ Ids of all objects in this asset, including the ones nested
+        prefab instances add (see UnityPrefabExpansion) """
+        if self.objects is None:
+            self.load()
+            self.db.update_asset(self)
+        if self.db is not None and (
+                self.objects.prefab_instance_ids or
+                self.asset_type == UnityAssetPrefab):
+            return self.db.get_prefab_expansion(self)
+        return self.objects
+
+    @property
+    def refs_only(self):
+        """ get refs by scanning raw text? (defaults to db.refs_only) """
+        return self.db is not None and self.db.refs_only
+
+    def get_object_type(self, object_id):
+        if self.objects is None:
+            self.load()
+            self.db.update_asset(self)
+        return self.objects.types.get(int(object_id))
+
+    def get_ref_table(self):
+        """ Returns a list of (object fileID, property path, ref fileID,
+        ref guid, ref type) for all refs in this asset, scanned from its raw
+        text (see scan_unity_yaml_refs); never parses objects """
+        if self.ref_table is None:
+            if self.objects is None:
+                self.load(lazy=True)
+                self.db.update_asset(self)
+            content = self.objects.load_content()
+            self.ref_table = list(
+                scan_unity_yaml_refs(content, self.objects.spans))
+        return self.ref_table
+
+    def get_all_refs(self, refs_only=None):
+        """ Returns UnityPropertyReferences for all refs in this asset; from
+        the ref table (see get_ref_table) if refs_only, or if one has already
+        been loaded (ie. by load_all), otherwise from the parsed objects """
+        if refs_only is None:
+            refs_only = self.refs_only or self.ref_table is not None
+        if refs_only:
+            guid = self.guid
+            return [
+                UnityPropertyReference(
+                    self, object_id, name, UnityFileRef.from_raw(
+                        asset=self, parent_guid=guid, ref_id=ref_id,
+                        ref_guid=ref_guid, ref_type=ref_type))
+                for object_id, name, ref_id, ref_guid, ref_type
+                in self.get_ref_table()
+            ]
+        if self.objects is None:
             self.load()
             self.db.update_asset(self)
         refs = []
@@ -422,42 +1713,59 @@ class UnityAssetSceneGraph(UnityAsset):
     def is_loaded(self):
         return self.objects is not None
 
-    def load(self):
-        self.file.__class__ = UnitySceneDataFile
-        self.file.load()
-        db, guid = self.db, self.guid
-
-        def parse_properties(data):
-            if type(data) == str:
-                if re.match(r'\-?[0-9]+\.?[0-9]*[eE]?-?[0-9]*$', data):
-                    if '.' in data:
-                        return float(data)
-                    else:
-                        return int(data)
-                else:
-                    return data
-            elif type(data) == list:
-                return list(map(parse_properties, data))
-            elif type(data) == dict:
-                if 'fileID' in data:
-                    return UnityFileRef.parse_from(
-                        db=db, asset=self, data=data, parent_guid=guid)
-                else:
-                    return {k: parse_properties(v) for k, v in data.items()}
-            else:
-                raise Exception(
-                    "Unhandled type {}: {}".format(type(data), data))
-
-        objects = [
-            UnitySceneGraphObject(
-                asset=self,
-                ref=UnityFileRef(db=db, asset=self, guid=guid, fileid=ref_id),
-                object_type=UnityType(name=obj['type'], typeid=obj['typeid']),
-                properties=parse_properties(obj['data'])
-            )
-            for ref_id, obj in self.file.data.items()
-        ]
-        self.objects = {obj.ref.id: obj for obj in objects}
+    def load(self, lazy=None):
+        """ Loads this asset's object table; if lazy, only indexes objects
+        (by document offset), and defers parsing to first access """
+        self.file.load_unity_yaml()
+        content = self.file.data if self.file.error is None else ''
+        self.file.data = None
+        lazy = self.lazy if lazy is None else lazy
+        cache = self.db.parse_cache if self.db is not None else None
+        if not lazy or (cache is not None and self.file.error is None):
+            # parse_all() drops content, so scan refs while it's in hand
+            # (instead of rereading the file in get_ref_table())
+            index, ref_table = index_unity_yaml_tables(
+                content, cache if self.file.error is None else None)
+            self.objects = UnitySceneGraphObjectTable(self, content, index)
+            self.ref_table = list(ref_table)
+        else:
+            self.objects = UnitySceneGraphObjectTable(self, content)
+            self.ref_table = None
+        if not lazy:
+            self.objects.parse_all()
+
+    def apply_job_result(self, kind, error, result):
+        if kind not in (JOB_LOAD_YAML_OBJECTS, JOB_PARSE_YAML_OBJECTS):
+            return super().apply_job_result(kind, error, result)
+        self.file.error = error
+        if error is not None:
+            result = ((), ())
+        object_index, ref_table = result[:2]
+        self.objects = UnitySceneGraphObjectTable(self, index=object_index)
+        self.ref_table = list(ref_table)
+        if kind == JOB_PARSE_YAML_OBJECTS and error is None:
+            self.objects.set_properties(result[2])
+        elif not self.lazy:
+            self.objects.parse_all()
+
+    def make_ref(self, data):
+        return UnityFileRef.parse_from(
+            asset=self, data=data, parent_guid=self.guid)
+
+    def parse_properties(self, data):
+        db = self.db
+        return get_unity_property_parser(
+            lazy_scalars=db is not None and db.lazy_scalars,
+            numeric_arrays=db.numeric_arrays if db is not None else None
+        )(data, self.make_ref)
+
+    def make_object(self, object_id, object_name, object_type, rows):
+        return UnitySceneGraphObject(
+            asset=self,
+            ref=UnityFileRef(asset=self, guid=self.guid, fileid=object_id),
+            object_type=UnityType(name=object_name, typeid=object_type),
+            rows=rows
+        )
 
     def __repr__(self):
         if self.objects:
@@ -488,7 +1796,21 @@ class UnityAssetMaterial(UnityAssetSceneGraph):
             UnityAssetMaterial, path, *args, **kwargs)
 
 
+class UnityAssetYaml(UnityAssetSceneGraph):
+    """ Any other unity yaml asset: ScriptableObjects (.asset), animator
+    controllers, animation clips, timelines, etc. Some of these (ie. .asset)
+    may be binary serialized instead, in which case they load with a file
+    error (see UnityAssetDB.find_unanalyzed_assets) """
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(
+            UnityAssetYaml, path, *args, **kwargs)
+
+
 class UnityAssetCSharpScript(UnityAsset):
+    # MonoScript
+    object_ids = frozenset((11500000,))
+
     def __init__(self, path, *args, **kwargs):
         super().__init__(UnityAssetCSharpScript, path, *args, **kwargs)
 
@@ -497,12 +1819,232 @@ class UnityAssetTexture(UnityAsset):
     def __init__(self, path, *args, **kwargs):
         super().__init__(UnityAssetTexture, path, *args, **kwargs)
 
+    object_ids = frozenset((2800000,))
+
     def find_object_by_id(self, id):
-        if int(id) == 2800000:
+        if self.has_object(id):
             return self
         return None
 
 
+UNITY_PREFAB_INSTANCE_TYPE = 1001
+
+# fileID of a prefab asset itself (ie. PrefabInstance.m_SourcePrefab)
+UNITY_PREFAB_ASSET_OBJECT_ID = 100100000
+
+UNITY_PREFAB_SOURCE_PROPERTIES = ('m_SourcePrefab', 'm_ParentPrefab')
+UNITY_STRIPPED_SOURCE_PROPERTIES = (
+    'm_CorrespondingSourceObject', 'm_PrefabParentObject')
+UNITY_STRIPPED_INSTANCE_PROPERTIES = ('m_PrefabInstance', 'm_PrefabInternal')
+UNITY_PREFAB_MODIFICATION = re.compile(
+    r'^m_Modification\.m_Modifications\[(\d+)\]\.(\w+)$')
+
+
+def nested_prefab_file_id(instance_id, source_id):
+    """ Returns the fileID that object source_id (in a source prefab) gets
+    in an asset that instances that prefab as object instance_id """
+    return (instance_id ^ source_id) & 0x7FFFFFFFFFFFFFFF
+
+
+class UnityResolvedObject:
+    """ An object as it appears in `asset`: source is the (parsed) object it
+    comes from (in `asset`, or in a source prefab), and modifications are
+    the [(property path, value)] overrides applied on top of that, from the
+    innermost prefab instance outwards (later ones win) """
+    __slots__ = ('asset', 'id', 'source', 'modifications')
+
+    def __init__(self, asset, object_id, source, modifications=()):
+        self.asset = asset
+        self.id = object_id
+        self.source = source
+        self.modifications = tuple(modifications)
+
+    @property
+    def type(self):
+        return self.source.type
+
+    def iter_flat_properties(self):
+        """ Generates (property path, value) for all leaf properties of the
+        source object, with modifications applied """
+        overrides = dict(self.modifications)
+        for name, value in self.source.iter_flat_properties():
+            yield name, overrides.pop(name, value)
+        yield from overrides.items()
+
+    def get(self, name, default=None):
+        for path, value in reversed(self.modifications):
+            if path == name:
+                return value
+        for path, value in self.source.iter_flat_properties():
+            if path == name:
+                return value
+        return default
+
+    def __repr__(self):
+        return "{} {} (from {} {}, {} modification(s))".format(
+            self.type.name, self.id, self.source.asset.path,
+            self.source.ref.id, len(self.modifications))
+
+
+class UnityPrefabExpansion:
+    """ The prefab instances in a scene graph asset, expanded against their
+    source prefabs (see UnityAssetDB.get_prefab_expansion, which memoizes
+    these per asset, so each source prefab is only expanded once no matter
+    how often it's instanced).
+
+    Built from ref tables alone: each PrefabInstance (!u!1001) object
+    contributes the (expanded) objects of its m_SourcePrefab, minus
+    m_RemovedComponents, as virtual objects with ids
+    nested_prefab_file_id(instance id, source id). Prefabs also contain
+    their own UNITY_PREFAB_ASSET_OBJECT_ID. Use `in` to check ids.
+
+    resolve_object() maps stripped and virtual objects to the objects they
+    come from, with the instances' m_Modifications applied (parsed, and
+    memoized, on demand).
+
+    source_guids: guids of all (transitively) instanced prefabs; the
+    expansion is dropped whenever any of them changes.
+    """
+
+    def __init__(self, db, asset):
+        self.db = db
+        self.asset = asset
+        self.is_prefab = asset.asset_type == UnityAssetPrefab
+        self.instances = {}     # {instance id: source prefab guid}
+        self.virtual_ids = {}   # {object id: instance id}
+        self.source_guids = set()
+        self.modifications = {}
+        self.resolved = {}
+        self.instanced_ids = None
+
+        objects = asset.objects
+        parent_guid = canonical_guid(asset.guid)
+        removed = {}
+        for object_id, name, ref_id, ref_guid, _ \
+                in asset.get_ref_table() if objects.prefab_instance_ids else ():
+            if object_id not in objects.prefab_instance_ids or ref_id == 0:
+                continue
+            if name in UNITY_PREFAB_SOURCE_PROPERTIES:
+                self.instances[object_id] = canonical_guid(ref_guid) \
+                    if ref_guid is not None else parent_guid
+            elif name.startswith('m_Modification.m_RemovedComponents['):
+                removed.setdefault(object_id, set()).add(ref_id)
+
+        for instance_id, guid in self.instances.items():
+            self.source_guids.add(guid)
+            source = db.find_asset_by_guid(guid)
+            if not isinstance(source, UnityAssetSceneGraph):
+                continue
+            expansion = db.get_prefab_expansion(source)
+            if expansion is None:
+                continue  # nested prefab cycle
+            self.source_guids |= expansion.source_guids
+            source_ids = expansion.get_instanced_ids()
+            if instance_id in removed:
+                source_ids = [
+                    source_id for source_id in source_ids
+                    if source_id not in removed[instance_id]]
+            self.virtual_ids.update(dict.fromkeys([
+                nested_prefab_file_id(instance_id, source_id)
+                for source_id in source_ids
+            ], instance_id))
+
+    def __contains__(self, object_id):
+        return object_id in self.asset.objects or \
+            object_id in self.virtual_ids or \
+            (self.is_prefab and object_id == UNITY_PREFAB_ASSET_OBJECT_ID)
+
+    def iter_ids(self):
+        yield from self.asset.objects.keys()
+        yield from self.virtual_ids.keys()
+        if self.is_prefab:
+            yield UNITY_PREFAB_ASSET_OBJECT_ID
+
+    def get_instanced_ids(self):
+        """ Returns the ids an instance of this asset adds (ie. all but
+        UNITY_PREFAB_ASSET_OBJECT_ID); computed once """
+        if self.instanced_ids is None:
+            self.instanced_ids = list(self.asset.objects.keys())
+            self.instanced_ids += self.virtual_ids.keys()
+        return self.instanced_ids
+
+    def get_modifications(self, instance_id):
+        """ Returns {source object id: [(property path, value)]} for the
+        m_Modifications of PrefabInstance instance_id. Property paths are
+        converted to flat property paths (ie. 'a.Array.data[0]' => 'a[0]'),
+        and values to refs where objectReference is set. """
+        if instance_id in self.modifications:
+            return self.modifications[instance_id]
+        entries = {}
+        for name, value in self.asset.objects[instance_id].iter_flat_properties():
+            match = UNITY_PREFAB_MODIFICATION.match(name)
+            if match:
+                entries.setdefault(int(match.group(1)), {})[match.group(2)] = value
+        modifications = {}
+        for i in sorted(entries):
+            entry = entries[i]
+            target, path = entry.get('target'), entry.get('propertyPath')
+            if type(target) != UnityFileRef or target.empty or path is None:
+                continue
+            value = entry.get('objectReference')
+            if type(value) != UnityFileRef or value.empty:
+                value = entry.get('value')
+            modifications.setdefault(target.id, []).append(
+                (str(path).replace('.Array.data[', '['), value))
+        self.modifications[instance_id] = modifications
+        return modifications
+
+    def resolve_object(self, object_id):
+        """ Returns object_id as a UnityResolvedObject, or None if it doesn't
+        exist (or its source can't be found) """
+        if object_id in self.resolved:
+            return self.resolved[object_id]
+        objects = self.asset.objects
+        span = objects.spans.get(object_id)
+        if span is not None and not span[3]:
+            result = UnityResolvedObject(
+                self.asset, object_id, objects[object_id])
+        else:
+            if span is not None:
+                # stripped: a local stand-in for an object in a source prefab
+                properties = dict(objects[object_id].iter_flat_properties())
+                source_ref = next((
+                    properties[name] for name in UNITY_STRIPPED_SOURCE_PROPERTIES
+                    if type(properties.get(name)) == UnityFileRef), None)
+                instance_ref = next((
+                    properties[name] for name in UNITY_STRIPPED_INSTANCE_PROPERTIES
+                    if type(properties.get(name)) == UnityFileRef), None)
+                if source_ref is None or instance_ref is None:
+                    return None
+                instance_id, source_id = instance_ref.id, source_ref.id
+                guid = self.instances.get(instance_id, source_ref.guid)
+            elif object_id in self.virtual_ids:
+                instance_id = self.virtual_ids[object_id]
+                source_id = None
+                guid = self.instances[instance_id]
+            else:
+                return None
+            source = self.db.find_asset_by_guid(guid)
+            expansion = self.db.get_prefab_expansion(source) \
+                if isinstance(source, UnityAssetSceneGraph) else None
+            if source_id is None and expansion is not None:
+                # invert nested_prefab_file_id (source ids may be negative)
+                source_id = nested_prefab_file_id(instance_id, object_id)
+                if source_id not in expansion:
+                    source_id -= 1 << 63
+            base = expansion.resolve_object(source_id) \
+                if expansion is not None else None
+            if base is None:
+                return None
+            modifications = self.get_modifications(instance_id) \
+                if instance_id in objects.prefab_instance_ids else {}
+            result = UnityResolvedObject(
+                self.asset, object_id, base.source,
+                base.modifications + tuple(modifications.get(source_id, ())))
+        self.resolved[object_id] = result
+        return result
+
+
 IGNORED_EXTS = {'.DS_Store', '.gitkeep', '.blend1', '.orig'}
 UNITY_ASSET_EXT_TYPES = {
     '.prefab': UnityAssetPrefab,
@@ -517,11 +2059,17 @@ def add_exts(ext_types, type, exts):
 
 
 add_exts(UNITY_ASSET_EXT_TYPES, IgnoredAsset, (
-    '.txt', '.pdf', '.cginc', '.glsl', '.glslinc', '.asset', '.chm', '.md', '',
+    '.txt', '.pdf', '.cginc', '.glsl', '.glslinc', '.chm', '.md', '',
     '.json', '.inputactions', '.shader', '.wav', '.mp3', '.ogg',
     '.hlsl', '.shadergraph', '.shadersubgraph', '.blend', '.fbx',
-    '.ttf', '.mtl', '.lighting', '.physicMaterial',
-    '.controller', '.anim', '.cache', '.playable',
+    '.ttf', '.mtl', '.cache',
+))
+add_exts(UNITY_ASSET_EXT_TYPES, UnityAssetYaml, (
+    '.asset', '.controller', '.overrideController', '.anim', '.playable',
+    '.mask', '.mixer', '.lighting', '.giparams', '.physicMaterial',
+    '.physicsMaterial2D', '.renderTexture', '.cubemap', '.flare',
+    '.guiskin', '.fontsettings', '.spriteatlas', '.terrainlayer', '.brush',
+    '.signal', '.preset',
 ))
 add_exts(UNITY_ASSET_EXT_TYPES, UnityAssetTexture, (
     '.jpg', '.jpeg', '.png', '.psd', '.tga', '.tif'
@@ -543,32 +2091,473 @@ UNITY_ASSET_EXTS = \
     {'%s.meta' % k for k in UNITY_ASSET_EXT_TYPES.keys()} | \
     {'.meta'}
 
+# ext => asset type, or None for ignored exts (see scan_unity_project)
+UNITY_ASSET_EXT_CLASSES = dict(UNITY_ASSET_EXT_TYPES)
+UNITY_ASSET_EXT_CLASSES.update({ext: None for ext in IGNORED_EXTS})
+
+
+REF_FOUND = 'found'
+REF_MISSING_ASSET = 'missing_asset'
+REF_MISSING_OBJECT = 'missing_object'
+
+
+class UnityMissingRefReport:
+    """ Streaming missing-ref report (see UnityAssetDB.write_missing_ref_report).
+
+    Each missing ref is written to `out` as soon as it is added, as a JSON
+    Lines or CSV record:
+        record:      missing_asset | missing_object
+        asset:       path of the asset containing the ref
+        object_id:   fileID of the object containing the ref
+        object_type: type name of that object
+        property:    property path of the ref
+        guid:        target guid (32 hex digits)
+        file_id:     target fileID
+    Only aggregates are kept in memory; write_summary() then writes one
+    record per asset with missing refs (record: asset; missing_assets,
+    missing_objects counts), one per missing guid (record: guid; refs, and
+    number of referring assets), and a final record: total (with total
+    counts of missing refs, assets with missing refs, and missing guids).
+
+    summary_only: doesn't write (or build) records for individual refs.
+    """
+    FORMATS = ('jsonl', 'csv')
+    CSV_FIELDS = (
+        'record', 'asset', 'object_id', 'object_type', 'property', 'guid',
+        'file_id', 'missing_assets', 'missing_objects', 'refs', 'assets',
+        'guids',
+    )
+
+    def __init__(self, out=None, format='jsonl', summary_only=False):
+        if format not in self.FORMATS:
+            raise Exception("Unsupported report format '{}' (expected one "
+                            "of {})".format(format, self.FORMATS))
+        self.out = out
+        self.format = format
+        self.summary_only = summary_only
+        self.csv_writer = None
+        if out is not None and format == 'csv':
+            import csv
+            self.csv_writer = csv.DictWriter(
+                out, fieldnames=self.CSV_FIELDS, restval='',
+                lineterminator='\n')
+            self.csv_writer.writeheader()
+
+        # {asset path: [missing asset refs, missing object refs]}
+        self.missing_by_asset = {}
+        # {missing guid: [refs, referring assets, last referring asset path]}
+        self.missing_by_guid = {}
+        self.missing_asset_refs = 0
+        self.missing_object_refs = 0
+
+    def write_record(self, record):
+        if self.out is None:
+            return
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(record)
+        else:
+            self.out.write(json.dumps(record))
+            self.out.write('\n')
+
+    def add(self, kind, asset, object_id, name, guid, file_id):
+        """ Adds a missing ref (kind is REF_MISSING_ASSET or
+        REF_MISSING_OBJECT) from object object_id in asset """
+        counts = self.missing_by_asset.get(asset.path)
+        if counts is None:
+            counts = self.missing_by_asset[asset.path] = [0, 0]
+        if kind == REF_MISSING_ASSET:
+            counts[0] += 1
+            self.missing_asset_refs += 1
+            guid_counts = self.missing_by_guid.get(guid)
+            if guid_counts is None:
+                guid_counts = self.missing_by_guid[guid] = [0, 0, None]
+            guid_counts[0] += 1
+            if guid_counts[2] != asset.path:
+                guid_counts[1] += 1
+                guid_counts[2] = asset.path
+        else:
+            counts[1] += 1
+            self.missing_object_refs += 1
+        if not self.summary_only:
+            object_type = asset.get_object_type(object_id)
+            self.write_record({
+                'record': kind,
+                'asset': asset.path,
+                'object_id': object_id,
+                'object_type': object_type.name if object_type else None,
+                'property': name,
+                'guid': '%032x' % guid,
+                'file_id': file_id,
+            })
+
+    def write_summary(self):
+        for path, (missing_assets, missing_objects) \
+                in self.missing_by_asset.items():
+            self.write_record({
+                'record': 'asset',
+                'asset': path,
+                'missing_assets': missing_assets,
+                'missing_objects': missing_objects,
+            })
+        for guid, (refs, assets, _) in self.missing_by_guid.items():
+            self.write_record({
+                'record': 'guid',
+                'guid': '%032x' % guid,
+                'refs': refs,
+                'assets': assets,
+            })
+        self.write_record(self.totals())
+
+    def totals(self):
+        return {
+            'record': 'total',
+            'missing_assets': self.missing_asset_refs,
+            'missing_objects': self.missing_object_refs,
+            'refs': self.missing_asset_refs + self.missing_object_refs,
+            'assets': len(self.missing_by_asset),
+            'guids': len(self.missing_by_guid),
+        }
+
+
+# rough memory used by parsed objects (+ their properties), per byte of
+# unity yaml (measured on synthetic prefabs)
+UNITY_PARSED_BYTES_PER_YAML_BYTE = 8
+
+
+class UnityAssetResidency:
+    """ Tracks the (estimated) memory used by parsed scene graph assets (see
+    UnitySceneGraphObjectTable.resident_size), and evicts the least
+    recently used ones' objects once that exceeds budget (in bytes; None =
+    unlimited). Evicted assets keep their guid, object index and ref table.
+
+    Counters: hits / misses (object accesses that were / weren't already
+    parsed), evictions.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.sizes = collections.OrderedDict()  # {path: size}, LRU first
+        self.assets = {}
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit(self, asset):
+        self.hits += 1
+        if asset.path in self.sizes:
+            self.sizes.move_to_end(asset.path)
+
+    def miss(self, asset):
+        self.misses += 1
+
+    def update(self, asset, size):
+        """ Sets asset's resident size, marks it as most recently used, and
+        evicts other assets if over budget """
+        self.total_size += size - self.sizes.pop(asset.path, 0)
+        if size:
+            self.sizes[asset.path] = size
+            self.assets[asset.path] = asset
+        else:
+            self.assets.pop(asset.path, None)
+        if self.budget is not None:
+            self.evict(self.budget, keep=asset.path)
+
+    def evict(self, budget=0, keep=None):
+        """ Evicts LRU assets (other than keep) until total size <= budget """
+        while self.total_size > budget and self.sizes:
+            path, size = next(iter(self.sizes.items()))
+            if path == keep:
+                if len(self.sizes) == 1:
+                    break
+                self.sizes.move_to_end(path)
+                continue
+            asset = self.assets.get(path)
+            self.remove(path)
+            if asset is not None and asset.objects is not None:
+                asset.objects.evict()
+            self.evictions += 1
+
+    def remove(self, path):
+        self.total_size -= self.sizes.pop(path, 0)
+        self.assets.pop(path, None)
+
+    def to_json(self):
+        return {
+            'budget': self.budget,
+            'resident_assets': len(self.sizes),
+            'resident_size': self.total_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# assets in these dirs are loaded by name / path, so they're always in use
+UNITY_ALWAYS_INCLUDED_DIRS = frozenset((
+    'Resources', 'StreamingAssets', 'Editor Default Resources'))
+
+
+class UnityDependencyGraph:
+    """ Asset level dependency graph (asset A depends on B if any object in
+    A references B), built from the db's reverse ref index (see
+    index_referrers), ie. only covers loaded assets.
+
+    Assets are numbered 0..n-1 (by path); edges are stored as CSR arrays,
+    ie. the dependencies of asset i are
+        dependency_targets[dependency_offsets[i]:dependency_offsets[i + 1]]
+    (and likewise dependent_offsets / dependent_targets for the reverse
+    edges). sizes[i] is the on-disk size of asset i, in bytes.
+    """
+
+    def __init__(self, db):
+        self.assets = [
+            db.assets_by_path[path] for path in sorted(db.assets_by_path)]
+        self.ids = {asset.path: i for i, asset in enumerate(self.assets)}
+        ids_by_guid = {
+            guid: self.ids[asset.path]
+            for guid, asset in db.assets_by_guid.items()
+        }
+        n = len(self.assets)
+        edges = []
+        num_dependents = [0] * n
+        for i, asset in enumerate(self.assets):
+            targets = sorted({
+                ids_by_guid[guid]
+                for guid, _, _ in db.referrer_keys_by_path.get(asset.path, ())
+                if guid in ids_by_guid
+            } - {i})
+            for j in targets:
+                num_dependents[j] += 1
+            edges.append(targets)
+
+        self.dependency_offsets = array.array('l', [0])
+        self.dependency_targets = array.array('l')
+        for targets in edges:
+            self.dependency_targets.extend(targets)
+            self.dependency_offsets.append(len(self.dependency_targets))
+
+        self.dependent_offsets = array.array('l', [0])
+        for count in num_dependents:
+            self.dependent_offsets.append(self.dependent_offsets[-1] + count)
+        self.dependent_targets = array.array('l', bytes(
+            self.dependent_offsets.itemsize * len(self.dependency_targets)))
+        fill = self.dependent_offsets[:-1]
+        for i, targets in enumerate(edges):
+            for j in targets:
+                self.dependent_targets[fill[j]] = i
+                fill[j] += 1
+
+        self.sizes = array.array('q', (
+            self.get_file_size(asset) for asset in self.assets))
+
+    @staticmethod
+    def get_file_size(asset):
+        try:
+            stat = os.stat(asset.path)
+        except OSError:
+            return 0
+        return stat.st_size if not S_ISDIR(stat.st_mode) else 0
+
+    def __len__(self):
+        return len(self.assets)
+
+    @property
+    def num_edges(self):
+        return len(self.dependency_targets)
+
+    def closure(self, i, offsets, targets, transitive=True):
+        """ Returns the (sorted) ids reachable from asset id i (excluding i)
+        along offsets / targets """
+        if not transitive:
+            return list(targets[offsets[i]:offsets[i + 1]])
+        visited = bytearray(len(self.assets))
+        visited[i] = 1
+        result = self.mark_reachable(visited, [i], offsets, targets)
+        result.sort()
+        return result
+
+    @staticmethod
+    def mark_reachable(visited, stack, offsets, targets):
+        """ Sets visited[j] = 1 for every id j reachable from the ids in
+        stack (which should already be marked); returns the newly marked
+        ids """
+        result = []
+        while stack:
+            k = stack.pop()
+            for j in targets[offsets[k]:offsets[k + 1]]:
+                if not visited[j]:
+                    visited[j] = 1
+                    result.append(j)
+                    stack.append(j)
+        return result
+
+    def reachable(self, root_ids):
+        """ Returns a bitset (bytearray; 1 = reachable) of the ids reachable
+        from root_ids (including root_ids), in one pass """
+        visited = bytearray(len(self.assets))
+        stack = []
+        for i in root_ids:
+            if not visited[i]:
+                visited[i] = 1
+                stack.append(i)
+        self.mark_reachable(
+            visited, stack, self.dependency_offsets, self.dependency_targets)
+        return visited
+
+    def unreachable_ids(self, root_ids):
+        """ Returns the ids not reachable from root_ids """
+        visited = self.reachable(root_ids)
+        result = []
+        i = visited.find(0)
+        while i >= 0:
+            result.append(i)
+            i = visited.find(0, i + 1)
+        return result
+
+    def dependency_ids(self, asset, transitive=True):
+        return self.closure(
+            self.ids[asset.path], self.dependency_offsets,
+            self.dependency_targets, transitive)
+
+    def dependent_ids(self, asset, transitive=True):
+        return self.closure(
+            self.ids[asset.path], self.dependent_offsets,
+            self.dependent_targets, transitive)
+
+    def dependencies_of(self, asset, transitive=True):
+        """ Returns the assets that asset (transitively) depends on """
+        return [self.assets[j] for j in self.dependency_ids(asset, transitive)]
+
+    def dependents_of(self, asset, transitive=True):
+        """ Returns the assets that (transitively) depend on asset """
+        return [self.assets[j] for j in self.dependent_ids(asset, transitive)]
+
+    def closure_size(self, asset, dependents=False):
+        """ Returns the on-disk size (in bytes) of asset + everything it
+        (transitively) depends on, or + its dependents if dependents=True """
+        ids = self.dependent_ids(asset) if dependents else \
+            self.dependency_ids(asset)
+        sizes = self.sizes
+        return sizes[self.ids[asset.path]] + sum(sizes[j] for j in ids)
+
+
+class UnityAssetDBStats:
+    """ Scan instrumentation (see UnityAssetDB.stats):
+        phases:   {phase name: total seconds} (ie. walk, meta, parse, resolve)
+        files:    totals over all files loaded by workers (count, bytes,
+                  read + parse seconds)
+        counters: {name: count} (ie. objects, refs, reused index entries)
+        slowest:  the top_n slowest files loaded by workers
+        residency: parsed object cache stats (see UnityAssetResidency)
+    """
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        self.phases = {}
+        self.files = {'count': 0, 'bytes': 0, 'read': 0.0, 'parse': 0.0}
+        self.counters = {}
+        self.residency = None
+        self._slowest = []  # min heap of (seconds, path, kind, read, parse, bytes)
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_file(self, path, kind, read_seconds, parse_seconds, num_bytes):
+        files = self.files
+        files['count'] += 1
+        files['bytes'] += num_bytes
+        files['read'] += read_seconds
+        files['parse'] += parse_seconds
+        entry = (read_seconds + parse_seconds, path, kind,
+                 read_seconds, parse_seconds, num_bytes)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [
+            {'path': path, 'kind': kind, 'seconds': seconds,
+             'read': read, 'parse': parse, 'bytes': num_bytes}
+            for seconds, path, kind, read, parse, num_bytes
+            in sorted(self._slowest, reverse=True)
+        ]
+
+    def to_json(self):
+        return {
+            'phases': self.phases,
+            'files': self.files,
+            'counters': self.counters,
+            'slowest': self.slowest,
+            'residency': self.residency.to_json()
+            if self.residency is not None else None,
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+
 
 class UnityAssetDB:
     """ Rough encapsulation of the unity asset system """
 
-    def __init__(self, root_dir, logger=None):
+    def __init__(self, root_dir, logger=None, lazy=False, refs_only=False,
+                 lazy_scalars=False, numeric_arrays=None, index=None,
+                 executor=None, stats=None, memory_budget=None,
+                 parse_cache=None):
         self.root_dir = root_dir
+        self.parse_cache = parse_cache
+        self.stats = stats or UnityAssetDBStats()
+        self.residency = UnityAssetResidency(memory_budget)
+        self.stats.residency = self.residency
+        self.index = index
+        self.executor = executor
+        self.lazy = lazy
+        self.refs_only = refs_only
+        self.lazy_scalars = lazy_scalars
+        self.numeric_arrays = numeric_arrays
         self.files = {}
         self.assets_by_path = {}
         self.assets_by_guid = {}
         self.removed_assets = {}
         self.transaction_log = []
         self.logger = logger
+        self.guids_by_path = {}
 
-    def find_asset_by_guid(self, guid):
-        if guid is None:
-            return None
+        # {(path, job kind): os.stat()} from scan_unity_project; used once
+        self.scanned_stats = {}
 
-        if type(guid) != str:
-            guid = "{:x}".format(guid)
-        if guid in self.assets_by_guid:
-            return self.assets_by_guid[guid]
-        # print("Could not locate '%s' in assets!" % (
-        #     guid,
-        # ))
+        # reverse ref index (see find_referrers):
+        #   {target guid: {target fileID: {(path, object id, property path)}}}
+        self.referrers = {}
+        self.referrer_keys_by_path = {}
 
-        return None
+        # type index (see find_objects_by_type), from document headers:
+        #   {UnityType: {path: [object ids]}}
+        self.objects_by_type = {}
+        self.types_by_path = {}
+
+        # built on demand; dropped whenever refs change
+        self.dependency_graph = None
+
+        # memoized prefab expansions (see get_prefab_expansion):
+        #   {path: UnityPrefabExpansion}, {source prefab guid: {paths}}
+        self.prefab_expansions = {}
+        self.prefab_expansion_dependents = {}
+        self.expanding_paths = set()
+
+        # incrementally updated missing refs (see refresh_missing_refs)
+        self.missing_refs = None
+        self.dirty_paths = set()
+        self.dirty_guids = set()
+
+    def find_asset_by_guid(self, guid):
+        return self.assets_by_guid.get(canonical_guid(guid))
 
     def add_file(self, file):
         """ Inserts a tracked file into the db """
@@ -581,16 +2570,26 @@ class UnityAssetDB:
     def remove_file(self, file):
         """ Removes a tracked file from the db """
         if file is not None:
-            self.db = None
-            del self.files[file.path]
+            file.db = None
+            self.files.pop(file.path, None)
             if self.logger:
                 self.logger.removed_file(file)
 
     def add_asset(self, asset):
         """ Inserts or updates a tracked asset into the db """
         asset.db = self
+        guid = canonical_guid(asset.guid)
+        old_guid = self.guids_by_path.get(asset.path)
+        if old_guid != guid:
+            self.unmap_guid(asset.path, old_guid)
         self.assets_by_path[asset.path] = asset
-        self.assets_by_guid[asset.guid] = asset
+        if guid is not None:
+            self.assets_by_guid[guid] = asset
+        self.guids_by_path[asset.path] = guid
+        self.mark_dirty(asset.path, old_guid, guid)
+        self.invalidate_prefab_expansions(asset.path, old_guid, guid)
+        self.index_referrers(asset)
+        self.index_types(asset)
         self.add_file(asset.file)
         self.add_file(asset.metafile)
         if self.logger:
@@ -603,16 +2602,326 @@ class UnityAssetDB:
         """ Removes a tracked asset from the db """
         asset.db = None
         del self.assets_by_path[asset.path]
-        del self.assets_by_guid[asset.guid]
+        self.unmap_guid(asset.path, self.guids_by_path.pop(asset.path, None))
+        self.mark_dirty(asset.path, canonical_guid(asset.guid))
+        self.invalidate_prefab_expansions(
+            asset.path, canonical_guid(asset.guid))
+        self.unindex_referrers(asset.path)
+        self.unindex_types(asset.path)
+        self.residency.remove(asset.path)
         self.remove_file(asset.file)
         self.remove_file(asset.metafile)
         if self.logger:
             self.logger.removed_asset(asset)
 
+    def unmap_guid(self, path, guid):
+        """ Drops guid from assets_by_guid, if it maps to the asset at path
+        (ie. after that asset's guid changed, or it was removed) """
+        asset = self.assets_by_guid.get(guid)
+        if asset is not None and asset.path == path:
+            del self.assets_by_guid[guid]
+
+    def mark_dirty(self, path, *guids):
+        """ Marks missing refs from the asset at path, and to guids, as
+        needing to be recomputed (see refresh_missing_refs) """
+        if self.missing_refs is not None:
+            self.dirty_paths.add(path)
+            self.dirty_guids.update(
+                guid for guid in guids if guid is not None)
+
+    def index_referrers(self, asset):
+        """ (Re)adds all refs from asset to the reverse ref index; assets
+        that haven't been loaded yet are skipped (and indexed once they are
+        loaded + updated) """
+        self.unindex_referrers(asset.path)
+        if not (asset.loadable and asset.is_loaded):
+            return
+        # from the ref table (scanned from raw text), so that (re)indexing
+        # never parses objects
+        parent_guid = canonical_guid(asset.guid)
+        keys = []
+        for object_id, name, file_id, ref_guid, _ in asset.get_ref_table():
+            if file_id == 0:
+                continue
+            guid = canonical_guid(ref_guid) \
+                if ref_guid is not None else parent_guid
+            if guid is None:
+                continue
+            key = (asset.path, object_id, name)
+            self.referrers.setdefault(guid, {}).setdefault(
+                file_id, set()).add(key)
+            keys.append((guid, file_id, key))
+        if keys:
+            self.referrer_keys_by_path[asset.path] = keys
+
+    def unindex_referrers(self, path):
+        """ Removes all refs from the asset at path from the reverse ref
+        index """
+        self.dependency_graph = None
+        for guid, file_id, key in self.referrer_keys_by_path.pop(path, ()):
+            referrers_by_id = self.referrers[guid]
+            referrers = referrers_by_id[file_id]
+            referrers.discard(key)
+            if not referrers:
+                del referrers_by_id[file_id]
+                if not referrers_by_id:
+                    del self.referrers[guid]
+
+    def iter_referrer_keys(self, guid, file_id=None):
+        referrers_by_id = self.referrers.get(canonical_guid(guid))
+        if not referrers_by_id:
+            return ()
+        if file_id is not None:
+            return referrers_by_id.get(int(file_id), ())
+        return (
+            key for referrers in referrers_by_id.values()
+            for key in referrers
+        )
+
+    def rewrite_refs(self, rewrites, dry_run=False, include_meta=False):
+        """ Retargets all refs to old (guid, fileID)s, in place (see
+        make_ref_rewrites, rewrite_unity_refs_in_files). Only touches files
+        that the reverse ref index says reference an old guid, plus all
+        files that it doesn't cover (assets that aren't loadable, or haven't
+        been loaded yet, or failed to load; rewrite_unity_file_refs skips
+        any that aren't unity yaml), and all .meta files if include_meta.
+        Reloads the refs of the assets it changed.
+
+        Returns ({path: patches}, {path: error}).
+        """
+        rewrites = make_ref_rewrites(rewrites)
+        paths = set()
+        for guid, file_id in rewrites:
+            paths.update(
+                path for path, _, _ in self.iter_referrer_keys(guid, file_id))
+        for asset in self.assets_by_path.values():
+            if asset.asset_type == UnityDirectoryAsset:
+                pass
+            elif not (asset.loadable and asset.is_loaded) or \
+                    asset.file.error is not None:
+                paths.add(asset.path)
+            if include_meta:
+                paths.add(asset.path + '.meta')
+        with self.timed_phase('rewrite'):
+            changed, errors = rewrite_unity_refs_in_files(
+                sorted(paths), rewrites, dry_run=dry_run,
+                executor=self.executor)
+        if not dry_run:
+            for path in changed:
+                asset = self.assets_by_path.get(path)
+                if asset is not None and asset.loadable:
+                    asset.load(lazy=True)
+                    self.update_asset(asset)
+        return changed, errors
+
+    def index_types(self, asset):
+        """ (Re)adds asset's objects to the type index, from its object index
+        (ie. document headers) alone; skips stripped objects (which stand
+        in for objects that are indexed in their source prefabs) """
+        self.unindex_types(asset.path)
+        if not (asset.loadable and asset.is_loaded):
+            return
+        spans = asset.objects.spans
+        ids_by_type = {}
+        for object_id, unity_type in asset.objects.types.items():
+            if not spans[object_id][3]:
+                ids_by_type.setdefault(unity_type, []).append(object_id)
+        for unity_type, object_ids in ids_by_type.items():
+            self.objects_by_type.setdefault(unity_type, {})[asset.path] = \
+                object_ids
+        if ids_by_type:
+            self.types_by_path[asset.path] = list(ids_by_type)
+
+    def unindex_types(self, path):
+        for unity_type in self.types_by_path.pop(path, ()):
+            object_ids_by_path = self.objects_by_type[unity_type]
+            del object_ids_by_path[path]
+            if not object_ids_by_path:
+                del self.objects_by_type[unity_type]
+
+    def match_types(self, unity_type):
+        """ Returns the indexed UnityTypes that match unity_type: a UnityType,
+        a typeid (int), or a type name (str) """
+        if type(unity_type) == UnityType:
+            return [unity_type] if unity_type in self.objects_by_type else []
+        if type(unity_type) == int:
+            return [t for t in self.objects_by_type if t.typeid == unity_type]
+        return [t for t in self.objects_by_type if t.name == unity_type]
+
+    def iter_object_keys_by_type(self, unity_type):
+        """ Generates (asset, object id) for all (loaded, non-stripped)
+        objects of unity_type (see match_types); never parses objects """
+        for matched_type in self.match_types(unity_type):
+            for path, object_ids in self.objects_by_type[matched_type].items():
+                asset = self.assets_by_path[path]
+                for object_id in object_ids:
+                    yield asset, object_id
+
+    def find_objects_by_type(self, unity_type):
+        """ Generates all objects of unity_type (see match_types); each one
+        is only parsed when it's generated """
+        for asset, object_id in self.iter_object_keys_by_type(unity_type):
+            yield asset.objects[object_id]
+
+    def count_objects_by_type(self):
+        """ Returns {UnityType: number of objects} """
+        return {
+            unity_type: sum(map(len, object_ids_by_path.values()))
+            for unity_type, object_ids_by_path in self.objects_by_type.items()
+        }
+
+    def find_referrers(self, guid, file_id=None):
+        """ Returns [(asset, object id, property path)] for all refs (from
+        loaded assets) to guid, or to object file_id in guid if given """
+        return [
+            (self.assets_by_path[path], object_id, name)
+            for path, object_id, name
+            in self.iter_referrer_keys(guid, file_id)
+        ]
+
+    def get_prefab_expansion(self, asset):
+        """ Returns the (memoized) UnityPrefabExpansion of a scene graph
+        asset, or None if asset is part of a nested prefab cycle """
+        expansion = self.prefab_expansions.get(asset.path)
+        if expansion is not None:
+            return expansion
+        if asset.path in self.expanding_paths:
+            return None
+        self.expanding_paths.add(asset.path)
+        try:
+            if asset.objects is None:
+                asset.load()
+                self.update_asset(asset)
+            expansion = UnityPrefabExpansion(self, asset)
+        finally:
+            self.expanding_paths.discard(asset.path)
+        self.prefab_expansions[asset.path] = expansion
+        for guid in expansion.source_guids:
+            self.prefab_expansion_dependents.setdefault(guid, set()).add(
+                asset.path)
+        return expansion
+
+    def invalidate_prefab_expansions(self, path, *guids):
+        """ Drops the expansion of the asset at path, and of all assets that
+        (transitively) instance guids """
+        self.prefab_expansions.pop(path, None)
+        for guid in guids:
+            for dependent in self.prefab_expansion_dependents.pop(guid, ()):
+                self.prefab_expansions.pop(dependent, None)
+
+    def resolve_object(self, asset, object_id):
+        """ Returns object object_id of asset as a UnityResolvedObject (with
+        stripped / nested prefab objects resolved against their source
+        prefabs), or None if it doesn't exist """
+        expansion = self.get_prefab_expansion(asset)
+        if expansion is None:
+            return None
+        return expansion.resolve_object(int(object_id))
+
+    def get_dependency_graph(self):
+        """ Returns the UnityDependencyGraph of all (loaded) assets; built
+        once, and rebuilt after assets change """
+        if self.dependency_graph is None:
+            with self.timed_phase('dependencies'):
+                self.dependency_graph = UnityDependencyGraph(self)
+        return self.dependency_graph
+
+    def dependencies_of(self, asset, transitive=True):
+        return self.get_dependency_graph().dependencies_of(asset, transitive)
+
+    def dependents_of(self, asset, transitive=True):
+        return self.get_dependency_graph().dependents_of(asset, transitive)
+
+    def closure_size(self, asset, dependents=False):
+        return self.get_dependency_graph().closure_size(asset, dependents)
+
+    def find_unreferenced_assets(self, roots=None, include_scripts=False):
+        """ Returns [(asset, size on disk)] for all assets (other than
+        directories) that aren't reachable from roots (a list of assets;
+        default: see get_default_roots). Scripts are only included if
+        include_scripts=True, since code dependencies aren't visible as
+        refs. """
+        graph = self.get_dependency_graph()
+        if roots is None:
+            roots = self.get_default_roots()
+        ids = graph.ids
+        result = []
+        for i in graph.unreachable_ids([ids[asset.path] for asset in roots]):
+            asset = graph.assets[i]
+            if asset.asset_type == UnityDirectoryAsset or (
+                    not include_scripts and
+                    asset.asset_type == UnityAssetCSharpScript):
+                continue
+            result.append((asset, graph.sizes[i]))
+        return result
+
+    def find_unanalyzed_assets(self):
+        """ Returns [(asset, size on disk)] for (loadable) assets whose refs
+        couldn't be read, ie. binary serialized or unreadable files. Assets
+        that only these reference are reported by find_unreferenced_assets
+        too, since their refs are unknown. """
+        graph = self.get_dependency_graph()
+        return [
+            (asset, graph.sizes[graph.ids[path]])
+            for path, asset in self.assets_by_path.items()
+            if asset.loadable and asset.is_loaded and
+            asset.file.error is not None
+        ]
+
+    def get_default_roots(self):
+        """ Returns the assets that unity includes in builds regardless of
+        refs: scenes, and everything under UNITY_ALWAYS_INCLUDED_DIRS """
+        prefix_len = len(os.path.join(self.root_dir, ''))
+        return [
+            asset for path, asset in self.assets_by_path.items()
+            if asset.asset_type == UnityAssetScene or
+            not UNITY_ALWAYS_INCLUDED_DIRS.isdisjoint(
+                path[prefix_len:].split(os.sep)[:-1])
+        ]
+
     def has_matching_file(self, path):
         return path in self.files
 
-    def run_asset_update_parallel(self, job, assets_or_predicate):
+    def notify(self, hook, *args):
+        """ Calls logger.<hook>(*args), if the logger implements it. Optional
+        hooks: finished_phase(name, seconds), and loaded_file(path, kind,
+        read seconds, parse seconds, bytes) for each file a worker loads """
+        fcn = getattr(self.logger, hook, None)
+        if fcn is not None:
+            fcn(*args)
+
+    @contextlib.contextmanager
+    def timed_phase(self, name):
+        """ Times a block as (part of) phase name (see stats) """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            self.stats.add_phase(name, seconds)
+            self.notify('finished_phase', name, seconds)
+
+    def add_scanned_assets(self, batch):
+        """ Adds (untracked) assets from a scan_unity_project() batch, and
+        remembers their stats for run_asset_update_parallel """
+        for path, asset_type, file_stat, meta_stat in batch:
+            if path in self.assets_by_path:
+                continue
+            self.add_asset(asset_type(path))
+            if file_stat is not None:
+                self.scanned_stats[(path, JOB_LOAD_YAML_OBJECTS)] = file_stat
+            if meta_stat is not None:
+                self.scanned_stats[(path, JOB_LOAD_METAFILE)] = meta_stat
+
+    def run_asset_update_parallel(self, kind, assets_or_predicate):
+        """ Runs a parallel_job_load() job of type `kind` for each asset (in
+        worker processes), and folds the results back into the assets.
+
+        Only (path, kind) is sent to workers, and only a compact result
+        tuple (see PARALLEL_JOB_LOADERS) is sent back; results are folded
+        in as they finish. Jobs run on self.executor if set, otherwise on a
+        temporary (process) UnityJobExecutor.
+        """
         if type(assets_or_predicate) == list:
             assets = assets_or_predicate
         else:
@@ -622,39 +2931,281 @@ class UnityAssetDB:
                 if predicate(asset)
             ]
         print("Running {} on {} asset(s):\n{}".format(
-            job, len(assets), '\n'.join([asset.path for asset in assets])))
-        import time
+            kind, len(assets), '\n'.join([asset.path for asset in assets])))
+        with self.timed_phase(PARALLEL_JOB_PHASES.get(kind, kind)):
+            self._run_asset_update_parallel(kind, assets)
+
+    def get_indexed_result(self, entries, path, stat, kind):
+        """ Returns the result of a (path, kind) job from entries ({job kind:
+        {path: UnityAssetIndexEntry}}), if it's up to date with stat,
+        otherwise None.
+
+        JOB_PARSE_YAML_OBJECTS results are indexed as two entries: the
+        JOB_LOAD_YAML_OBJECTS one (object index + ref table, which lazy
+        loads reuse as is), plus the parsed property table columns, which
+        are only reused if they were parsed with the same lazy_scalars /
+        numeric_arrays options """
+        if stat is None:
+            return None
+        base_kind = JOB_LOAD_YAML_OBJECTS \
+            if kind == JOB_PARSE_YAML_OBJECTS else kind
+        entry = entries.get(base_kind, {}).get(path)
+        result = entry.get(stat) if entry is not None else None
+        if result is None or kind != JOB_PARSE_YAML_OBJECTS:
+            return result
+        entry = entries.get(kind, {}).get(path)
+        parsed = entry.get(stat) if entry is not None else None
+        if parsed is None or parsed[:2] != self.parser_options:
+            return None
+        try:
+            columns = validate_unity_property_columns(
+                parsed[2], [row[0] for row in result[0]])
+        except ValueError:
+            return None
+        return result + (columns,)
+
+    @property
+    def parser_options(self):
+        """ (lazy_scalars, numeric_arrays?) that parsed property tables
+        depend on; numeric arrays are indexed as plain lists, so whether
+        they're numpy arrays doesn't matter """
+        return bool(self.lazy_scalars), bool(self.numeric_arrays)
+
+    def store_indexed_result(self, path, kind, stat, result):
+        """ Adds the result of a (path, kind) job to the index (see
+        get_indexed_result) """
+        if kind == JOB_PARSE_YAML_OBJECTS:
+            self.index.store(path, JOB_LOAD_YAML_OBJECTS, stat, result[:2])
+            result = self.parser_options + (result[2],)
+        self.index.store(path, kind, stat, result)
+
+    def _run_asset_update_parallel(self, kind, assets):
         start_time = time.time()
-        for asset in run_parallel(job, assets):
-            self.update_asset(asset)
+        jobs, stats, reused = [], {}, 0
+        entries = {}
+        if self.index:
+            entries[kind] = self.index.load_entries(kind)
+            if kind == JOB_LOAD_YAML_OBJECTS and \
+                    any(not asset.lazy for asset in assets):
+                entries[JOB_PARSE_YAML_OBJECTS] = \
+                    self.index.load_entries(JOB_PARSE_YAML_OBJECTS)
+        for asset in assets:
+            stat = self.scanned_stats.pop((asset.path, kind), None) or \
+                stat_job_file(asset.path, kind)
+            job_kind = kind
+            if kind == JOB_LOAD_YAML_OBJECTS and not asset.lazy:
+                # all objects get parsed right away, so do that in the
+                # workers too (see parse_unity_yaml_objects)
+                job_kind = JOB_PARSE_YAML_OBJECTS
+            result = self.get_indexed_result(
+                entries, asset.path, stat, job_kind)
+            if result is not None:
+                asset.apply_job_result(job_kind, None, result)
+                self.update_asset(asset)
+                self.count_job_result(job_kind, result)
+                reused += 1
+                continue
+            stats[asset.path] = stat
+            if job_kind == JOB_PARSE_YAML_OBJECTS:
+                jobs.append((
+                    asset.path, job_kind, self.parse_cache,
+                    self.lazy_scalars, self.numeric_arrays))
+            else:
+                jobs.append((asset.path, job_kind, self.parse_cache))
+        executor = self.executor or UnityJobExecutor()
+        try:
+            results = executor.imap_unordered(
+                parallel_job_load, jobs,
+                max_chunksize=PARALLEL_JOB_MAX_CHUNKSIZE.get(kind))
+            for path, job_kind, error, result, timings in results:
+                asset = self.assets_by_path[path]
+                asset.apply_job_result(job_kind, error, result)
+                self.update_asset(asset)
+                self.stats.add_file(path, job_kind, *timings)
+                self.notify('loaded_file', path, job_kind, *timings)
+                if error is None:
+                    self.count_job_result(job_kind, result)
+                if self.index and error is None and stats[path] is not None:
+                    self.store_indexed_result(
+                        path, job_kind, stats[path], result)
+        finally:
+            if executor is not self.executor:
+                executor.close()
+        if self.index:
+            self.index.commit()
+        self.stats.count('reused ' + kind, reused)
         stop_time = time.time()
-        print("finished running {} on {} asset(s) in {:0.2f} second(s)".format(
-            job, len(assets), stop_time - start_time))
+        print("finished running {} on {} asset(s) in {:0.2f} second(s)"
+              " ({} reused from index)".format(
+                  kind, len(assets), stop_time - start_time, reused))
         print()
 
+    def count_job_result(self, kind, result):
+        self.stats.count(kind + ' files')
+        if kind in (JOB_LOAD_YAML_OBJECTS, JOB_PARSE_YAML_OBJECTS):
+            object_index, ref_table = result[:2]
+            self.stats.count('objects', len(object_index))
+            self.stats.count('refs', len(ref_table))
+
     def load_missing_metafiles(self):
         self.run_asset_update_parallel(
-            parallel_job_load_metafile,
+            JOB_LOAD_METAFILE,
             lambda asset: not asset.metafile.is_loaded)
 
     def load_all(self):
+        """ Loads all unloaded (scene graph) assets, as object indexes + ref
+        tables; objects themselves are parsed on first access, or by the
+        workers if assets aren't lazy """
         self.run_asset_update_parallel(
-            parallel_job_load_asset,
+            JOB_LOAD_YAML_OBJECTS,
             lambda asset: asset.loadable and not asset.is_loaded)
 
-    def get_all_refs(self):
+    def prune_index(self):
+        """ Drops index entries for assets that are no longer in the db, and
+        trims the parse cache (if any) to its max size """
+        if self.index:
+            self.index.prune(self.assets_by_path)
+            self.index.commit()
+        if self.parse_cache:
+            self.parse_cache.trim()
+
+    def get_all_refs(self, refs_only=None):
         refs = []
         for asset in self.assets_by_path.values():
             if asset.loadable:
-                refs += asset.get_all_refs()
+                refs += asset.get_all_refs(refs_only=refs_only)
         return refs
 
-    def get_all_missing_refs(self):
+    def resolve_refs(self, refs):
+        """ Classifies refs (UnityPropertyReferences) in a single pass, as
+        REF_FOUND, REF_MISSING_ASSET or REF_MISSING_OBJECT (null and builtin
+        refs are found); returns {classification: [refs]}.
+
+        Each target asset is looked up once (by canonical guid), after which
+        refs are checked with set membership against its object_ids.
+        """
+        with self.timed_phase('resolve'):
+            return self._resolve_refs(refs)
+
+    def _resolve_refs(self, refs):
+        result = {
+            REF_FOUND: [],
+            REF_MISSING_ASSET: [],
+            REF_MISSING_OBJECT: [],
+        }
+        found = result[REF_FOUND]
+        missing_asset = result[REF_MISSING_ASSET]
+        missing_object = result[REF_MISSING_OBJECT]
+        assets_by_guid = self.assets_by_guid
+        object_ids_by_guid = {}
+        for ref in refs:
+            guid = ref.ref.guid
+            if guid is None or guid in UNITY_BUILTIN_GUIDS:
+                found.append(ref)
+                continue
+            if guid in object_ids_by_guid:
+                object_ids = object_ids_by_guid[guid]
+            else:
+                asset = assets_by_guid.get(guid)
+                object_ids = asset.object_ids if asset is not None else None
+                object_ids_by_guid[guid] = object_ids
+            if object_ids is None:
+                missing_asset.append(ref)
+            elif ref.ref.id in object_ids:
+                found.append(ref)
+            else:
+                missing_object.append(ref)
+        return result
+
+    def iter_missing_raw_refs(self, assets=None):
+        """ Generates (REF_MISSING_ASSET | REF_MISSING_OBJECT, asset,
+        object id, property path, target guid, target fileID) for all
+        missing refs in assets (default: all loadable assets), one asset at
+        a time, straight from their ref tables (see get_ref_table); doesn't
+        build UnityPropertyReferences, or parse any objects """
+        if assets is None:
+            assets = [
+                asset for asset in self.assets_by_path.values()
+                if asset.loadable
+            ]
+        assets_by_guid = self.assets_by_guid
+        object_ids_by_guid = {}
+        for asset in assets:
+            parent_guid = canonical_guid(asset.guid)
+            for object_id, name, ref_id, ref_guid, ref_type \
+                    in asset.get_ref_table():
+                if ref_id == 0:
+                    continue
+                guid = canonical_guid(ref_guid) \
+                    if ref_guid is not None else parent_guid
+                if guid is None or guid in UNITY_BUILTIN_GUIDS:
+                    continue
+                if guid in object_ids_by_guid:
+                    object_ids = object_ids_by_guid[guid]
+                else:
+                    target = assets_by_guid.get(guid)
+                    object_ids = target.object_ids \
+                        if target is not None else None
+                    object_ids_by_guid[guid] = object_ids
+                if object_ids is None:
+                    yield REF_MISSING_ASSET, asset, object_id, name, guid, ref_id
+                elif ref_id not in object_ids:
+                    yield REF_MISSING_OBJECT, asset, object_id, name, guid, ref_id
+
+    def write_missing_ref_report(self, report):
+        """ Streams all missing refs into report (an UnityMissingRefReport),
+        then writes its summary; returns report.totals() """
+        with self.timed_phase('resolve'):
+            for missing_ref in self.iter_missing_raw_refs():
+                report.add(*missing_ref)
+        report.write_summary()
+        return report.totals()
+
+    def get_all_missing_refs(self, refs_only=None):
+        if refs_only is not None:
+            resolved = self.resolve_refs(self.get_all_refs(refs_only=refs_only))
+            return resolved[REF_MISSING_ASSET] + resolved[REF_MISSING_OBJECT]
+        self.refresh_missing_refs()
         return [
-            ref for ref in self.get_all_refs()
-            if ref.is_missing
+            ref for refs in self.missing_refs.values()
+            for ref in refs
         ]
 
+    def refresh_missing_refs(self):
+        """ Brings self.missing_refs ({asset path: [missing refs]}) up to
+        date, and returns the set of asset paths whose missing refs were
+        recomputed.
+
+        The first call computes missing refs for all assets; after that,
+        only assets that changed since (see mark_dirty), and assets that
+        reference a guid that changed, are recomputed.
+        """
+        if self.missing_refs is None:
+            self.missing_refs = {}
+            paths = set(self.assets_by_path)
+        else:
+            paths = set(self.dirty_paths)
+            for guid in self.dirty_guids:
+                paths.update(
+                    path for path, _, _ in self.iter_referrer_keys(guid))
+        # reset before recomputing: assets (re)loaded while recomputing
+        # mark themselves dirty again, for the next refresh
+        self.dirty_paths, self.dirty_guids = set(), set()
+
+        for path in paths:
+            asset = self.assets_by_path.get(path)
+            if asset is None or not asset.loadable:
+                self.missing_refs.pop(path, None)
+                continue
+            resolved = self.resolve_refs(asset.get_all_refs())
+            missing_refs = \
+                resolved[REF_MISSING_ASSET] + resolved[REF_MISSING_OBJECT]
+            if missing_refs:
+                self.missing_refs[path] = missing_refs
+            else:
+                self.missing_refs.pop(path, None)
+        return paths
+
     def summarize_missing_refs(self):
         assets = list(self.assets_by_path.values())
         all_missing_refs = self.get_all_missing_refs()
@@ -668,19 +3219,19 @@ class UnityAssetDB:
                 if guid not in missing_asset_refs_by:
                     missing_asset_refs_by[guid] = set()
                 missing_asset_refs_by[guid].add((
-                    missing_ref.object.asset.path,
-                    missing_ref.object.type.name,
-                    missing_ref.object.ref.id
+                    missing_ref.asset.path,
+                    missing_ref.object_type.name,
+                    missing_ref.object_id
                 ))
             else:
-                asset_path = missing_ref.object.asset.path
+                asset_path = missing_ref.asset.path
                 if asset_path not in missing_object_refs:
                     missing_object_refs[asset_path] = list()
                 missing_object_refs[asset_path].append(missing_ref)
 
         print("%d missing asset(s):" % len(missing_assets))
         for missing_asset_guid in missing_assets:
-            print("missing asset %s referenced by %d object(s):\n\t%s" % (
+            print("missing asset %032x referenced by %d object(s):\n\t%s" % (
                 missing_asset_guid, len(
                     missing_asset_refs_by[missing_asset_guid]),
                 '\n\t'.join([
@@ -692,36 +3243,681 @@ class UnityAssetDB:
         for path, missing_refs in missing_object_refs.items():
             print("  %s missing %d ref(s):" % (path, len(missing_refs)))
             for ref in missing_refs:
-                missing_ref_total += 1
                 print("  {type} {id} {name}: {ref}".format(
-                    type=ref.object.type,
-                    id=ref.object.ref.id,
+                    type=ref.object_type,
+                    id=ref.object_id,
                     name=ref.name,
                     ref=ref.ref))
-        # print("%d / %d asset(s) are missing a total of %d references" % (
-        #     assets_missing_refs_count, len(assets), missing_ref_total))
+        print("%d / %d asset(s) are missing a total of %d references" % (
+            len({ref.asset.path for ref in all_missing_refs}), len(assets),
+            len(all_missing_refs)))
+
+
+UNITY_ASSET_INDEX_SCHEMA_VERSION = 2
+
+# Bump whenever the parsers / parallel_job_load() results change, to
+# invalidate persisted results (see UnityAssetIndex)
+UNITY_ASSET_PARSER_VERSION = 3
+
+
+def is_json_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_unity_yaml_tables(index, ref_table, content_length=None):
+    """ Checks an (object index, ref table) pair read back from disk (see
+    UnityParseCache, UnityAssetIndex); returns them as tuples, or raises
+    ValueError if they're malformed, or if their offsets are out of range
+    for content_length characters of content """
+    if not (isinstance(index, list) and isinstance(ref_table, list)):
+        raise ValueError("malformed entry")
+    index = tuple(map(tuple, index))
+    for row in index:
+        if len(row) != 6 or not (
+                is_json_int(row[0]) and is_json_int(row[1]) and
+                isinstance(row[2], str) and is_json_int(row[3]) and
+                is_json_int(row[4]) and isinstance(row[5], bool) and
+                0 <= row[3] <= row[4]):
+            raise ValueError("malformed index row {!r}".format(row))
+        if content_length is not None and row[4] > content_length:
+            raise ValueError("index row {!r} out of range".format(row))
+    ref_table = tuple(map(tuple, ref_table))
+    for row in ref_table:
+        if len(row) != 5 or not (
+                is_json_int(row[0]) and isinstance(row[1], str) and
+                is_json_int(row[2]) and
+                (row[3] is None or isinstance(row[3], str)) and
+                (row[4] is None or is_json_int(row[4]))):
+            raise ValueError("malformed ref row {!r}".format(row))
+    return index, ref_table
+
+
+UNITY_GUID_HEX = re.compile(r'[0-9a-fA-F]{1,32}$')
+
+
+def validate_unity_property_columns(columns, object_ids):
+    """ Checks UnityPropertyTable.to_columns() output read back from disk
+    (see UnityAssetIndex), for a file with objects object_ids; returns it,
+    or raises ValueError if it's malformed """
+    if not (isinstance(columns, list) and len(columns) == 7 and
+            all(isinstance(column, list) for column in columns)):
+        raise ValueError("malformed property columns")
+    path_parents, path_keys, path_column, object_rows, values, refs, \
+        arrays = columns
+    num_paths, num_rows = len(path_parents), len(values)
+    if len(path_keys) != num_paths or len(path_column) != num_rows:
+        raise ValueError("mismatched property column lengths")
+    for i, (parent, key) in enumerate(zip(path_parents, path_keys)):
+        if not (is_json_int(parent) and -1 <= parent < i and (
+                isinstance(key, str) or (is_json_int(key) and key >= 0))):
+            raise ValueError("malformed path {!r}".format((parent, key)))
+    if len(set(zip(path_parents, path_keys))) != num_paths:
+        raise ValueError("duplicate paths")
+    for path_id in path_column:
+        if not (is_json_int(path_id) and 0 <= path_id < num_paths):
+            raise ValueError("malformed path id {!r}".format(path_id))
+    row_ids, end = set(), 0
+    for row in object_rows:
+        if not (isinstance(row, list) and len(row) == 3 and
+                all(map(is_json_int, row)) and row[1] == end and
+                row[1] <= row[2]):
+            raise ValueError("malformed object rows {!r}".format(row))
+        row_ids.add(row[0])
+        end = row[2]
+    if end != num_rows or len(row_ids) != len(object_rows) or \
+            row_ids != set(object_ids):
+        raise ValueError("object rows don't match the objects")
+    special_rows = set()
+    for ref in refs:
+        if not (isinstance(ref, list) and len(ref) == 3 and
+                is_json_int(ref[0]) and 0 <= ref[0] < num_rows and
+                is_json_int(ref[1]) and (ref[2] is None or (
+                    isinstance(ref[2], str) and UNITY_GUID_HEX.match(ref[2])))):
+            raise ValueError("malformed ref {!r}".format(ref))
+        special_rows.add(ref[0])
+    for entry in arrays:
+        if not (isinstance(entry, list) and len(entry) == 3 and
+                is_json_int(entry[0]) and 0 <= entry[0] < num_rows and
+                entry[1] in ('d', 'q') and isinstance(entry[2], list) and
+                all(isinstance(value, float) if entry[1] == 'd' else
+                    is_json_int(value) and -2 ** 63 <= value < 2 ** 63
+                    for value in entry[2])):
+            raise ValueError("malformed numeric array {!r}".format(entry))
+        special_rows.add(entry[0])
+    if len(special_rows) != len(refs) + len(arrays):
+        raise ValueError("duplicate ref / numeric array rows")
+    for i, value in enumerate(values):
+        if value is None:
+            if i not in special_rows:
+                raise ValueError("unexpected null at row {}".format(i))
+        elif not (isinstance(value, (str, float)) or is_json_int(value) or
+                  value == {} or value == []) or i in special_rows:
+            raise ValueError("malformed value {!r}".format(value))
+    return columns
+
+
+def pack_job_result(result):
+    """ Encodes a parallel_job_load() result (plain data) for
+    UnityAssetIndex, as compressed JSON; never pickles, since an index
+    file can be stale, or come from elsewhere (see unpack_job_result) """
+    return zlib.compress(json.dumps(
+        result, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_job_result(kind, data, content_length=None):
+    """ Inverse of pack_job_result() for a UnityAssetIndex entry of kind;
+    raises ValueError (or TypeError, zlib.error, ...) if the entry doesn't
+    decode to a well-formed result. JOB_PARSE_YAML_OBJECTS entries only
+    hold [lazy_scalars, numeric_arrays, property table columns]; see
+    UnityAssetDB.get_indexed_result """
+    result = json.loads(zlib.decompress(data).decode('utf-8'))
+    if not isinstance(result, list):
+        raise ValueError("malformed result")
+    if kind == JOB_LOAD_METAFILE:
+        if len(result) != 2 or not (
+                isinstance(result[0], str) and
+                UNITY_META_GUID.match(result[0]) and
+                (result[1] is None or isinstance(result[1], str))):
+            raise ValueError("malformed .meta result")
+        return tuple(result)
+    if kind == JOB_LOAD_YAML_OBJECTS:
+        if len(result) != 2:
+            raise ValueError("malformed result")
+        return validate_unity_yaml_tables(result[0], result[1], content_length)
+    if kind == JOB_PARSE_YAML_OBJECTS:
+        if len(result) != 3 or not all(
+                isinstance(option, bool) for option in result[:2]):
+            raise ValueError("malformed result")
+        return tuple(result)
+    raise ValueError("unknown job kind {!r}".format(kind))
+
+
+class UnityAssetIndexEntry:
+    __slots__ = ('kind', 'size', 'mtime_ns', 'data')
+
+    def __init__(self, kind, size, mtime_ns, data):
+        self.kind = kind
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.data = data
+
+    def get(self, stat):
+        """ Returns the stored result, if stat matches (ie. the file hasn't
+        changed since) and the entry decodes (see unpack_job_result),
+        otherwise None """
+        if stat.st_size != self.size or stat.st_mtime_ns != self.mtime_ns:
+            return None
+        try:
+            # decoded text is never longer than the file (in bytes)
+            return unpack_job_result(self.kind, self.data, stat.st_size)
+        except (ValueError, TypeError, RecursionError, zlib.error):
+            return None
+
+
+class UnityAssetIndex:
+    """ Persistent (sqlite) index of parallel_job_load() results.
+
+    Entries are keyed by (asset path, job kind), and are only reused while
+    the (size, mtime_ns) of the file the job reads (see stat_job_file) is
+    unchanged. Changing UNITY_ASSET_INDEX_SCHEMA_VERSION or
+    UNITY_ASSET_PARSER_VERSION drops all entries. Results are stored as
+    validated JSON (see pack_job_result), so entries that don't decode are
+    misses, and an index file can't run code when it's loaded.
+
+    Tables:
+        info:    key, value (schema_version, parser_version)
+        entries: path, kind, size, mtime_ns, guid (meta entries only),
+                 data (see pack_job_result)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        dirs = os.path.dirname(path)
+        if dirs and not os.path.exists(dirs):
+            os.makedirs(dirs)
+        self.connection = sqlite3.connect(path)
+        self.check_version()
+
+    def check_version(self):
+        c = self.connection
+        c.execute(
+            'CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value)')
+        versions = dict(c.execute('SELECT key, value FROM info'))
+        expected = {
+            'schema_version': UNITY_ASSET_INDEX_SCHEMA_VERSION,
+            'parser_version': UNITY_ASSET_PARSER_VERSION,
+        }
+        if versions != expected:
+            if versions:
+                print("asset index {}: version changed ({} => {}), "
+                      "discarding entries".format(self.path, versions, expected))
+            c.execute('DROP TABLE IF EXISTS entries')
+            c.execute('DELETE FROM info')
+            c.executemany(
+                'INSERT INTO info (key, value) VALUES (?, ?)',
+                expected.items())
+        c.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'path TEXT NOT NULL, kind TEXT NOT NULL, '
+            'size INTEGER, mtime_ns INTEGER, guid TEXT, data BLOB, '
+            'PRIMARY KEY (path, kind))')
+        c.commit()
+
+    def load_entries(self, kind):
+        """ Returns {path: UnityAssetIndexEntry} for all entries of kind """
+        return {
+            path: UnityAssetIndexEntry(kind, size, mtime_ns, data)
+            for path, size, mtime_ns, data in self.connection.execute(
+                'SELECT path, size, mtime_ns, data FROM entries WHERE kind = ?',
+                (kind,))
+        }
+
+    def store(self, path, kind, stat, result):
+        guid = result[0] if kind == JOB_LOAD_METAFILE else None
+        self.connection.execute(
+            'INSERT OR REPLACE INTO entries '
+            '(path, kind, size, mtime_ns, guid, data) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (path, kind, stat.st_size, stat.st_mtime_ns, guid,
+             pack_job_result(result)))
+
+    def prune(self, paths):
+        """ Drops all entries whose path isn't in paths """
+        stale = [
+            (path,) for (path,) in self.connection.execute(
+                'SELECT DISTINCT path FROM entries')
+            if path not in paths
+        ]
+        self.connection.executemany(
+            'DELETE FROM entries WHERE path = ?', stale)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
 
+def replace_file_contents(path, data, mode=None):
+    """ Atomically replaces the file at path with data (bytes), by writing a
+    temp file next to it and renaming that over path """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class UnityParseCache:
+    """ Content addressed (directory) cache of unity yaml object indexes +
+    ref tables (see index_unity_yaml_tables).
+
+    Entries are keyed by a hash of the file contents, and stored (as
+    compressed JSON, see encode / decode) under
+    <root_dir>/<UNITY_ASSET_PARSER_VERSION>/<key[:2]>/<key>. Entries don't
+    depend on file paths or mtimes, so a cache dir can be copied / synced
+    between machines (ie. CI runners) as-is. Since it may be shared, entries
+    are plain data (never pickles), and are validated on read; anything
+    that doesn't decode to a well-formed index + ref table is a miss.
+    Writes are atomic (temp file + rename), so concurrent writers, and
+    readers, are fine.
+
+    Only indexing + ref scanning is cached: in eager (non lazy) mode, all
+    objects are still parsed after a hit, so the cache mostly pays off for
+    lazy / refs_only dbs.
+
+    max_size: in bytes; trim() evicts the least recently used entries (by
+    mtime, which get() bumps) past that, and entries for other parser
+    versions. None = unbounded.
+    """
+    # temp files older than this (in seconds) are left over from a crash
+    STALE_TEMP_FILE_AGE = 3600
+
+    def __init__(self, root_dir, max_size=None):
+        self.root_dir = root_dir
+        self.max_size = max_size
+
+    @property
+    def version_dir(self):
+        return os.path.join(self.root_dir, str(UNITY_ASSET_PARSER_VERSION))
+
+    def make_key(self, content):
+        """ Hashes (decoded) file content; offsets in the cached index are
+        into the decoded text, so this is what results depend on """
+        return hashlib.sha1(
+            content.encode('utf-8', 'surrogatepass')).hexdigest()
 
-pool = None
+    def get_path(self, key):
+        return os.path.join(self.version_dir, key[:2], key)
 
+    @staticmethod
+    def encode(result):
+        index, ref_table = result
+        return zlib.compress(json.dumps(
+            [index, ref_table], separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def decode(data, content_length=None):
+        """ Inverse of encode(); raises ValueError if data isn't a well-formed
+        (object index, ref table) entry, or if its offsets are out of range
+        for content_length characters of content """
+        entry = json.loads(zlib.decompress(data).decode('utf-8'))
+        if not (isinstance(entry, list) and len(entry) == 2):
+            raise ValueError("malformed entry")
+        return validate_unity_yaml_tables(entry[0], entry[1], content_length)
+
+    def get(self, key, content_length=None):
+        """ Returns the cached result for key, or None (if missing, or if
+        the entry can't be decoded, see decode) """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            result = self.decode(data, content_length)
+        except (OSError, ValueError, TypeError, RecursionError, zlib.error):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # ie. a read-only cache
+        return result
+
+    def put(self, key, result):
+        path = self.get_path(key)
+        data = self.encode(result)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            replace_file_contents(path, data)
+        except OSError as e:
+            print("parse cache {}: can't write {}: {}".format(
+                self.root_dir, key, e))
+
+    def trim(self, max_size=None):
+        """ Removes entries for other parser versions, stale temp files, and
+        the least recently used entries until the cache is <= max_size
+        (default: self.max_size) bytes; returns the number removed """
+        import shutil
+        max_size = self.max_size if max_size is None else max_size
+        removed = 0
+        version = str(UNITY_ASSET_PARSER_VERSION)
+        try:
+            dirs = os.listdir(self.root_dir)
+        except OSError:
+            return 0
+        for name in dirs:
+            if name != version and name.isdigit():
+                shutil.rmtree(os.path.join(self.root_dir, name),
+                              ignore_errors=True)
+        entries, total_size = [], 0
+        now = time.time()
+        for dir_path, _, file_names in os.walk(self.version_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith('.tmp-'):
+                    if now - stat.st_mtime > self.STALE_TEMP_FILE_AGE:
+                        with contextlib.suppress(OSError):
+                            os.unlink(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+        if max_size is None:
+            return removed
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= max_size:
+                break
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+                removed += 1
+            total_size -= size
+        return removed
+
+
+class UnityJobExecutor:
+    """ Runs jobs on a serial, thread or process pool backend.
+
+    Use as a context manager (or call close()) to shut the pool down:
+
+        with UnityJobExecutor('process') as executor:
+            for result in executor.imap_unordered(fcn, jobs):
+                ...
+
+    max_workers: defaults to os.cpu_count()
+    chunksize: jobs sent to a worker at a time; defaults to an automatic
+        chunksize, capped per call (see imap_unordered)
+    serial_threshold: run fewer jobs than this in-process, rather than
+        paying pool startup / IPC costs
+    """
+    BACKENDS = ('serial', 'thread', 'process')
+
+    def __init__(self, backend='process', max_workers=None, chunksize=None,
+                 serial_threshold=4):
+        if backend not in self.BACKENDS:
+            raise Exception("Unsupported executor backend '{}' (expected one "
+                            "of {})".format(backend, self.BACKENDS))
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.serial_threshold = serial_threshold
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            if self.backend == 'process':
+                import multiprocessing as mp
+                self.pool = mp.Pool(self.max_workers)
+            else:
+                from multiprocessing.pool import ThreadPool
+                self.pool = ThreadPool(self.max_workers)
+        return self.pool
+
+    def get_chunksize(self, num_jobs, max_chunksize=None):
+        """ Splits jobs into ~4 chunks per worker (like Pool.map), capped
+        at max_chunksize, unless self.chunksize is set """
+        if self.chunksize is not None:
+            return self.chunksize
+        chunksize = -(-num_jobs // (self.max_workers * 4))
+        if max_chunksize is not None:
+            chunksize = min(chunksize, max_chunksize)
+        return max(1, chunksize)
+
+    def imap_unordered(self, fcn, jobs, max_chunksize=None):
+        """ Runs fcn(job) for each job, and generates results as they
+        finish (in any order) """
+        jobs = list(jobs)
+        if self.backend == 'serial' or len(jobs) < self.serial_threshold:
+            return map(fcn, jobs)
+        return self.get_pool().imap_unordered(
+            fcn, jobs, self.get_chunksize(len(jobs), max_chunksize))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def terminate(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
 
-def run_parallel(fcn, jobs):
-    global pool
-    if not pool:
-        import multiprocessing as mp
-        pool = mp.Pool(16)
-    return pool.map(fcn, jobs)
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
 
 
-def parallel_job_load_metafile(args):
-    asset = args
-    asset.load_metafile()
-    return asset
+def load_unity_meta_guid(path, stats=None, cache=None):
+    """ Loads (guid, fileFormatVersion) from the .meta file for asset `path`
+    (see UnityMetaFile.load); returns error, data.
 
+    stats: optional dict; gets read / parse seconds and bytes read
+    cache: unused (.meta headers are cheaper to read than to look up)
+    """
+    start_time = time.perf_counter()
+    metafile = UnityMetaFile(path + '.meta').load()
+    if stats is not None:
+        # the header scan is cheap enough to count as part of the read
+        stats['read'] = time.perf_counter() - start_time
+        stats['bytes'] = metafile.bytes_read
+    if metafile.error is not None:
+        return metafile.error, None
+    return None, (metafile.guid, metafile.data.get('fileFormatVersion'))
+
+
+def index_unity_yaml_tables(content, cache=None):
+    """ Returns (object index, ref table) for unity yaml content (see
+    index_unity_yaml_objects, scan_unity_yaml_refs); looks results up in /
+    adds them to cache (a UnityParseCache), if set """
+    if cache is not None:
+        key = cache.make_key(content)
+        result = cache.get(key, len(content))
+        if result is not None:
+            return result
+    index = index_unity_yaml_objects(content)
+    spans = {object_id: (object_type, start, end)
+             for object_id, object_type, _, start, end, _ in index}
+    result = index, tuple(scan_unity_yaml_refs(content, spans))
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def load_unity_yaml_tables(path, stats=None, cache=None):
+    """ Loads the object index (see index_unity_yaml_objects) + ref table
+    (see scan_unity_yaml_refs) for a unity .yaml file; returns error, data.
+
+    stats: optional dict; gets read / parse seconds and bytes read
+    cache: optional UnityParseCache
+    """
+    start_time = time.perf_counter()
+    file = UnityFile(path).load_unity_yaml()
+    read_time = time.perf_counter()
+    if stats is not None:
+        stats['read'] = read_time - start_time
+    if file.error is not None:
+        return file.error, None
+    content = file.data
+    result = index_unity_yaml_tables(content, cache)
+    if stats is not None:
+        stats['parse'] = time.perf_counter() - read_time
+        stats['bytes'] = len(content)
+    return None, result
+
+
+def parse_unity_yaml_objects(path, stats=None, cache=None,
+                             lazy_scalars=False, numeric_arrays=None):
+    """ load_unity_yaml_tables(), plus all objects parsed into a
+    UnityPropertyTable (see get_unity_property_parser for lazy_scalars /
+    numeric_arrays), for eager loads; returns error, (object index,
+    ref table, property table columns (see UnityPropertyTable.to_columns)).
+
+    Refs within the file come back with no guid (the worker doesn't know
+    it); see UnitySceneGraphObjectTable.set_properties.
+    """
+    start_time = time.perf_counter()
+    file = UnityFile(path).load_unity_yaml()
+    read_time = time.perf_counter()
+    if stats is not None:
+        stats['read'] = read_time - start_time
+    if file.error is not None:
+        return file.error, None
+    content = file.data
+    index, ref_table = index_unity_yaml_tables(content, cache)
+    parse_properties = get_unity_property_parser(
+        lazy_scalars=lazy_scalars, numeric_arrays=numeric_arrays)
+    properties = UnityPropertyTable(lazy_scalars=lazy_scalars)
+    for object_id, _, _, start, end, _ in index:
+        error, data = read_unity_yaml_object(content, start, end)
+        if error is not None:
+            return Exception("Failed to parse object {} in '{}': {}\n{}".format(
+                object_id, path, error, data)), None
+        properties.append_object(
+            object_id, parse_properties(data[1], UnityFileRef.parse_from))
+    if stats is not None:
+        stats['parse'] = time.perf_counter() - read_time
+        stats['bytes'] = len(content)
+    return None, (index, ref_table, properties.to_columns())
+
+
+JOB_LOAD_METAFILE = 'meta'
+JOB_LOAD_YAML_OBJECTS = 'yaml_objects'
+JOB_PARSE_YAML_OBJECTS = 'yaml_parsed'
+PARALLEL_JOB_LOADERS = {
+    JOB_LOAD_METAFILE: load_unity_meta_guid,
+    JOB_LOAD_YAML_OBJECTS: load_unity_yaml_tables,
+    JOB_PARSE_YAML_OBJECTS: parse_unity_yaml_objects,
+}
 
-def parallel_job_load_asset(asset):
-    asset.load()
-    return asset
+# UnityAssetDB.stats phase names
+PARALLEL_JOB_PHASES = {
+    JOB_LOAD_METAFILE: 'meta',
+    JOB_LOAD_YAML_OBJECTS: 'parse',
+    JOB_PARSE_YAML_OBJECTS: 'parse',
+}
+
+# max jobs per executor chunk: .meta reads are tiny, so batch them
+# aggressively; yaml files vary a lot in size, so keep chunks small
+# to balance load between workers
+PARALLEL_JOB_MAX_CHUNKSIZE = {
+    JOB_LOAD_METAFILE: 256,
+    JOB_LOAD_YAML_OBJECTS: 4,
+    JOB_PARSE_YAML_OBJECTS: 4,
+}
+
+
+def stat_job_file(path, kind):
+    """ Returns os.stat() of the file that a (path, kind) job reads, or None
+    if it can't be stat-ed """
+    try:
+        return os.stat(path + '.meta' if kind == JOB_LOAD_METAFILE else path)
+    except OSError:
+        return None
+
+
+def parallel_job_load(job):
+    """ Worker entry point: job is (asset path, kind, parse cache or None,
+    *loader specific args); returns (asset path, kind, error, result,
+    (read seconds, parse seconds, bytes)), where result is a flat tuple
+    from PARALLEL_JOB_LOADERS[kind] """
+    path, kind, cache = job[:3]
+    stats = {}
+    try:
+        error, result = PARALLEL_JOB_LOADERS[kind](path, stats, cache, *job[3:])
+    except Exception as e:
+        error, result = e, None
+    return path, kind, error, result, (
+        stats.get('read', 0.0), stats.get('parse', 0.0), stats.get('bytes', 0))
+
+
+def rewrite_unity_file_refs(job):
+    """ Worker entry point: job is (path, rewrites, dry_run); patches the
+    refs in one file (see patch_unity_refs), unless dry_run, and returns
+    (path, error, [(byte offset, line, old ref text, new ref text)]).
+    Files other than unity yaml / .meta files (ie. textures, binary
+    serialized assets) are skipped after reading their first bytes, and
+    files that don't contain any of the old guids (as lowercase hex, which
+    is what unity writes) without parsing. """
+    path, rewrites, dry_run = job
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(UNITY_YAML_FILE_HEADER))
+            if header != UNITY_YAML_FILE_HEADER.encode() and \
+                    not path.endswith('.meta'):
+                return path, None, []
+            data = header + f.read()
+        needles = {b'%032x' % guid for guid, _ in rewrites}
+        if not any(needle in data for needle in needles):
+            return path, None, []
+        patched, patches = patch_unity_refs(data, rewrites)
+        if patches and not dry_run:
+            replace_file_contents(
+                path, patched, mode=os.stat(path).st_mode & 0o7777)
+    except OSError as e:
+        return path, e, []
+    results, line, last = [], 1, 0
+    for offset, old, new in patches:
+        line += data.count(b'\n', last, offset)
+        last = offset
+        results.append((offset, line, old.decode(), new.decode()))
+    return path, None, results
+
+
+def rewrite_unity_refs_in_files(paths, rewrites, dry_run=False,
+                                executor=None):
+    """ Runs rewrite_unity_file_refs on paths in parallel (on executor, or a
+    temporary UnityJobExecutor); returns {path: patches} for the files that
+    have (or would have, if dry_run) been changed, and {path: error} """
+    rewrites = make_ref_rewrites(rewrites)
+    jobs = [(path, rewrites, dry_run) for path in paths]
+    changed, errors = {}, {}
+    job_executor = executor or UnityJobExecutor()
+    try:
+        for path, error, patches in job_executor.imap_unordered(
+                rewrite_unity_file_refs, jobs, max_chunksize=16):
+            if error is not None:
+                errors[path] = error
+            elif patches:
+                changed[path] = patches
+    finally:
+        if job_executor is not executor:
+            job_executor.close()
+    return changed, errors
 
 
 def split_file_path_name_ext(path):
@@ -737,11 +3933,254 @@ def split_file_path_name_ext(path):
     return base_path, name, ext
 
 
+def stat_dir_entry(entry):
+    """ Returns entry.stat(), or None if it can't be stat-ed (ie. it was
+    removed during the scan) """
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
+
+def scan_unity_project_dir(path):
+    """ Scans one directory (see scan_unity_project); returns (assets,
+    skipped paths, sub directory paths). A directory that can't be read
+    (ie. for lack of permissions) is skipped, like os.walk does """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return [], [path], []
+    names = {entry.name for entry in entries}
+    metas = {
+        entry.name[:-5]: entry for entry in entries
+        if entry.name.endswith('.meta')
+    }
+    assets, skipped, subdirs = [], [], []
+    for entry in entries:
+        name = entry.name
+        if name.endswith('.meta'):
+            # orphaned .meta files are still tracked as (missing) assets
+            if name[:-5] in names:
+                continue
+            name, entry, is_dir = name[:-5], None, False
+        else:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+        asset_path = os.path.join(path, name)
+        if is_dir:
+            asset_type = UnityDirectoryAsset
+            if not entry.is_symlink():
+                subdirs.append(asset_path)
+        else:
+            i = name.rfind('.')
+            asset_type = UNITY_ASSET_EXT_CLASSES.get(
+                name[i:] if i >= 0 else '', False)
+            if asset_type is False:
+                skipped.append(asset_path)
+                continue
+            elif asset_type is None:
+                continue
+        meta_entry = metas.get(name)
+        file_stat = stat_dir_entry(entry) \
+            if entry is not None and issubclass(asset_type, UnityAssetSceneGraph) \
+            else None
+        meta_stat = stat_dir_entry(meta_entry) \
+            if meta_entry is not None else None
+        assets.append((asset_path, asset_type, file_stat, meta_stat))
+    return assets, skipped, subdirs
+
+
+def scan_unity_project(root_dir, max_workers=None):
+    """ Walks root_dir with os.scandir, scanning directories in parallel (on
+    a thread pool of max_workers), and pairs assets with their .meta files.
+
+    Returns (batch, skipped): batch is a list of (asset path, asset type,
+    os.stat() of the asset file (scene graph assets only), os.stat() of its
+    .meta file) to insert with UnityAssetDB.add_scanned_assets(); stats are
+    None if unavailable. skipped lists files with unrecognized extensions,
+    and directories that couldn't be read.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+    batch, skipped = [], []
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = {executor.submit(scan_unity_project_dir, root_dir)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                assets, dir_skipped, subdirs = future.result()
+                batch += assets
+                skipped += dir_skipped
+                pending.update(
+                    executor.submit(scan_unity_project_dir, path)
+                    for path in subdirs)
+    return batch, skipped
+
+
 class EmptyTransactionLogger:
     def __init__(self):
         pass
 
 
+def snapshot_file_tree(root_dir):
+    """ Returns {path: (size, mtime_ns)} for all files + dirs under root_dir """
+    snapshot = {}
+    for path, dirs, files in os.walk(root_dir):
+        for name in dirs + files:
+            file_path = os.path.join(path, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+class PollingFileWatcher:
+    """ Portable file watcher: re-stats the whole tree every `interval`
+    second(s), and diffs it against the previous snapshot """
+
+    def __init__(self, root_dir, interval=1.0):
+        self.root_dir = root_dir
+        self.interval = interval
+        self.snapshot = snapshot_file_tree(root_dir)
+
+    def poll(self, timeout=None):
+        """ Waits up to timeout second(s) (forever if None) for changes, and
+        returns the set of paths that were added, removed or modified
+        (empty if nothing changed), or None if everything should be
+        rescanned """
+        stop_time = None if timeout is None else time.time() + timeout
+        while True:
+            delay = self.interval
+            if stop_time is not None:
+                delay = max(0, min(delay, stop_time - time.time()))
+            time.sleep(delay)
+            snapshot = snapshot_file_tree(self.root_dir)
+            changed = {
+                path for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed or (stop_time is not None and time.time() >= stop_time):
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyFileWatcher:
+    """ Linux file watcher, using inotify (through ctypes) with one watch
+    per directory under root_dir. See PollingFileWatcher.poll() """
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+        IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, root_dir):
+        import ctypes
+        import ctypes.util
+        self.root_dir = root_dir
+        self.libc = ctypes.CDLL(
+            ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.dirs_by_wd = {}
+        self.add_watches(root_dir)
+
+    def add_watches(self, root_dir):
+        """ Watches root_dir and all dirs below it; returns all paths below
+        root_dir """
+        paths = set()
+        for path, dirs, files in os.walk(root_dir):
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(path), self.WATCH_MASK)
+            if wd >= 0:
+                self.dirs_by_wd[wd] = path
+            paths.update(os.path.join(path, name) for name in dirs + files)
+        return paths
+
+    def read_events(self):
+        """ Generates (wd, mask, name) for all pending events """
+        import struct
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            i = 0
+            while i < len(buf):
+                wd, mask, _, size = struct.unpack_from('iIII', buf, i)
+                i += 16
+                name = buf[i:i + size].rstrip(b'\0')
+                i += size
+                yield wd, mask, os.fsdecode(name)
+
+    def poll(self, timeout=None):
+        import select
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        for wd, mask, name in self.read_events():
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            dir_path = self.dirs_by_wd.get(wd)
+            if dir_path is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self.dirs_by_wd[wd]
+                continue
+            if mask & self.IN_DELETE_SELF:
+                changed.add(dir_path)
+                continue
+            path = os.path.join(dir_path, name)
+            changed.add(path)
+            # files can land in a new dir before it's watched, so report
+            # everything below it
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                changed |= self.add_watches(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def make_file_watcher(root_dir, backend='auto', interval=1.0):
+    """ Returns a file watcher for root_dir; backend is 'inotify', 'poll', or
+    'auto' (inotify if available, otherwise poll) """
+    if backend in ('auto', 'inotify'):
+        import sys
+        try:
+            if sys.platform.startswith('linux'):
+                return InotifyFileWatcher(root_dir)
+            if backend == 'inotify':
+                raise OSError("inotify is only available on linux")
+        except (OSError, AttributeError) as e:
+            if backend == 'inotify':
+                raise
+            print("inotify unavailable ({}), falling back to polling".format(e))
+    return PollingFileWatcher(root_dir, interval=interval)
+
+
 class UnityFileSystemResponder:
     def __init__(self, db, transaction_logger=None):
         self.db = db
@@ -789,14 +4228,118 @@ class UnityFileSystemResponder:
         self.db.add_asset(UnityDirectoryAsset(path))
 
     def scan_all(self):
-        root_dir = self.db.root_dir
-        for path, dirs, files in os.walk(root_dir):
-            for file in files:
-                self.add_file(os.path.join(path, file))
-            for dir in dirs:
-                self.add_dir(os.path.join(path, dir))
+        start_time = time.time()
+        with self.db.timed_phase('walk'):
+            batch, skipped = scan_unity_project(self.db.root_dir)
+            self.db.add_scanned_assets(batch)
+        print("found {} asset(s) in {:0.2f} second(s); skipped {} path(s) "
+              "(unrecognized extensions, or unreadable directories)".format(
+                  len(batch), time.time() - start_time, len(skipped)))
         self.db.load_missing_metafiles()
         self.db.load_all()
+        self.db.prune_index()
+
+    def apply_changes(self, paths):
+        """ Applies a set of changed (added / removed / modified) file paths
+        to the db: removes deleted assets, adds new ones, and reloads the
+        .meta file and / or contents of modified assets.
+
+        Returns {'added': [...], 'removed': [...], 'updated': [...] assets,
+        'missing_refs': asset paths whose missing refs were recomputed}.
+        """
+        db = self.db
+        asset_paths, meta_changed, file_changed = set(), set(), set()
+        for path in paths:
+            if path.endswith('.meta'):
+                path = path[:-5]
+                meta_changed.add(path)
+            else:
+                file_changed.add(path)
+            if path.rstrip(os.sep) != db.root_dir.rstrip(os.sep):
+                asset_paths.add(path)
+
+        added, removed, updated = [], {}, []
+        for path in sorted(asset_paths):
+            asset = db.assets_by_path.get(path)
+            if not (os.path.exists(path) or os.path.exists(path + '.meta')):
+                if asset is None:
+                    continue
+                if asset.asset_type == UnityDirectoryAsset:
+                    # dirs moved out of the tree don't report their contents
+                    prefix = path + os.sep
+                    removed.update(
+                        (child_path, child) for child_path, child
+                        in db.assets_by_path.items()
+                        if child_path.startswith(prefix))
+                removed[path] = asset
+            elif asset is None:
+                if os.path.isdir(path):
+                    self.add_dir(path)
+                else:
+                    self.add_file(path)
+                if path in db.assets_by_path:
+                    added.append(db.assets_by_path[path])
+            else:
+                updated.append(asset)
+
+        removed = list(removed.values())
+        for asset in removed:
+            db.remove_asset(asset)
+
+        reload_meta = added + [
+            asset for asset in updated if asset.path in meta_changed]
+        for asset in reload_meta:
+            asset.metafile.data = None
+        if reload_meta:
+            db.run_asset_update_parallel(JOB_LOAD_METAFILE, reload_meta)
+        file_changed.update(asset.path for asset in added)
+        reload_file = [
+            asset for asset in added + updated
+            if asset.loadable and asset.path in file_changed
+        ]
+        if reload_file:
+            db.run_asset_update_parallel(JOB_LOAD_YAML_OBJECTS, reload_file)
+        db.prune_index()
+        return {
+            'added': added,
+            'removed': removed,
+            'updated': updated,
+            'missing_refs': db.refresh_missing_refs(),
+        }
+
+    def watch(self, watcher=None, debounce=0.5, max_delay=10.0, callback=None):
+        """ Watches root_dir (see make_file_watcher), and applies changes to
+        the db (see apply_changes) until interrupted.
+
+        Bursts of events (ie. a git checkout, or a unity reimport) are
+        debounced: changes are applied once no new events have arrived for
+        `debounce` second(s), or after at most `max_delay` second(s).
+        callback(changes) is called with the result of each apply_changes.
+        """
+        watcher = watcher or make_file_watcher(self.db.root_dir)
+        try:
+            while True:
+                changed = watcher.poll(None)
+                start_time = time.time()
+                while changed is not None:
+                    more = watcher.poll(debounce)
+                    if more is None:
+                        changed = None
+                    elif more:
+                        changed |= more
+                    if not more or time.time() - start_time >= max_delay:
+                        break
+                if changed is None:
+                    print("watcher overflowed, rescanning {}".format(
+                        self.db.root_dir))
+                    changed = set(snapshot_file_tree(self.db.root_dir))
+                    changed.update(self.db.assets_by_path)
+                if changed:
+                    changes = self.apply_changes(changed)
+                    if callback:
+                        callback(changes)
+        finally:
+            watcher.close()
 
 
 if __name__ == '__main__':
@@ -817,19 +4360,156 @@ if __name__ == '__main__':
         def removed_asset(self, asset):
             print("removed asset: '%s'" % asset.path)
 
-    import sys
-    root_dir = sys.argv[1] if len(
-        sys.argv) > 1 else '/Users/semery/projects/glitch-escape/Assets/'
-    db = UnityAssetDB(root_dir, logger=Logger())
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Scans a unity project's assets for missing references")
+    parser.add_argument(
+        'root_dir', nargs='?',
+        default='/Users/semery/projects/glitch-escape/Assets/')
+    parser.add_argument(
+        '--index', help="path to the persistent asset index "
+        "(default: <project>/Library/asset_db_index.sqlite)")
+    parser.add_argument(
+        '--no-index', action='store_true',
+        help="don't use (or write) a persistent asset index")
+    parser.add_argument(
+        '--report', help="write a missing ref report to this path "
+        "('-' for stdout), instead of printing a summary")
+    parser.add_argument(
+        '--report-format', choices=UnityMissingRefReport.FORMATS,
+        default='jsonl')
+    parser.add_argument(
+        '--summary-only', action='store_true',
+        help="only write per-asset / per-guid totals to the report")
+    parser.add_argument(
+        '--executor', choices=UnityJobExecutor.BACKENDS, default='process',
+        help="how to run file load jobs")
+    parser.add_argument(
+        '--workers', type=int, help="number of workers (default: cpu count)")
+    parser.add_argument(
+        '--chunksize', type=int,
+        help="jobs per worker batch (default: automatic)")
+    parser.add_argument(
+        '--parse-cache', help="content addressed parse cache dir; can be "
+        "shared between machines; only saves indexing in eager mode "
+        "(default: none)")
+    parser.add_argument(
+        '--parse-cache-size', type=float, default=1024,
+        help="max parse cache size, in MB")
+    parser.add_argument(
+        '--memory-budget', type=float,
+        help="max MB of parsed objects to keep in memory (default: unlimited)")
+    parser.add_argument(
+        '--stats', help="write scan stats (phase timings, slowest files, "
+        "object + ref counts) as JSON to this path")
+    parser.add_argument(
+        '--dependencies', metavar='ASSET', action='append', default=[],
+        help="print the (transitive) dependencies of an asset, and their "
+        "total size")
+    parser.add_argument(
+        '--find-type', metavar='TYPE', action='append', default=[],
+        help="list all objects of a unity class (name or typeid)")
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="keep running, and update missing refs as files change")
+    parser.add_argument(
+        '--watch-backend', choices=('auto', 'inotify', 'poll'),
+        default='auto')
+    parser.add_argument(
+        '--debounce', type=float, default=0.5,
+        help="seconds to wait for a burst of changes to settle (--watch)")
+    args = parser.parse_args()
+    root_dir = args.root_dir
+    index = None
+    if not args.no_index:
+        index = UnityAssetIndex(args.index or os.path.join(
+            os.path.dirname(os.path.abspath(root_dir)),
+            'Library', 'asset_db_index.sqlite'))
+    executor = UnityJobExecutor(
+        args.executor, max_workers=args.workers, chunksize=args.chunksize)
+    db = UnityAssetDB(root_dir, logger=Logger(), lazy=True, refs_only=True,
+                      index=index, executor=executor,
+                      memory_budget=int(args.memory_budget * 1048576)
+                      if args.memory_budget is not None else None,
+                      parse_cache=UnityParseCache(
+                          args.parse_cache,
+                          int(args.parse_cache_size * 1048576))
+                      if args.parse_cache else None)
     scanner = UnityFileSystemResponder(db)
-    scanner.scan_all()
+    if args.report == '-':
+        # keep stdout clean for the report
+        import contextlib
+        import sys
+        with contextlib.redirect_stdout(sys.stderr):
+            scanner.scan_all()
+    else:
+        scanner.scan_all()
     assets = {asset for asset in db.assets_by_path.values(
     ) if asset.asset_type != UnityDirectoryAsset}
     # for asset in assets:
     #     if asset.loadable:
     #         print(asset)
     # print("%d asset(s)" % len(assets))
-    db.summarize_missing_refs()
+    if args.report:
+        import sys
+        out = sys.stdout if args.report == '-' else \
+            open(args.report, 'w', newline='')
+        try:
+            totals = db.write_missing_ref_report(UnityMissingRefReport(
+                out, format=args.report_format,
+                summary_only=args.summary_only))
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print("{refs} missing ref(s) ({missing_assets} to missing assets, "
+              "{missing_objects} to missing objects) in {assets} asset(s)"
+              .format(**totals), file=sys.stderr)
+    else:
+        db.summarize_missing_refs()
+    for name in args.find_type:
+        unity_type = int(name) if name.lstrip('-').isdigit() else name
+        keys = list(db.iter_object_keys_by_type(unity_type))
+        print("{} object(s) of type {}:".format(len(keys), name))
+        for asset, object_id in keys:
+            print("  {} {} {}".format(
+                asset.path, asset.objects.types[object_id], object_id))
+    for path in args.dependencies:
+        asset = db.assets_by_path.get(os.path.join(root_dir, path)) or \
+            db.assets_by_path.get(path)
+        if asset is None:
+            print("{}: no such asset".format(path))
+            continue
+        graph = db.get_dependency_graph()
+        dependencies = graph.dependencies_of(asset)
+        print("{} depends on {} asset(s), {} byte(s) total:".format(
+            asset.path, len(dependencies), graph.closure_size(asset)))
+        for dependency in dependencies:
+            print("  {} ({} byte(s))".format(
+                dependency.path, graph.sizes[graph.ids[dependency.path]]))
+    if args.stats:
+        db.stats.dump(args.stats)
+
+    if args.watch:
+        def print_changes(changes):
+            print("{} added, {} removed, {} updated asset(s); "
+                  "rechecked {} asset(s)".format(
+                      len(changes['added']), len(changes['removed']),
+                      len(changes['updated']), len(changes['missing_refs'])))
+            for path in sorted(changes['missing_refs']):
+                print("  {}: {} missing ref(s)".format(
+                    path, len(db.missing_refs.get(path, ()))))
+            print("{} missing ref(s) in {} asset(s)".format(
+                sum(len(refs) for refs in db.missing_refs.values()),
+                len(db.missing_refs)))
+
+        print("watching {} for changes...".format(root_dir))
+        try:
+            scanner.watch(
+                watcher=make_file_watcher(root_dir, args.watch_backend),
+                debounce=args.debounce, callback=print_changes)
+        except KeyboardInterrupt:
+            pass
+    executor.close()
 
     # ASSET = "/Users/semery/projects/glitch-escape/Assets/GlitchEscape/Cutscenes/Cutscenes.prefab"
     # print(ASSET)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+""" Scan benchmark suite for asset_db.
+
+usage: benchmark_asset_db.py [<Assets dir>] [options]
+
+Times each phase of a full scan:
+    walk:      scan_unity_project + add_scanned_assets
+    meta:      load_missing_metafiles
+    load_all:  load_all
+    resolve:   resolve_refs on all refs
+    summarize: summarize_missing_refs (output discarded)
+and records peak RSS (of this process, and of its worker processes).
+
+With no Assets dir, benchmarks a synthetic project (see
+generate_unity_project.py), generated into a temp dir. By default the db is
+lazy + refs_only (nothing but indexes and ref tables are loaded); with
+--eager, load_all parses every object as well.
+
+Results are printed, and written as JSON with --output. With --baseline
+(a JSON file from a previous --output), each phase is compared against the
+baseline, and the script exits with status 1 if any phase (or peak RSS)
+regressed by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import contextlib
+from asset_db import UnityAssetDB, UnityJobExecutor, scan_unity_project, \
+    REF_MISSING_ASSET, REF_MISSING_OBJECT
+from generate_unity_project import generate_unity_project
+
+PHASES = ('walk', 'meta', 'load_all', 'resolve', 'summarize')
+
+# phases faster than this are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def get_peak_rss():
+    """ Returns (peak RSS of this process, peak RSS of the largest waited-for
+    child process), in bytes """
+    import resource
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+
+def benchmark_scan(root_dir, executor='process', workers=None, eager=False):
+    phases = {}
+    counts = {}
+
+    @contextlib.contextmanager
+    def phase(name):
+        start_time = time.perf_counter()
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        phases[name] = time.perf_counter() - start_time
+
+    with UnityJobExecutor(executor, max_workers=workers) as job_executor:
+        db = UnityAssetDB(root_dir, lazy=not eager, refs_only=not eager,
+                          executor=job_executor)
+        with phase('walk'):
+            batch, _ = scan_unity_project(root_dir)
+            db.add_scanned_assets(batch)
+        with phase('meta'):
+            db.load_missing_metafiles()
+        with phase('load_all'):
+            db.load_all()
+        with phase('resolve'):
+            resolved = db.resolve_refs(db.get_all_refs())
+        with phase('summarize'):
+            db.summarize_missing_refs()
+
+    counts['assets'] = len(db.assets_by_path)
+    counts['refs'] = sum(len(refs) for refs in resolved.values())
+    counts['missing_refs'] = \
+        len(resolved[REF_MISSING_ASSET]) + len(resolved[REF_MISSING_OBJECT])
+    peak_rss, peak_child_rss = get_peak_rss()
+    return {
+        'phases': phases,
+        'total': sum(phases.values()),
+        'peak_rss': peak_rss,
+        'peak_child_rss': peak_child_rss,
+        'counts': counts,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """ Prints a comparison of results vs baseline; returns a list of
+    regressions """
+    regressions = []
+    print("vs. baseline (tolerance {:0.0f}%):".format(tolerance * 100))
+    for name in PHASES + ('total',):
+        if name == 'total':
+            current, previous = results['total'], baseline.get('total')
+        else:
+            current = results['phases'].get(name)
+            previous = baseline.get('phases', {}).get(name)
+        if current is None or not previous:
+            continue
+        ratio = current / previous
+        regressed = ratio > 1 + tolerance and \
+            current - previous > MIN_REGRESSION_SECONDS
+        print("  {:10s} {:8.3f}s vs {:8.3f}s  {:0.2f}x{}".format(
+            name, current, previous, ratio, '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    if baseline.get('peak_rss'):
+        ratio = results['peak_rss'] / float(baseline['peak_rss'])
+        regressed = ratio > 1 + tolerance
+        print("  {:10s} {:8.1f}MB vs {:7.1f}MB  {:0.2f}x{}".format(
+            'peak_rss', results['peak_rss'] / 1048576.0,
+            baseline['peak_rss'] / 1048576.0, ratio,
+            '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append('peak_rss')
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="asset_db scan benchmarks")
+    parser.add_argument('root_dir', nargs='?',
+                        help="Assets dir (default: a synthetic project)")
+    parser.add_argument('--output', help="write JSON results to this path")
+    parser.add_argument('--baseline', help="compare against these results")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--executor', choices=UnityJobExecutor.BACKENDS,
+                        default='process')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--eager', action='store_true',
+                        help="parse all objects in load_all")
+    parser.add_argument('--prefabs', type=int, default=500)
+    parser.add_argument('--scenes', type=int, default=20)
+    parser.add_argument('--materials', type=int, default=200)
+    parser.add_argument('--objects-per-file', type=int, default=100)
+    parser.add_argument('--ref-density', type=float, default=0.5)
+    parser.add_argument('--broken-ratio', type=float, default=0.01)
+    parser.add_argument('--large-files', type=int, default=4)
+    args = parser.parse_args()
+
+    temp_dir = None
+    project = {'root_dir': args.root_dir}
+    if args.root_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='asset_db_benchmark_')
+        project = generate_unity_project(
+            temp_dir, prefabs=args.prefabs, scenes=args.scenes,
+            materials=args.materials, objects_per_file=args.objects_per_file,
+            ref_density=args.ref_density, broken_ratio=args.broken_ratio,
+            large_files=args.large_files)
+        root_dir = os.path.join(temp_dir, 'Assets')
+    else:
+        root_dir = args.root_dir
+    try:
+        results = benchmark_scan(
+            root_dir, executor=args.executor, workers=args.workers,
+            eager=args.eager)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+    results['project'] = project
+    results['executor'] = args.executor
+    results['eager'] = args.eager
+
+    print("{assets} asset(s), {refs} ref(s), {missing_refs} missing".format(
+        **results['counts']))
+    for name in PHASES:
+        print("  {:10s} {:8.3f}s".format(name, results['phases'][name]))
+    print("  {:10s} {:8.3f}s".format('total', results['total']))
+    print("  peak RSS {:0.1f}MB (workers: {:0.1f}MB)".format(
+        results['peak_rss'] / 1048576.0, results['peak_child_rss'] / 1048576.0))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if compare_to_baseline(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+""" Memory benchmark for the asset_db object model.
+
+usage: benchmark_memory.py [<num objects>]
+
+Builds <num objects> (default 100k) scene graph objects, each with an
+object type, an object ref and a few property refs, and reports the memory
+used per 100k objects for:
+    before: dict-backed instances, with a fresh UnityType per object and a
+        `db` stored on every ref (the old object model)
+    after:  the current (__slots__ based, interned UnityType) object model
+
+Each variant runs in its own subprocess, so that resident size (RSS) deltas
+aren't polluted by the other run.
+"""
+import os
+import sys
+import subprocess
+import tracemalloc
+from asset_db import UnityFileRef, UnityType, UnitySceneGraphObject, \
+    UnityPropertyReference
+
+TYPE_NAMES = [
+    ('GameObject', 1), ('Transform', 4), ('MonoBehaviour', 114),
+    ('MeshRenderer', 23), ('MeshFilter', 33), ('BoxCollider', 65),
+]
+REFS_PER_OBJECT = 3
+
+
+class DictUnityFileRef(UnityFileRef):
+    pass
+
+
+class DictUnityType:
+    def __init__(self, name, typeid):
+        self.name = name
+        self.typeid = int(typeid)
+
+
+class DictUnitySceneGraphObject(UnitySceneGraphObject):
+    pass
+
+
+class DictUnityPropertyReference(UnityPropertyReference):
+    pass
+
+
+class FakeAsset:
+    def __init__(self):
+        self.db = None
+        self.guid = 0x0d000000000000000000000000000001
+
+
+def build_objects(variant, num_objects):
+    asset = FakeAsset()
+    if variant == 'before':
+        ref_type, object_type, obj_type, prop_ref_type = \
+            DictUnityFileRef, DictUnityType, DictUnitySceneGraphObject, \
+            DictUnityPropertyReference
+    else:
+        ref_type, object_type, obj_type, prop_ref_type = \
+            UnityFileRef, UnityType, UnitySceneGraphObject, \
+            UnityPropertyReference
+
+    def make_ref(fileid):
+        ref = ref_type(asset=asset, guid=asset.guid, fileid=fileid)
+        if variant == 'before':
+            ref.__dict__['db'] = asset.db
+        return ref
+
+    objects, refs = [], []
+    for i in range(num_objects):
+        name, typeid = TYPE_NAMES[i % len(TYPE_NAMES)]
+        obj = obj_type(
+            asset=asset,
+            ref=make_ref(i + 1),
+            object_type=object_type(name, typeid),
+            rows=None)
+        for j in range(REFS_PER_OBJECT):
+            refs.append(prop_ref_type(
+                asset, i + 1, 'm_Ref', make_ref(i + j + 2), obj=obj))
+        objects.append(obj)
+    return objects, refs
+
+
+def get_rss():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def run_variant(variant, num_objects):
+    rss_start = get_rss()
+    tracemalloc.start()
+    result = build_objects(variant, num_objects)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_stop = get_rss()
+    rss = rss_stop - rss_start if rss_start is not None else -1
+    print(allocated, rss)
+    return result
+
+
+def format_mb(num_bytes):
+    return '{:0.1f} MB'.format(num_bytes / (1024.0 * 1024.0))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--variant':
+        run_variant(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    scale = 100000.0 / num_objects
+    print("{} object(s) with {} ref(s) each; memory per 100k objects:".format(
+        num_objects, REFS_PER_OBJECT))
+    results = {}
+    for variant in ('before', 'after'):
+        output = subprocess.check_output([
+            sys.executable, os.path.abspath(__file__),
+            '--variant', variant, str(num_objects)
+        ], cwd=os.path.dirname(os.path.abspath(__file__)))
+        allocated, rss = map(int, output.split())
+        results[variant] = allocated
+        print("  {:6s}  allocated {:>9s}  resident {:>9s}".format(
+            variant, format_mb(allocated * scale),
+            format_mb(rss * scale) if rss >= 0 else 'n/a'))
+    print("  after / before: {:0.2f}".format(
+        results['after'] / float(results['before'])))
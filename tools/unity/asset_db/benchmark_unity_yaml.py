@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+""" Throughput benchmark: unity yaml fast path vs. pyYAML (CBaseLoader).
+
+usage: benchmark_unity_yaml.py [<file.unity|.prefab|.mat> ...]
+
+With no arguments, benchmarks a synthetic scene. Checks that both paths
+produce identical objects before timing them.
+"""
+import sys
+import time
+from asset_db import read_unity_yaml_objects, find_unity_yaml_document_spans, \
+    parse_unity_yaml_document, UnityYamlFastPathError
+
+
+SYNTHETIC_OBJECT = """--- !u!1 &{id0}
+GameObject:
+  m_ObjectHideFlags: 0
+  serializedVersion: 6
+  m_Component:
+  - component: {{fileID: {id1}}}
+  - component: {{fileID: {id2}}}
+  m_Layer: 0
+  m_Name: Object {i}
+  m_TagString: Untagged
+  m_IsActive: 1
+--- !u!4 &{id1}
+Transform:
+  m_ObjectHideFlags: 0
+  m_GameObject: {{fileID: {id0}}}
+  m_LocalRotation: {{x: 0, y: 0, z: 0, w: 1}}
+  m_LocalPosition: {{x: {i}, y: 0.5, z: -1.25}}
+  m_LocalScale: {{x: 1, y: 1, z: 1}}
+  m_Children: []
+  m_Father: {{fileID: 0}}
+  m_RootOrder: {i}
+--- !u!114 &{id2}
+MonoBehaviour:
+  m_ObjectHideFlags: 0
+  m_GameObject: {{fileID: {id0}}}
+  m_Enabled: 1
+  m_Script: {{fileID: 11500000, guid: 0bcdef0123456789abcdef0123456789, type: 3}}
+  m_Name:
+  m_Targets:
+  - {{fileID: {id1}}}
+  - {{fileID: 2100000, guid: 0c000000000000000000000000000001, type: 2}}
+  m_Curve:
+    serializedVersion: 2
+    m_Curve:
+    - serializedVersion: 3
+      time: 0
+      value: 1
+    - serializedVersion: 3
+      time: 1
+      value: 0
+"""
+
+
+def make_synthetic_scene(num_objects):
+    header = '%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n'
+    return header + ''.join([
+        SYNTHETIC_OBJECT.format(i=i, id0=i * 10 + 1, id1=i * 10 + 2, id2=i * 10 + 3)
+        for i in range(num_objects // 3)
+    ])
+
+
+def benchmark(name, content, repeat=3):
+    spans = list(find_unity_yaml_document_spans(content))
+    fallbacks = 0
+    for _, _, start, end, _ in spans:
+        try:
+            parse_unity_yaml_document(content, start, end)
+        except UnityYamlFastPathError:
+            fallbacks += 1
+
+    fast_result = read_unity_yaml_objects(content, fast=True)
+    slow_result = read_unity_yaml_objects(content, fast=False)
+    if fast_result != slow_result:
+        print("{}: fast path and CBaseLoader results differ!".format(name))
+        return
+
+    def time_it(fast):
+        best = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            read_unity_yaml_objects(content, fast=fast)
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    fast_time, slow_time = time_it(True), time_it(False)
+    size_mb = len(content) / (1024.0 * 1024.0)
+    print("{}: {} object(s), {:0.2f} MB, {} fast path fallback(s)".format(
+        name, len(spans), size_mb, fallbacks))
+    print("  CBaseLoader: {:0.3f} second(s), {:0.2f} MB/s, {:0.0f} objects/s".format(
+        slow_time, size_mb / slow_time, len(spans) / slow_time))
+    print("  fast path:   {:0.3f} second(s), {:0.2f} MB/s, {:0.0f} objects/s ({:0.1f}x)".format(
+        fast_time, size_mb / fast_time, len(spans) / fast_time, slow_time / fast_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, 'r') as f:
+                benchmark(path, f.read())
+    else:
+        benchmark('synthetic scene', make_synthetic_scene(30000))
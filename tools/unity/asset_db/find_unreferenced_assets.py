@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+""" Finds assets that nothing in a unity project references.
+
+usage: find_unreferenced_assets.py <Assets dir> [options]
+
+Scans the project, then runs one reachability pass over the asset
+dependency graph (see UnityDependencyGraph) from a set of roots:
+by default, all scenes plus everything under Resources / StreamingAssets
+(see UnityAssetDB.get_default_roots), or the assets given with --root /
+--roots-file. Reports every other asset (except directories, and scripts
+unless --include-scripts), grouped by directory, with on-disk sizes.
+
+Assets whose refs couldn't be read (ie. binary serialized .asset files) are
+listed separately, as not analyzed: anything that only they reference is
+reported as unreferenced as well.
+"""
+import os
+import sys
+import json
+import contextlib
+from asset_db import UnityAssetDB, UnityFileSystemResponder, \
+    UnityJobExecutor, UnityAssetIndex, UnityParseCache
+
+
+def group_by_directory(unreferenced, root_dir):
+    """ Returns [(dir, total bytes, [(path, bytes)])], largest dirs first """
+    dirs = {}
+    for asset, size in unreferenced:
+        path = os.path.relpath(asset.path, root_dir)
+        dirs.setdefault(os.path.dirname(path), []).append((path, size))
+    groups = [
+        (dir_path, sum(size for _, size in files), sorted(files))
+        for dir_path, files in dirs.items()
+    ]
+    groups.sort(key=lambda group: (-group[1], group[0]))
+    return groups
+
+
+def format_size(num_bytes):
+    if num_bytes < 1024:
+        return '{} B'.format(num_bytes)
+    if num_bytes < 1024 * 1024:
+        return '{:0.1f} KB'.format(num_bytes / 1024.0)
+    return '{:0.1f} MB'.format(num_bytes / (1024.0 * 1024.0))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Lists assets that aren't reachable from any root")
+    parser.add_argument('root_dir', help="Assets dir")
+    parser.add_argument(
+        '--root', action='append', default=[],
+        help="root asset path (relative to root_dir); replaces the default "
+        "roots (scenes + Resources)")
+    parser.add_argument(
+        '--roots-file', help="file with one root asset path per line")
+    parser.add_argument('--include-scripts', action='store_true')
+    parser.add_argument(
+        '--json', action='store_true', help="print results as JSON")
+    parser.add_argument(
+        '--index', help="path to the persistent asset index "
+        "(default: <project>/Library/asset_db_index.sqlite)")
+    parser.add_argument('--no-index', action='store_true')
+    parser.add_argument('--parse-cache', help="parse cache dir")
+    parser.add_argument(
+        '--executor', choices=UnityJobExecutor.BACKENDS, default='process')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    root_dir = args.root_dir
+
+    index = None
+    if not args.no_index:
+        index = UnityAssetIndex(args.index or os.path.join(
+            os.path.dirname(os.path.abspath(root_dir)),
+            'Library', 'asset_db_index.sqlite'))
+    with UnityJobExecutor(args.executor, max_workers=args.workers) as executor:
+        db = UnityAssetDB(
+            root_dir, lazy=True, refs_only=True, index=index,
+            executor=executor,
+            parse_cache=UnityParseCache(args.parse_cache)
+            if args.parse_cache else None)
+        with contextlib.redirect_stdout(sys.stderr):
+            UnityFileSystemResponder(db).scan_all()
+
+    root_paths = list(args.root)
+    if args.roots_file:
+        with open(args.roots_file, 'r') as f:
+            root_paths += [line.strip() for line in f if line.strip()]
+    roots = None
+    if root_paths:
+        roots = []
+        for path in root_paths:
+            asset = db.assets_by_path.get(os.path.join(root_dir, path)) or \
+                db.assets_by_path.get(path)
+            if asset is None:
+                print("unknown root asset '{}'".format(path), file=sys.stderr)
+                sys.exit(1)
+            roots.append(asset)
+
+    unreferenced = db.find_unreferenced_assets(
+        roots, include_scripts=args.include_scripts)
+    unanalyzed = db.find_unanalyzed_assets()
+    groups = group_by_directory(unreferenced, root_dir)
+    total_size = sum(size for _, size in unreferenced)
+    if args.json:
+        json.dump({
+            'assets': len(unreferenced),
+            'bytes': total_size,
+            'dirs': [
+                {'dir': dir_path, 'bytes': size, 'files': [
+                    {'path': path, 'bytes': file_size}
+                    for path, file_size in files
+                ]}
+                for dir_path, size, files in groups
+            ],
+            'not_analyzed': [
+                {'path': os.path.relpath(asset.path, root_dir),
+                 'bytes': size, 'error': str(asset.file.error)}
+                for asset, size in sorted(
+                    unanalyzed, key=lambda item: item[0].path)
+            ],
+        }, sys.stdout, indent=2)
+        print()
+    else:
+        for dir_path, size, files in groups:
+            print("{}/ ({} file(s), {})".format(
+                dir_path or '.', len(files), format_size(size)))
+            for path, file_size in files:
+                print("  {} ({})".format(
+                    os.path.basename(path), format_size(file_size)))
+        print("{} unreferenced asset(s), {} total".format(
+            len(unreferenced), format_size(total_size)))
+        if unanalyzed:
+            print("not analyzed ({} asset(s) whose refs couldn't be read; "
+                  "anything only they reference is listed above):".format(
+                      len(unanalyzed)))
+            for asset, size in sorted(
+                    unanalyzed, key=lambda item: item[0].path):
+                print("  {} ({})".format(
+                    os.path.relpath(asset.path, root_dir), format_size(size)))
+    if index is not None:
+        index.close()
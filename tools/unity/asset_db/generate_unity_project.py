@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+""" Generates a synthetic unity project (Assets tree), for benchmarking.
+
+usage: generate_unity_project.py <output dir> [options]
+
+Writes <output dir>/Assets with prefabs, scenes and materials (unity yaml),
+plus textures, scripts and large binary-like files, all with .meta files.
+
+Objects reference other objects in the same file, and (with probability
+--ref-density per object) materials, textures, scripts and prefabs in
+other files. A fraction (--broken-ratio) of those external refs point at
+missing guids / fileIDs, so the number of missing refs is known up front
+(and is reported in the returned / printed manifest).
+"""
+import os
+import random
+
+UNITY_YAML_HEADER = '%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n'
+
+GAME_OBJECT = """--- !u!1 &{id}
+GameObject:
+  m_ObjectHideFlags: 0
+  serializedVersion: 6
+  m_Component:
+  - component: {{fileID: {transform_id}}}
+  - component: {{fileID: {behaviour_id}}}
+  m_Layer: 0
+  m_Name: Object {i}
+  m_TagString: Untagged
+  m_IsActive: 1
+--- !u!4 &{transform_id}
+Transform:
+  m_ObjectHideFlags: 0
+  m_GameObject: {{fileID: {id}}}
+  m_LocalRotation: {{x: 0, y: 0, z: 0, w: 1}}
+  m_LocalPosition: {{x: {i}, y: 0.5, z: -1.25}}
+  m_LocalScale: {{x: 1, y: 1, z: 1}}
+  m_Children: []
+  m_Father: {{fileID: {father_id}}}
+  m_RootOrder: {i}
+--- !u!114 &{behaviour_id}
+MonoBehaviour:
+  m_ObjectHideFlags: 0
+  m_GameObject: {{fileID: {id}}}
+  m_Enabled: 1
+  m_Script: {script}
+  m_Name:
+  m_Targets:
+{targets}  m_Curve:
+    serializedVersion: 2
+    m_Curve:
+    - serializedVersion: 3
+      time: 0
+      value: 1
+    - serializedVersion: 3
+      time: 1
+      value: 0
+"""
+
+MATERIAL = """--- !u!21 &2100000
+Material:
+  serializedVersion: 6
+  m_ObjectHideFlags: 0
+  m_Name: {name}
+  m_Shader: {{fileID: 46, guid: 0000000000000000f000000000000000, type: 0}}
+  m_SavedProperties:
+    serializedVersion: 3
+    m_TexEnvs:
+    - _MainTex:
+        m_Texture: {texture}
+        m_Scale: {{x: 1, y: 1}}
+        m_Offset: {{x: 0, y: 0}}
+    m_Floats:
+    - _Glossiness: 0.5
+    m_Colors:
+    - _Color: {{r: 1, g: 1, b: 1, a: 1}}
+"""
+
+META = """fileFormatVersion: 2
+guid: {guid}
+{importer}:
+  externalObjects: {{}}
+  userData:
+  assetBundleName:
+  assetBundleVariant:
+"""
+
+
+class UnityProjectGenerator:
+    def __init__(self, root_dir, seed=0, ref_density=0.5, broken_ratio=0.01):
+        self.root_dir = root_dir
+        self.assets_dir = os.path.join(root_dir, 'Assets')
+        self.random = random.Random(seed)
+        self.ref_density = ref_density
+        self.broken_ratio = broken_ratio
+        self.next_guid = 1
+        self.targets = []   # (guid, fileID) of existing, referencable objects
+        self.manifest = {
+            'files': 0, 'bytes': 0, 'objects': 0, 'refs': 0,
+            'broken_refs': 0,
+        }
+
+    def make_guid(self):
+        guid = '%032x' % (0xa55e7000000000000000000000000000 + self.next_guid)
+        self.next_guid += 1
+        return guid
+
+    def write_file(self, path, data, guid=None, importer='DefaultImporter'):
+        """ Writes an asset (or dir, if data is None) + its .meta file """
+        guid = guid or self.make_guid()
+        if data is None:
+            os.makedirs(path, exist_ok=True)
+        else:
+            with open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+                f.write(data)
+            self.manifest['files'] += 1
+            self.manifest['bytes'] += len(data)
+        with open(path + '.meta', 'w') as f:
+            f.write(META.format(guid=guid, importer=importer))
+        return guid
+
+    def make_dir(self, name):
+        path = os.path.join(self.assets_dir, name)
+        self.write_file(path, None, importer='DefaultImporter')
+        return path
+
+    def make_ref(self, guid, file_id, ref_type=2):
+        self.manifest['refs'] += 1
+        return '{{fileID: {}, guid: {}, type: {}}}'.format(
+            file_id, guid, ref_type)
+
+    def make_external_ref(self):
+        """ Returns a ref to a random existing target, or (with probability
+        broken_ratio) a broken one """
+        if not self.targets:
+            return '{fileID: 0}'
+        guid, file_id = self.random.choice(self.targets)
+        if self.random.random() < self.broken_ratio:
+            self.manifest['broken_refs'] += 1
+            if self.random.random() < 0.5:
+                guid = 'dead%028x' % self.random.getrandbits(112)
+            else:
+                file_id += 7
+        return self.make_ref(guid, file_id)
+
+    def make_unity_yaml(self, objects_per_file, script_guids):
+        parts = [UNITY_YAML_HEADER]
+        for i in range(objects_per_file):
+            object_id = (i + 1) * 10
+            targets = ['  - {{fileID: {}}}\n'.format(object_id + 1)]
+            # m_Component x2, m_GameObject x2, m_Targets[0], m_Father
+            self.manifest['refs'] += 6 if i > 0 else 5
+            if self.random.random() < self.ref_density:
+                targets.append('  - {}\n'.format(self.make_external_ref()))
+            parts.append(GAME_OBJECT.format(
+                i=i, id=object_id, transform_id=object_id + 1,
+                behaviour_id=object_id + 2,
+                father_id=object_id - 9 if i > 0 else 0,
+                script=self.make_ref(
+                    self.random.choice(script_guids), 11500000, 3),
+                targets=''.join(targets)))
+            self.manifest['objects'] += 3
+        return ''.join(parts)
+
+    def generate(self, prefabs=100, scenes=10, materials=50, textures=50,
+                 scripts=20, objects_per_file=50, large_files=2,
+                 large_file_size=8 * 1024 * 1024):
+        os.makedirs(self.assets_dir, exist_ok=True)
+        dirs = {name: self.make_dir(name) for name in (
+            'Scripts', 'Textures', 'Materials', 'Prefabs', 'Scenes', 'Models')}
+
+        script_guids = [
+            self.write_file(
+                os.path.join(dirs['Scripts'], 'Script%d.cs' % i),
+                'public class Script%d : UnityEngine.MonoBehaviour {}\n' % i,
+                importer='MonoImporter')
+            for i in range(scripts)
+        ]
+        for i in range(textures):
+            guid = self.write_file(
+                os.path.join(dirs['Textures'], 'Texture%d.png' % i),
+                bytes(self.random.getrandbits(8) for _ in range(256)),
+                importer='TextureImporter')
+            self.targets.append((guid, 2800000))
+        for i in range(materials):
+            name = 'Material%d' % i
+            guid = self.write_file(
+                os.path.join(dirs['Materials'], name + '.mat'),
+                UNITY_YAML_HEADER + MATERIAL.format(
+                    name=name, texture=self.make_external_ref()),
+                importer='NativeFormatImporter')
+            self.targets.append((guid, 2100000))
+            self.manifest['objects'] += 1
+            self.manifest['refs'] += 1  # m_Shader
+        for i in range(prefabs):
+            guid = self.write_file(
+                os.path.join(dirs['Prefabs'], 'Prefab%d.prefab' % i),
+                self.make_unity_yaml(objects_per_file, script_guids),
+                importer='PrefabImporter')
+            self.targets.append((guid, 10))
+        for i in range(scenes):
+            self.write_file(
+                os.path.join(dirs['Scenes'], 'Scene%d.unity' % i),
+                self.make_unity_yaml(objects_per_file, script_guids),
+                importer='DefaultImporter')
+        for i in range(large_files):
+            # binary-like (random, incompressible) model files
+            self.write_file(
+                os.path.join(dirs['Models'], 'Model%d.fbx' % i),
+                os.urandom(large_file_size), importer='ModelImporter')
+        return self.manifest
+
+
+def generate_unity_project(root_dir, seed=0, ref_density=0.5,
+                           broken_ratio=0.01, **kwargs):
+    """ Generates a synthetic project in root_dir (see
+    UnityProjectGenerator.generate for kwargs); returns a manifest of
+    file / object / ref counts """
+    return UnityProjectGenerator(
+        root_dir, seed=seed, ref_density=ref_density,
+        broken_ratio=broken_ratio).generate(**kwargs)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(
+        description="Generates a synthetic unity project, for benchmarks")
+    parser.add_argument('root_dir')
+    parser.add_argument('--prefabs', type=int, default=100)
+    parser.add_argument('--scenes', type=int, default=10)
+    parser.add_argument('--materials', type=int, default=50)
+    parser.add_argument('--textures', type=int, default=50)
+    parser.add_argument('--scripts', type=int, default=20)
+    parser.add_argument('--objects-per-file', type=int, default=50)
+    parser.add_argument('--ref-density', type=float, default=0.5,
+                        help="probability of an external ref per object")
+    parser.add_argument('--broken-ratio', type=float, default=0.01,
+                        help="fraction of external refs that are broken")
+    parser.add_argument('--large-files', type=int, default=2)
+    parser.add_argument('--large-file-size', type=int, default=8 * 1024 * 1024)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    manifest = generate_unity_project(
+        args.root_dir, seed=args.seed, ref_density=args.ref_density,
+        broken_ratio=args.broken_ratio, prefabs=args.prefabs,
+        scenes=args.scenes, materials=args.materials, textures=args.textures,
+        scripts=args.scripts, objects_per_file=args.objects_per_file,
+        large_files=args.large_files, large_file_size=args.large_file_size)
+    print(json.dumps(manifest, indent=2))
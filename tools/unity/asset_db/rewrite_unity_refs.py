@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+""" Retargets references to moved / replaced assets across a unity project.
+
+usage: rewrite_unity_refs.py <Assets dir> --map OLD=NEW [...] [options]
+
+OLD / NEW are <guid> (all refs to an asset; fileIDs are kept) or
+<guid>:<fileID> (refs to one object). Every matching
+{fileID: ..., guid: ..., type: ...} is patched in place, byte for byte
+(see patch_unity_refs); files are never re-serialized, and are replaced
+atomically.
+
+By default, the project is scanned first, and only files that the reverse
+ref index says reference an old guid are touched (see
+UnityAssetDB.rewrite_refs). With --prefilter-only, the scan is skipped,
+and every unity yaml file (whatever its extension; other files are skipped
+by their header) is checked with a raw text search for the old guids
+instead. --dry-run prints the patches without writing anything.
+"""
+import os
+import sys
+import contextlib
+from asset_db import UnityAssetDB, UnityFileSystemResponder, \
+    UnityJobExecutor, UnityAssetIndex, UnityDirectoryAsset, \
+    UNITY_META_GUID, scan_unity_project, rewrite_unity_refs_in_files
+
+
+def parse_ref(text):
+    """ Parses '<guid>' or '<guid>:<fileID>' into (guid, fileID or None) """
+    guid, _, file_id = text.strip().partition(':')
+    if not UNITY_META_GUID.match(guid) or (
+            file_id and not file_id.lstrip('-').isdigit()):
+        raise ValueError("invalid ref '{}' (expected <guid>[:<fileID>])"
+                         .format(text))
+    return guid, int(file_id) if file_id else None
+
+
+def parse_rewrite(text):
+    old, sep, new = text.partition('=')
+    if not sep:
+        raise ValueError("invalid mapping '{}' (expected OLD=NEW)".format(text))
+    return parse_ref(old), parse_ref(new)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Retargets (guid, fileID) refs across a unity project")
+    parser.add_argument('root_dir', help="Assets dir")
+    parser.add_argument(
+        '--map', action='append', default=[], metavar='OLD=NEW',
+        help="<guid>[:<fileID>]=<guid>[:<fileID>]")
+    parser.add_argument(
+        '--map-file', help="file with one OLD=NEW mapping per line")
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help="print the refs that would be changed, but don't change them")
+    parser.add_argument(
+        '--include-meta', action='store_true',
+        help="also rewrite refs in .meta files (ie. importer remaps)")
+    parser.add_argument(
+        '--prefilter-only', action='store_true',
+        help="don't scan the project; text search every unity yaml file")
+    parser.add_argument(
+        '--index', help="path to the persistent asset index "
+        "(default: <project>/Library/asset_db_index.sqlite)")
+    parser.add_argument('--no-index', action='store_true')
+    parser.add_argument(
+        '--executor', choices=UnityJobExecutor.BACKENDS, default='process')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    root_dir = args.root_dir
+
+    lines = list(args.map)
+    if args.map_file:
+        with open(args.map_file, 'r') as f:
+            lines += [
+                line.strip() for line in f
+                if line.strip() and not line.startswith('#')
+            ]
+    try:
+        rewrites = dict(parse_rewrite(line) for line in lines)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if not rewrites:
+        print("nothing to rewrite (use --map or --map-file)", file=sys.stderr)
+        sys.exit(1)
+
+    index = None
+    with UnityJobExecutor(args.executor, max_workers=args.workers) as executor:
+        if args.prefilter_only:
+            batch, _ = scan_unity_project(root_dir)
+            paths = [
+                path for path, asset_type, _, _ in batch
+                if asset_type != UnityDirectoryAsset
+            ]
+            if args.include_meta:
+                paths += [path + '.meta' for path, _, _, _ in batch]
+            changed, errors = rewrite_unity_refs_in_files(
+                paths, rewrites, dry_run=args.dry_run, executor=executor)
+        else:
+            if not args.no_index:
+                index = UnityAssetIndex(args.index or os.path.join(
+                    os.path.dirname(os.path.abspath(root_dir)),
+                    'Library', 'asset_db_index.sqlite'))
+            db = UnityAssetDB(root_dir, lazy=True, refs_only=True,
+                              index=index, executor=executor)
+            with contextlib.redirect_stdout(sys.stderr):
+                UnityFileSystemResponder(db).scan_all()
+            changed, errors = db.rewrite_refs(
+                rewrites, dry_run=args.dry_run, include_meta=args.include_meta)
+
+    for path in sorted(changed):
+        for offset, line, old, new in changed[path]:
+            print("{}:{}: {} => {}".format(
+                os.path.relpath(path, root_dir), line,
+                ' '.join(old.split()), ' '.join(new.split())))
+    for path in sorted(errors):
+        print("{}: {}".format(path, errors[path]), file=sys.stderr)
+    print("{} ref(s) in {} file(s) {}".format(
+        sum(len(patches) for patches in changed.values()), len(changed),
+        'would be rewritten' if args.dry_run else 'rewritten'))
+    if index is not None:
+        index.close()
+    if errors:
+        sys.exit(1)
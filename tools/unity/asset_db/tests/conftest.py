@@ -0,0 +1,261 @@
+import os
+import sys
+import contextlib
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asset_db
+from asset_db import UnityAssetDB, UnityFileSystemResponder, \
+    UnityJobExecutor
+
+
+PREFAB_GUID = '0d000000000000000000000000000001'
+SCENE_GUID = '0e000000000000000000000000000001'
+MATERIAL_GUID = '0c000000000000000000000000000001'
+SCRIPT_GUID = '0bcdef00000000000000000000000001'
+TEXTURE_GUID = '00cdef00000000000000000000000002'
+
+# A small unity project: {relative path: file contents}
+PROJECT_FILES = {
+    'Materials.meta': """\
+fileFormatVersion: 2
+guid: 0a000000000000000000000000000004
+""",
+    'Prefabs.meta': """\
+fileFormatVersion: 2
+guid: 0a000000000000000000000000000001
+folderAsset: yes
+DefaultImporter:
+  externalObjects: {}
+""",
+    'Scenes.meta': """\
+fileFormatVersion: 2
+guid: 0a000000000000000000000000000002
+folderAsset: yes
+""",
+    'Scripts.meta': """\
+fileFormatVersion: 2
+guid: 0a000000000000000000000000000005
+""",
+    'Textures.meta': """\
+fileFormatVersion: 2
+guid: 0a000000000000000000000000000003
+""",
+    'Materials/mat.mat': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!21 &2100000
+Material:
+  serializedVersion: 6
+  m_ObjectHideFlags: 0
+  m_Name: mat
+  m_Shader: {fileID: 46, guid: 0000000000000000f000000000000000, type: 0}
+  m_ShaderKeywords:
+  m_SavedProperties:
+    serializedVersion: 3
+    m_TexEnvs:
+    - _MainTex:
+        m_Texture: {fileID: 2800000, guid: 00cdef00000000000000000000000002, type: 3}
+        m_Scale: {x: 1, y: 1}
+        m_Offset: {x: 0, y: 0}
+    - _BumpMap:
+        m_Texture: {fileID: 2800000, guid: 00cdef00000000000000000000000099, type: 3}
+        m_Scale: {x: 1, y: 1}
+    m_Floats:
+    - _Glossiness: 0.5
+    - _Cutoff: -1.5e-3
+    m_Colors:
+    - _Color: {r: 1, g: 1, b: 1, a: 1}
+""",
+    'Materials/mat.mat.meta': """\
+fileFormatVersion: 2
+guid: 0c000000000000000000000000000001
+NativeFormatImporter:
+  mainObjectFileID: 2100000
+""",
+    'Prefabs/thing.prefab': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!1 &1000011
+GameObject:
+  m_ObjectHideFlags: 0
+  serializedVersion: 6
+  m_Component:
+  - component: {fileID: 4000011}
+  - component: {fileID: 11400000}
+  - component: {fileID: 23000011}
+  m_Layer: 0
+  m_Name: 'thing ''quoted'''
+  m_TagString: Untagged
+  m_IsActive: 1
+--- !u!4 &4000011
+Transform:
+  m_GameObject: {fileID: 1000011}
+  m_LocalRotation: {x: 0, y: 0, z: 0, w: 1}
+  m_LocalPosition: {x: 0, y: 0, z: 0}
+  m_Children: []
+  m_Father: {fileID: 0}
+--- !u!114 &11400000
+MonoBehaviour:
+  m_GameObject: {fileID: 1000011}
+  m_Script: {fileID: 11500000, guid: 0bcdef00000000000000000000000001, type: 3}
+  m_Name: "hello world"
+  m_Text: this is a long line
+    that wraps onto a continuation line
+  m_Missing: {fileID: 11500000, guid: deadbeef000000000000000000000000, type: 3}
+  m_MissingObj: {fileID: 42, guid: 0c000000000000000000000000000001, type: 2}
+  m_Targets:
+  - {fileID: 4000011}
+  - {fileID: 999}
+--- !u!23 &23000011
+MeshRenderer:
+  m_GameObject: {fileID: 1000011}
+  m_Materials:
+  - {fileID: 2100000, guid: 0c000000000000000000000000000001, type: 2}
+  m_Curve:
+    - time: 0
+      value: 1
+    - time: 1
+      value: 0
+  m_Weights:
+  - 1
+  - 2.5
+  - -3
+  m_Empty:
+  m_Nested:
+    a:
+      b: 1
+""",
+    'Prefabs/thing.prefab.meta': """\
+fileFormatVersion: 2
+guid: 0d000000000000000000000000000001
+""",
+    'Scenes/main.unity': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!29 &1
+OcclusionCullingSettings:
+  m_ObjectHideFlags: 0
+  serializedVersion: 2
+--- !u!1001 &700000
+PrefabInstance:
+  m_ObjectHideFlags: 0
+  serializedVersion: 2
+  m_Modification:
+    m_TransformParent: {fileID: 0}
+    m_Modifications:
+    - target: {fileID: 4000011, guid: 0d000000000000000000000000000001, type: 3}
+      propertyPath: m_LocalPosition.x
+      value: 5
+      objectReference: {fileID: 0}
+    - target: {fileID: 1000011, guid: 0d000000000000000000000000000001, type: 3}
+      propertyPath: m_Name
+      value: renamed
+      objectReference: {fileID: 0}
+    m_RemovedComponents: []
+  m_SourcePrefab: {fileID: 100100000, guid: 0d000000000000000000000000000001, type: 3}
+--- !u!4 &-8679921383154817045 stripped
+Transform:
+  m_CorrespondingSourceObject: {fileID: 4000011, guid: 0d000000000000000000000000000001, type: 3}
+  m_PrefabInstance: {fileID: 700000}
+  m_PrefabAsset: {fileID: 0}
+--- !u!1 &500
+GameObject:
+  m_Component:
+  - component: {fileID: 501}
+  m_Name: cam
+--- !u!20 &501
+Camera:
+  m_GameObject: {fileID: 500}
+  m_Target: {fileID: -8679921383154817045}
+  m_Mat: {fileID: 2100000, guid: 0c000000000000000000000000000001, type: 2}
+""",
+    'Scenes/main.unity.meta': """\
+fileFormatVersion: 2
+guid: 0e000000000000000000000000000001
+""",
+    'Scripts/Foo.cs': "class Foo {}\n",
+    'Scripts/Foo.cs.meta': """\
+fileFormatVersion: 2
+guid: 0bcdef00000000000000000000000001
+MonoImporter:
+  serializedVersion: 2
+""",
+    'Textures/tex.png': "PNG",
+    'Textures/tex.png.meta': """\
+fileFormatVersion: 2
+guid: 00cdef00000000000000000000000002
+TextureImporter:
+  mipmaps:
+    mipMapMode: 0
+  platformSettings:
+  - serializedVersion: 3
+    buildTarget: DefaultTexturePlatform
+""",
+}
+
+
+def iter_objects(db):
+    for asset in db.assets_by_path.values():
+        if asset.loadable:
+            for object_id, obj in asset.objects.items():
+                yield asset, object_id, obj
+
+
+def normalize(value):
+    """ Replaces UnityFileRefs (which compare by identity) with uuids """
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in dict.items(value)}
+    if isinstance(value, list):
+        return [normalize(v) for v in list.__iter__(value)]
+    if isinstance(value, tuple):
+        return tuple(map(normalize, value))
+    if type(value) == asset_db.UnityFileRef:
+        return ('ref',) + value.uuid
+    return value
+
+
+def write_project(root_dir, files):
+    for path, content in files.items():
+        path = os.path.join(root_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(content, bytes):
+            with open(path, 'wb') as f:
+                f.write(content)
+            continue
+        with open(path, 'w', newline='\n') as f:
+            f.write(content)
+    return root_dir
+
+
+@pytest.fixture
+def project(tmp_path):
+    """ Path to the Assets dir of a freshly written copy of PROJECT_FILES """
+    return write_project(str(tmp_path / 'Assets'), PROJECT_FILES)
+
+
+@pytest.fixture
+def make_db(project):
+    """ Returns a function that scans the project into a new UnityAssetDB
+    (serially, without a persistent index) """
+    def make_db(root_dir=project, **kwargs):
+        kwargs.setdefault('executor', UnityJobExecutor('serial'))
+        db = UnityAssetDB(root_dir, **kwargs)
+        with contextlib.redirect_stdout(sys.stderr):
+            UnityFileSystemResponder(db).scan_all()
+        return db
+    return make_db
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    """ Counts calls to read_unity_yaml_object (ie. objects parsed) """
+    count = [0]
+    read_object = asset_db.read_unity_yaml_object
+
+    def counted(*args, **kwargs):
+        count[0] += 1
+        return read_object(*args, **kwargs)
+    monkeypatch.setattr(asset_db, 'read_unity_yaml_object', counted)
+    return count
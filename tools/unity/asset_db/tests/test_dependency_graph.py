@@ -0,0 +1,100 @@
+import os
+import pytest
+from conftest import write_project
+
+GUIDS = {
+    'a': '0f000000000000000000000000000a01',
+    'b': '0f000000000000000000000000000a02',
+    'c': '0f000000000000000000000000000a03',
+    'd': '0f000000000000000000000000000a04',
+    'e': '0f000000000000000000000000000a05',
+    'tex': '00cdef00000000000000000000000a06',
+}
+
+
+def asset_file(name, *deps):
+    """ A ScriptableObject referencing deps (+ itself, which doesn't count
+    as a dependency) """
+    return "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n" \
+        "--- !u!114 &11400000\nMonoBehaviour:\n  m_Name: {}\n" \
+        "  m_Self: {{fileID: 11400000}}\n".format(name) + "".join(
+            "  m_{0}: {{fileID: 11400000, guid: {1}, type: 2}}\n".format(
+                dep, GUIDS[dep])
+            for dep in deps)
+
+
+def meta(name):
+    return "fileFormatVersion: 2\nguid: {}\n".format(GUIDS[name])
+
+
+# a -> b -> c -> a (a cycle), c -> tex; d -> a; e is on its own
+CYCLE_FILES = {
+    'a.asset': asset_file('a', 'b'),
+    'b.asset': asset_file('b', 'c'),
+    'c.asset': asset_file('c', 'a', 'tex'),
+    'd.asset': asset_file('d', 'a', 'a'),
+    'e.asset': asset_file('e'),
+    'tex.png': "PNG" * 100,
+}
+CYCLE_FILES.update({
+    path + '.meta': meta(path.split('.')[0]) for path in list(CYCLE_FILES)})
+
+
+def names(assets):
+    return [os.path.splitext(os.path.basename(asset.path))[0]
+            for asset in assets]
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_closures_on_a_cycle(make_db, tmp_path, lazy):
+    root = write_project(str(tmp_path / 'Cycle'), CYCLE_FILES)
+    db = make_db(root, lazy=lazy)
+    assets = {name: db.assets_by_path[os.path.join(root, path)]
+              for name, path in (('a', 'a.asset'), ('b', 'b.asset'),
+                                 ('c', 'c.asset'), ('d', 'd.asset'),
+                                 ('e', 'e.asset'), ('tex', 'tex.png'))}
+    graph = db.get_dependency_graph()
+    assert len(graph) == 6
+    assert graph.num_edges == 5
+
+    for name in 'abc':
+        # everything on the cycle reaches the rest of it, but not itself
+        assert names(db.dependencies_of(assets[name])) == \
+            sorted({'a', 'b', 'c', 'tex'} - {name})
+        assert names(db.dependents_of(assets[name])) == \
+            sorted({'a', 'b', 'c', 'd'} - {name})
+    assert names(db.dependencies_of(assets['a'], transitive=False)) == ['b']
+    assert names(db.dependents_of(assets['a'], transitive=False)) == \
+        ['c', 'd']
+    assert names(db.dependencies_of(assets['d'])) == ['a', 'b', 'c', 'tex']
+    assert names(db.dependents_of(assets['d'])) == []
+    assert names(db.dependents_of(assets['tex'])) == ['a', 'b', 'c', 'd']
+    assert names(db.dependencies_of(assets['tex'])) == []
+    assert names(db.dependencies_of(assets['e'])) == \
+        names(db.dependents_of(assets['e'])) == []
+
+    sizes = {name: os.path.getsize(asset.path)
+             for name, asset in assets.items()}
+    cycle_size = sizes['a'] + sizes['b'] + sizes['c'] + sizes['tex']
+    for name in 'abc':
+        assert db.closure_size(assets[name]) == cycle_size
+    assert db.closure_size(assets['d']) == cycle_size + sizes['d']
+    assert db.closure_size(assets['tex']) == sizes['tex']
+    assert db.closure_size(assets['tex'], dependents=True) == \
+        sum(sizes.values()) - sizes['e']
+    assert db.closure_size(assets['d'], dependents=True) == sizes['d']
+    assert db.closure_size(assets['e']) == \
+        db.closure_size(assets['e'], dependents=True) == sizes['e']
+
+
+def test_graph_is_rebuilt_after_changes(make_db, tmp_path):
+    root = write_project(str(tmp_path / 'Cycle'), CYCLE_FILES)
+    db = make_db(root, lazy=True)
+    a = db.assets_by_path[os.path.join(root, 'a.asset')]
+    graph = db.get_dependency_graph()
+    assert db.get_dependency_graph() is graph
+    db.remove_asset(db.assets_by_path[os.path.join(root, 'b.asset')])
+    assert db.get_dependency_graph() is not graph
+    # the cycle is broken
+    assert names(db.dependencies_of(a)) == []
+    assert names(db.dependents_of(a)) == ['c', 'd']
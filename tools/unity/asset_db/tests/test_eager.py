@@ -0,0 +1,86 @@
+import os
+import sys
+import contextlib
+import asset_db
+from asset_db import UnityJobExecutor
+from conftest import iter_objects, normalize
+
+
+def object_properties(db):
+    return {
+        (asset.path, object_id): (obj.type, normalize(obj.properties))
+        for asset, object_id, obj in iter_objects(db)
+    }
+
+
+def test_eager_load_parses_in_workers(make_db, parse_count):
+    with UnityJobExecutor('process', max_workers=2,
+                          serial_threshold=0) as executor:
+        db = make_db(executor=executor)
+    # forked workers have their own counter
+    assert parse_count[0] == 0
+    for asset, _, _ in iter_objects(db):
+        assert asset.objects.is_fully_parsed
+        assert asset.objects.content is None
+
+
+def test_eager_load_matches_lazy_load(make_db):
+    eager_db = make_db()
+    lazy_db = make_db(lazy=True)
+    assert object_properties(eager_db) == object_properties(lazy_db)
+    for asset, object_id, obj in iter_objects(eager_db):
+        for ref in obj.get_references():
+            assert ref.ref.asset is asset
+            assert ref.ref.guid is not None or ref.ref.empty
+
+
+def test_eager_refs_resolve(make_db):
+    eager_db = make_db()
+    lazy_db = make_db(lazy=True)
+
+    def missing(db):
+        resolved = db.resolve_refs(db.get_all_refs(refs_only=False))
+        return sorted(
+            (ref.asset.path, ref.object_id, ref.name)
+            for kind in (asset_db.REF_MISSING_ASSET, asset_db.REF_MISSING_OBJECT)
+            for ref in resolved[kind])
+    assert missing(eager_db) == missing(lazy_db)
+    assert len(missing(eager_db)) == 4
+
+
+def is_plain(value):
+    if isinstance(value, (list, tuple)):
+        return all(map(is_plain, value))
+    if isinstance(value, dict):
+        return not value
+    return value is None or type(value) in (str, int, float, bool)
+
+
+def test_workers_return_plain_tables(project):
+    path = project + '/Prefabs/thing.prefab'
+    for lazy_scalars in (False, True):
+        error, result = asset_db.parse_unity_yaml_objects(
+            path, lazy_scalars=lazy_scalars, numeric_arrays='array')
+        assert error is None
+        assert is_plain(result)
+
+
+def test_eager_add_asset_reads_file_once(project, monkeypatch):
+    reads = []
+    load = asset_db.UnityFile.load
+
+    def counted(self, *args, **kwargs):
+        reads.append(self.path)
+        return load(self, *args, **kwargs)
+    db = asset_db.UnityAssetDB(project)
+    path = os.path.join(project, 'Prefabs/thing.prefab')
+    with contextlib.redirect_stdout(sys.stderr):
+        asset_db.UnityFileSystemResponder(db).add_file(path)
+    monkeypatch.setattr(asset_db.UnityFile, 'load', counted)
+    prefab = db.assets_by_path[path]
+    assert prefab.find_object_by_id(4000011) is not None
+    assert reads == [path]
+    # the ref table came from the same read
+    assert (4000011, 'm_GameObject', 1000011, None, None) in \
+        prefab.get_ref_table()
+    assert reads == [path]
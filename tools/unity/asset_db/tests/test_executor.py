@@ -0,0 +1,114 @@
+import os
+import time
+import pytest
+from asset_db import UnityJobExecutor
+
+
+def square(x):
+    return x * x
+
+
+def pid_of(_):
+    return os.getpid()
+
+
+def sleep_then_return(job):
+    delay, value = job
+    time.sleep(delay)
+    return value
+
+
+def fail(x):
+    raise ValueError(x)
+
+
+@pytest.mark.parametrize('backend', UnityJobExecutor.BACKENDS)
+def test_backends_run_every_job(backend):
+    with UnityJobExecutor(backend, max_workers=2,
+                          serial_threshold=0) as executor:
+        assert sorted(executor.imap_unordered(square, range(50))) == \
+            [x * x for x in range(50)]
+        # generators work too, and the pool is reused between calls
+        assert sorted(executor.imap_unordered(
+            square, (x for x in range(10)), max_chunksize=3)) == \
+            [x * x for x in range(10)]
+    assert executor.pool is None
+
+
+def test_unknown_backend():
+    with pytest.raises(Exception):
+        UnityJobExecutor('fibers')
+
+
+def test_process_backend_runs_in_workers():
+    with UnityJobExecutor('process', max_workers=2,
+                          serial_threshold=0) as executor:
+        pids = set(executor.imap_unordered(pid_of, range(8)))
+    assert os.getpid() not in pids
+
+
+def test_small_batches_run_serially():
+    executor = UnityJobExecutor('process', serial_threshold=4)
+    assert set(executor.imap_unordered(pid_of, range(3))) == {os.getpid()}
+    assert executor.pool is None
+    executor.close()
+
+
+def test_chunksize():
+    executor = UnityJobExecutor('thread', max_workers=2)
+    # ~4 chunks per worker
+    assert executor.get_chunksize(80) == 10
+    assert executor.get_chunksize(81) == 11
+    assert executor.get_chunksize(80, max_chunksize=4) == 4
+    assert executor.get_chunksize(0) == 1
+    assert executor.get_chunksize(3) == 1
+    assert UnityJobExecutor('thread', chunksize=7).get_chunksize(
+        1000, max_chunksize=4) == 7
+
+
+def test_results_stream_as_they_finish():
+    jobs = [(0.5, 'slow')] + [(0, i) for i in range(4)]
+    with UnityJobExecutor('thread', max_workers=2, chunksize=1,
+                          serial_threshold=0) as executor:
+        start = time.perf_counter()
+        results = executor.imap_unordered(sleep_then_return, jobs)
+        first = next(results)
+        assert time.perf_counter() - start < 0.4
+        assert first != 'slow'
+        assert list(results)[-1] == 'slow'
+
+
+def test_serial_backend_streams_lazily():
+    calls = []
+
+    def record(x):
+        calls.append(x)
+        return x
+    results = UnityJobExecutor('serial').imap_unordered(record, range(5))
+    assert next(results) == 0
+    assert calls == [0]
+    assert list(results) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('backend', ('thread', 'process'))
+def test_close_and_reopen(backend):
+    executor = UnityJobExecutor(backend, max_workers=2, serial_threshold=0)
+    assert sorted(executor.imap_unordered(square, range(4))) == [0, 1, 4, 9]
+    pool = executor.pool
+    assert pool is not None
+    executor.close()
+    assert executor.pool is None
+    executor.close()  # no-op
+    with pytest.raises(ValueError):
+        pool.imap_unordered(square, range(4))
+    # a new pool is started on demand
+    assert sorted(executor.imap_unordered(square, range(4))) == [0, 1, 4, 9]
+    executor.close()
+
+
+def test_errors_terminate_the_pool():
+    with pytest.raises(ValueError):
+        with UnityJobExecutor('process', max_workers=2,
+                              serial_threshold=0) as executor:
+            list(executor.imap_unordered(fail, range(4)))
+    assert executor.pool is None
@@ -0,0 +1,201 @@
+import os
+import json
+import zlib
+import pickle
+import pytest
+import asset_db
+from asset_db import UnityAssetIndex, JOB_LOAD_METAFILE, \
+    JOB_LOAD_YAML_OBJECTS, JOB_PARSE_YAML_OBJECTS
+from conftest import PREFAB_GUID, iter_objects, normalize
+
+
+def ref_tables(db):
+    return {
+        path: sorted(asset.get_ref_table())
+        for path, asset in db.assets_by_path.items()
+        if asset.loadable
+    }
+
+
+def reused(db, kind):
+    return db.stats.counters.get('reused ' + kind, 0)
+
+
+def object_properties(db):
+    return {
+        (asset.path, object_id): (obj.type, normalize(obj.properties))
+        for asset, object_id, obj in iter_objects(db)
+    }
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_index_round_trip(make_db, tmp_path, lazy):
+    index_path = str(tmp_path / 'Library' / 'index.sqlite')
+    index = UnityAssetIndex(index_path)
+    first = make_db(lazy=lazy, index=index)
+    index.close()
+    assert reused(first, JOB_LOAD_YAML_OBJECTS) == 0
+
+    index = UnityAssetIndex(index_path)
+    second = make_db(lazy=lazy, index=index)
+    index.close()
+    assert reused(second, JOB_LOAD_METAFILE) == 10
+    assert reused(second, JOB_LOAD_YAML_OBJECTS) == 3
+    assert ref_tables(second) == ref_tables(first)
+    assert second.referrers == first.referrers
+    assert second.count_objects_by_type() == first.count_objects_by_type()
+    assert sorted(second.assets_by_guid) == sorted(first.assets_by_guid)
+    if not lazy:
+        assert object_properties(second) == object_properties(first)
+
+
+def test_eager_index_skips_parsing(make_db, tmp_path, parse_count):
+    index = UnityAssetIndex(str(tmp_path / 'index.sqlite'))
+    make_db(index=index, numeric_arrays='array')
+    parsed = parse_count[0]
+    assert parsed == 10
+
+    # lazy loads reuse the tables an eager load indexed
+    lazy_db = make_db(lazy=True, index=index)
+    assert reused(lazy_db, JOB_LOAD_YAML_OBJECTS) == 3
+    assert parse_count[0] == parsed
+
+    db = make_db(index=index, numeric_arrays='array')
+    assert reused(db, JOB_LOAD_YAML_OBJECTS) == 3
+    assert parse_count[0] == parsed
+    for asset, _, _ in iter_objects(db):
+        assert asset.objects.is_fully_parsed
+        for ref in asset.get_all_refs(refs_only=False):
+            assert ref.ref.asset is asset
+    assert object_properties(db) == \
+        object_properties(make_db(numeric_arrays='array'))
+
+    # tables parsed with other options get reparsed
+    db = make_db(index=index, lazy_scalars=True)
+    assert reused(db, JOB_LOAD_YAML_OBJECTS) == 0
+    index.close()
+
+
+class Exploit:
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('unpickled')",))
+
+
+def test_bad_index_entries_are_misses(make_db, tmp_path):
+    index_path = str(tmp_path / 'index.sqlite')
+    index = UnityAssetIndex(index_path)
+    expected = object_properties(make_db(index=index))
+    bad_entries = [
+        zlib.compress(pickle.dumps(Exploit())),
+        b'not compressed',
+        zlib.compress(b'{"not": "a list"}'),
+        zlib.compress(b'[[], []]'),
+        zlib.compress(b'[true, false, [[], [], [], [], [], [], []]]'),
+    ]
+    for data in bad_entries:
+        index.connection.execute('UPDATE entries SET data = ?', (data,))
+        index.commit()
+        db = make_db(index=index)
+        assert reused(db, JOB_LOAD_METAFILE) == 0
+        assert reused(db, JOB_LOAD_YAML_OBJECTS) == 0
+        assert object_properties(db) == expected
+    index.close()
+
+
+def test_malformed_property_columns_are_rejected(project):
+    error, (index, _, columns) = asset_db.parse_unity_yaml_objects(
+        os.path.join(project, 'Prefabs/thing.prefab'), numeric_arrays='array')
+    assert error is None
+    object_ids = [row[0] for row in index]
+    columns = json.loads(json.dumps(columns))
+    validate = asset_db.validate_unity_property_columns
+    assert validate(columns, object_ids) == columns
+
+    def broken(mutate):
+        copy = json.loads(json.dumps(columns))
+        mutate(*copy)
+        return copy
+    ref_row = columns[5][0][0]
+    bad_columns = [
+        columns[:6],
+        broken(lambda parents, *_: parents.__setitem__(0, 5)),
+        broken(lambda parents, keys, *_: (
+            parents.append(-1), keys.append(keys[0]))),
+        broken(lambda parents, keys, paths, *_: paths.__setitem__(0, 9999)),
+        broken(lambda parents, keys, paths, rows, *_: rows.pop()),
+        broken(lambda parents, keys, paths, rows, *_:
+               rows[0].__setitem__(0, 12345)),
+        broken(lambda *columns: columns[5][0].__setitem__(2, 'not hex')),
+        broken(lambda *columns: columns[6][0].__setitem__(1, 'x')),
+        broken(lambda *columns: columns[6][0].__setitem__(2, [1, 2])),
+        broken(lambda *columns: columns[4].__setitem__(ref_row, 'x')),
+        broken(lambda *columns: columns[4].__setitem__(
+            columns[4].index('hello world'), None)),
+        broken(lambda *columns: columns[4].__setitem__(0, {'a': 1})),
+    ]
+    for bad in bad_columns:
+        with pytest.raises(ValueError):
+            validate(bad, object_ids)
+    with pytest.raises(ValueError):
+        validate(columns, object_ids[1:])
+
+
+def test_index_invalidated_by_changes(make_db, project, tmp_path):
+    index_path = str(tmp_path / 'index.sqlite')
+    index = UnityAssetIndex(index_path)
+    make_db(lazy=True, index=index)
+    index.close()
+
+    path = os.path.join(project, 'Prefabs/thing.prefab')
+    with open(path, 'a') as f:
+        f.write("--- !u!4 &4000012\nTransform:\n"
+                "  m_GameObject: {fileID: 1000011}\n")
+    with open(path + '.meta', 'w') as f:
+        f.write("fileFormatVersion: 2\n"
+                "guid: 0d000000000000000000000000000002\n")
+    # make sure the change is visible even with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    os.utime(path + '.meta', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    index = UnityAssetIndex(index_path)
+    db = make_db(lazy=True, index=index)
+    index.close()
+    assert reused(db, JOB_LOAD_METAFILE) == 9
+    assert reused(db, JOB_LOAD_YAML_OBJECTS) == 2
+    prefab = db.assets_by_path[path]
+    assert prefab.guid == '0d000000000000000000000000000002'
+    assert db.find_asset_by_guid(PREFAB_GUID) is None
+    assert prefab.has_object(4000012)
+    assert (4000012, 'm_GameObject', 1000011, None, None) in \
+        prefab.get_ref_table()
+
+
+def test_index_version_change_drops_entries(make_db, tmp_path, monkeypatch):
+    index_path = str(tmp_path / 'index.sqlite')
+    index = UnityAssetIndex(index_path)
+    make_db(lazy=True, index=index)
+    index.close()
+
+    monkeypatch.setattr(asset_db, 'UNITY_ASSET_PARSER_VERSION',
+                        asset_db.UNITY_ASSET_PARSER_VERSION + 1)
+    index = UnityAssetIndex(index_path)
+    assert index.load_entries(JOB_LOAD_METAFILE) == {}
+    db = make_db(lazy=True, index=index)
+    index.close()
+    assert reused(db, JOB_LOAD_METAFILE) == 0
+    assert reused(db, JOB_LOAD_YAML_OBJECTS) == 0
+
+
+def test_index_prunes_removed_assets(make_db, project, tmp_path):
+    index_path = str(tmp_path / 'index.sqlite')
+    index = UnityAssetIndex(index_path)
+    make_db(lazy=True, index=index)
+    path = os.path.join(project, 'Materials/mat.mat')
+    assert path in index.load_entries(JOB_LOAD_YAML_OBJECTS)
+    os.remove(path)
+    os.remove(path + '.meta')
+    make_db(lazy=True, index=index)
+    assert path not in index.load_entries(JOB_LOAD_YAML_OBJECTS)
+    assert path not in index.load_entries(JOB_LOAD_METAFILE)
+    index.close()
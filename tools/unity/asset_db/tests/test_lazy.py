@@ -0,0 +1,58 @@
+import os
+import sys
+import contextlib
+import asset_db
+from conftest import PREFAB_GUID, MATERIAL_GUID
+
+
+def test_lazy_add_parses_nothing(make_db, parse_count):
+    db = make_db(lazy=True)
+    assert parse_count[0] == 0
+    # the reverse ref index is built from ref tables, not parsed objects
+    assert db.referrers
+    assert parse_count[0] == 0
+
+
+def test_lazy_add_asset_lookup_parses_nothing(project, parse_count):
+    # an asset added (and loaded) on demand, outside of load_all, has no ref
+    # table from a worker yet
+    db = asset_db.UnityAssetDB(project, lazy=True)
+    path = os.path.join(project, 'Prefabs/thing.prefab')
+    with contextlib.redirect_stdout(sys.stderr):
+        asset_db.UnityFileSystemResponder(db).add_file(path)
+    prefab = db.assets_by_path[path]
+    assert prefab.has_object(11400000)
+    assert parse_count[0] == 0
+    assert prefab.find_object_by_id(4000011) is not None
+    assert parse_count[0] == 1
+
+
+def test_lazy_lookup_parses_one_object(make_db, project, parse_count):
+    db = make_db(lazy=True)
+    prefab = db.assets_by_path[os.path.join(project, 'Prefabs/thing.prefab')]
+    assert prefab.has_object(11400000)
+    assert not prefab.has_object(12345)
+    assert parse_count[0] == 0
+
+    obj = prefab.find_object_by_id(11400000)
+    assert obj.ref.id == 11400000
+    assert parse_count[0] == 1
+    assert len(prefab.objects.parsed) == 1
+
+
+def test_lazy_update_parses_nothing(make_db, project, parse_count):
+    db = make_db(lazy=True)
+    material = db.assets_by_guid[asset_db.canonical_guid(MATERIAL_GUID)]
+    db.update_asset(material)
+    assert parse_count[0] == 0
+    prefab_path = os.path.join(project, 'Prefabs/thing.prefab')
+    referrers = db.referrers[asset_db.canonical_guid(MATERIAL_GUID)]
+    assert (prefab_path, 23000011, 'm_Materials[0]') in referrers[2100000]
+    assert parse_count[0] == 0
+
+
+def test_referrers_match_parsed_refs(make_db):
+    lazy_db = make_db(lazy=True)
+    eager_db = make_db()
+    assert lazy_db.referrers == eager_db.referrers
+    assert asset_db.canonical_guid(PREFAB_GUID) in eager_db.referrers
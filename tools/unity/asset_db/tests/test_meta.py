@@ -0,0 +1,105 @@
+import pytest
+from asset_db import UnityMetaFile, UNITY_META_HEADER_SIZE
+
+GUID = '0d000000000000000000000000000001'
+
+IMPORTER = """\
+TextureImporter:
+  externalObjects: {}
+  mipmaps:
+    mipMapMode: 0
+  spriteSheet:
+    sprites: []
+"""
+
+
+def write(tmp_path, content, name='asset.png.meta'):
+    path = tmp_path / name
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_header_fast_path(tmp_path):
+    padding = '  userData: {}\n' * 100
+    path = write(tmp_path, "fileFormatVersion: 2\nguid: {}\n{}{}".format(
+        GUID, IMPORTER, padding))
+    meta = UnityMetaFile(path).load()
+    assert meta.error is None
+    assert meta.guid == GUID
+    assert meta.header_only
+    assert meta.data == {'fileFormatVersion': '2', 'guid': GUID}
+    assert meta.bytes_read == UNITY_META_HEADER_SIZE
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_header_line_endings(tmp_path, newline):
+    path = write(tmp_path, "fileFormatVersion: 2{0}guid: {1}{0}".format(
+        newline, GUID))
+    meta = UnityMetaFile(path).load()
+    assert (meta.error, meta.guid, meta.header_only) == (None, GUID, True)
+
+
+@pytest.mark.parametrize('content', [
+    # guid past the header
+    "fileFormatVersion: 2\n" + "# padding\n" * 60 + "guid: {}\n",
+    # quoted, or otherwise not a plain top-level field
+    "fileFormatVersion: 2\nguid: '{}'\n",
+    "{{fileFormatVersion: 2, guid: {}}}\n",
+    # guid split across the end of the header
+    "fileFormatVersion: 2\n" + "#" * (UNITY_META_HEADER_SIZE - 30) +
+    "\nguid: {}\n",
+])
+def test_fallback_to_full_parse(tmp_path, content):
+    path = write(tmp_path, content.format(GUID))
+    meta = UnityMetaFile(path).load()
+    assert meta.error is None
+    assert meta.guid == GUID
+    assert not meta.header_only
+    assert meta.data['guid'] == GUID
+
+
+def test_no_guid(tmp_path):
+    # a nested guid field isn't this file's guid
+    path = write(tmp_path, "fileFormatVersion: 2\nImporter:\n  guid: {}\n"
+                 .format(GUID))
+    meta = UnityMetaFile(path).load()
+    assert meta.error is not None
+    assert meta.guid is None
+    assert meta.importer_settings is None
+
+
+def test_unreadable_files_set_error(tmp_path):
+    meta = UnityMetaFile(str(tmp_path / 'missing.meta')).load()
+    assert isinstance(meta.error, IOError)
+    assert meta.guid is None
+
+    path = write(tmp_path, b"fileFormatVersion: 2\nguid: \xff\xfe\n")
+    meta = UnityMetaFile(path).load()
+    assert isinstance(meta.error, UnicodeDecodeError)
+    assert meta.guid is None
+    assert isinstance(UnityMetaFile(path).load_header().error,
+                      UnicodeDecodeError)
+
+
+def test_importer_settings(tmp_path):
+    path = write(tmp_path, "fileFormatVersion: 2\nguid: {}\n{}".format(
+        GUID, IMPORTER))
+    meta = UnityMetaFile(path).load()
+    assert meta.header_only
+    assert meta.importer_settings == {
+        'TextureImporter': {
+            'externalObjects': {},
+            'mipmaps': {'mipMapMode': '0'},
+            'spriteSheet': {'sprites': []},
+        },
+    }
+    # the full parse replaces the header
+    assert not meta.header_only
+    assert meta.guid == GUID
+    assert meta.data['fileFormatVersion'] == '2'
+
+    path = write(tmp_path, "fileFormatVersion: 2\nguid: {}\n".format(GUID),
+                 name='empty.meta')
+    assert UnityMetaFile(path).importer_settings == {}
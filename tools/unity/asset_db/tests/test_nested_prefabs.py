@@ -0,0 +1,137 @@
+import os
+from asset_db import canonical_guid, nested_prefab_file_id, \
+    UNITY_PREFAB_ASSET_OBJECT_ID
+from conftest import PREFAB_GUID, write_project
+
+OUTER_GUID = '0d000000000000000000000000000002'
+OUTER_INSTANCE_ID = 800000
+SCENE_INSTANCE_ID = 900000
+
+# outer.prefab instances thing.prefab (minus its MeshRenderer), and
+# nested.unity instances outer.prefab
+NESTED_FILES = {
+    'Prefabs/outer.prefab': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!1 &100
+GameObject:
+  m_Name: outer
+--- !u!1001 &{instance}
+PrefabInstance:
+  m_Modification:
+    m_TransformParent: {{fileID: 0}}
+    m_Modifications:
+    - target: {{fileID: 1000011, guid: {guid}, type: 3}}
+      propertyPath: m_Name
+      value: inner
+      objectReference: {{fileID: 0}}
+    - target: {{fileID: 4000011, guid: {guid}, type: 3}}
+      propertyPath: m_LocalPosition.x
+      value: 1
+      objectReference: {{fileID: 0}}
+    m_RemovedComponents:
+    - {{fileID: 23000011, guid: {guid}, type: 3}}
+  m_SourcePrefab: {{fileID: 100100000, guid: {guid}, type: 3}}
+""".format(instance=OUTER_INSTANCE_ID, guid=PREFAB_GUID),
+    'Prefabs/outer.prefab.meta': """\
+fileFormatVersion: 2
+guid: {}
+""".format(OUTER_GUID),
+    'Scenes/nested.unity': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!1001 &{instance}
+PrefabInstance:
+  m_Modification:
+    m_TransformParent: {{fileID: 0}}
+    m_Modifications:
+    - target: {{fileID: {transform}, guid: {guid}, type: 3}}
+      propertyPath: m_LocalPosition.x
+      value: 2
+      objectReference: {{fileID: 0}}
+    - target: {{fileID: 100, guid: {guid}, type: 3}}
+      propertyPath: m_Name
+      value: outer renamed
+      objectReference: {{fileID: 0}}
+    m_RemovedComponents: []
+  m_SourcePrefab: {{fileID: 100100000, guid: {guid}, type: 3}}
+""".format(instance=SCENE_INSTANCE_ID, guid=OUTER_GUID,
+           transform=nested_prefab_file_id(OUTER_INSTANCE_ID, 4000011)),
+    'Scenes/nested.unity.meta': """\
+fileFormatVersion: 2
+guid: 0e000000000000000000000000000002
+""",
+}
+
+
+def nested_id(*ids):
+    """ The id of the innermost source object ids[-1], as seen through the
+    prefab instances ids[:-1] (outermost first) """
+    object_id = ids[-1]
+    for instance_id in reversed(ids[:-1]):
+        object_id = nested_prefab_file_id(instance_id, object_id)
+    return object_id
+
+
+def load(make_db, project):
+    write_project(project, NESTED_FILES)
+    db = make_db(lazy=True)
+    return (db, db.assets_by_path[os.path.join(project, 'Prefabs/outer.prefab')],
+            db.assets_by_path[os.path.join(project, 'Scenes/nested.unity')])
+
+
+def test_nested_prefab_virtual_ids(make_db, project):
+    db, outer, scene = load(make_db, project)
+    for object_id in (1000011, 4000011, 11400000):
+        assert outer.has_object(nested_id(OUTER_INSTANCE_ID, object_id))
+        assert scene.has_object(
+            nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, object_id))
+    assert scene.has_object(nested_id(SCENE_INSTANCE_ID, 100))
+    assert scene.has_object(nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID))
+    # removed components aren't instanced, at any depth
+    assert not outer.has_object(nested_id(OUTER_INSTANCE_ID, 23000011))
+    assert not scene.has_object(
+        nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, 23000011))
+    # nor is the prefab asset object
+    assert outer.has_object(UNITY_PREFAB_ASSET_OBJECT_ID)
+    assert not scene.has_object(UNITY_PREFAB_ASSET_OBJECT_ID)
+    assert not scene.has_object(
+        nested_id(SCENE_INSTANCE_ID, UNITY_PREFAB_ASSET_OBJECT_ID))
+    assert db.get_prefab_expansion(scene).source_guids == {
+        canonical_guid(OUTER_GUID), canonical_guid(PREFAB_GUID)}
+
+
+def test_nested_prefab_resolve_object(make_db, project):
+    db, outer, scene = load(make_db, project)
+    transform_id = nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, 4000011)
+    transform = db.resolve_object(scene, transform_id)
+    assert transform.type.name == 'Transform'
+    assert transform.source.ref.id == 4000011
+    # inner modifications first; outer ones win
+    assert transform.modifications == (
+        ('m_LocalPosition.x', 1), ('m_LocalPosition.x', 2))
+    assert transform.get('m_LocalPosition.x') == 2
+    assert dict(transform.iter_flat_properties())['m_LocalPosition.x'] == 2
+
+    game_object = scene.find_object_by_id(
+        nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, 1000011))
+    assert game_object.get('m_Name') == 'inner'
+    assert db.resolve_object(
+        scene, nested_id(SCENE_INSTANCE_ID, 100)).get('m_Name') == \
+        'outer renamed'
+    assert db.resolve_object(
+        outer, nested_id(OUTER_INSTANCE_ID, 4000011)).get(
+            'm_LocalPosition.x') == 1
+    assert db.resolve_object(
+        scene, nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, 23000011)) \
+        is None
+
+
+def test_nested_prefab_expansion_follows_source_changes(make_db, project):
+    db, outer, scene = load(make_db, project)
+    transform_id = nested_id(SCENE_INSTANCE_ID, OUTER_INSTANCE_ID, 4000011)
+    assert scene.has_object(transform_id)
+    thing = db.find_asset_by_guid(PREFAB_GUID)
+    db.remove_asset(thing)
+    assert not scene.has_object(transform_id)
+    assert scene.has_object(nested_id(SCENE_INSTANCE_ID, 100))
@@ -0,0 +1,60 @@
+import os
+import json
+import zlib
+import pickle
+from asset_db import UnityParseCache, index_unity_yaml_tables
+from conftest import PROJECT_FILES
+
+
+SCENE = PROJECT_FILES['Scenes/main.unity']
+
+
+def write_entry(cache, content, data):
+    path = cache.get_path(cache.make_key(content))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_round_trip(tmp_path):
+    cache = UnityParseCache(str(tmp_path))
+    result = index_unity_yaml_tables(SCENE, cache)
+    assert result == index_unity_yaml_tables(SCENE)
+    assert cache.get(cache.make_key(SCENE), len(SCENE)) == result
+    assert index_unity_yaml_tables(SCENE, cache) == result
+
+
+class Exploit:
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('unpickled')",))
+
+
+def test_pickled_entry_is_a_miss(tmp_path):
+    cache = UnityParseCache(str(tmp_path))
+    write_entry(cache, SCENE, zlib.compress(pickle.dumps(Exploit())))
+    assert cache.get(cache.make_key(SCENE)) is None
+    assert index_unity_yaml_tables(SCENE, cache) == \
+        index_unity_yaml_tables(SCENE)
+
+
+def test_malformed_entries_are_misses(tmp_path):
+    cache = UnityParseCache(str(tmp_path))
+    index, ref_table = index_unity_yaml_tables(SCENE)
+    key = cache.make_key(SCENE)
+    bad_entries = [
+        b'not compressed',
+        zlib.compress(b'\xff\xfe'),
+        zlib.compress(b'{"not": "a list"}'),
+        zlib.compress(b'[' * 100000),
+        zlib.compress(json.dumps([[[1, 2, 3]], []]).encode()),
+        zlib.compress(json.dumps(
+            [[[1, 29, 'Foo', 0, 10, 'no']], []]).encode()),
+        zlib.compress(json.dumps([index, [[1, 2, 3, 4, 5]]]).encode()),
+        # offsets past the end of the content
+        zlib.compress(json.dumps(
+            [[[1, 29, 'Foo', 0, len(SCENE) + 1, False]], []]).encode()),
+    ]
+    for data in bad_entries:
+        write_entry(cache, SCENE, data)
+        assert cache.get(key, len(SCENE)) is None, data
+        assert index_unity_yaml_tables(SCENE, cache) == (index, ref_table)
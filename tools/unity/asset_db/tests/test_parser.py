@@ -0,0 +1,127 @@
+import pytest
+import asset_db
+from asset_db import find_unity_yaml_document_spans, parse_unity_yaml_document, \
+    read_unity_yaml_objects, scan_unity_yaml_refs, UnityYamlFastPathError
+from conftest import PROJECT_FILES, normalize
+
+
+YAML_FILES = [
+    content for content in PROJECT_FILES.values()
+    if content.startswith('%YAML')
+]
+
+# documents in (and just outside of) the subset the fast path handles
+DOCUMENTS = [
+    "Foo:\n  a: 1\n  b: -2.5e-3\n  c:\n  d: ''\n",
+    "Foo:\n  m_Name: 'it''s'\n  m_Text: \"plain\"\n",
+    "Foo:\n  list:\n  - 1\n  - 2\n  nested:\n    - a: 1\n      b: 2\n    - a: 3\n",
+    "Foo:\n  empty: []\n  map: {}\n  ref: {fileID: 0}\n",
+    "Foo:\n  ref: {fileID: 11500000, guid: 0bcdef00000000000000000000000001, type: 3}\n",
+    "Foo:\n  ref: {fileID: 4, guid: 0bcdef00000000000000000000000001,\n    type: 3}\n",
+    "Foo:\n  refs:\n  - {fileID: 1}\n  - {fileID: -2}\n  - component: {fileID: 3}\n",
+    "Foo:\n  m_Text: a long line\n    that wraps\n",
+    "Foo:\n  m_Text: \"escaped \\\" \\n quote\"\n",
+    "Foo:\n  m_Text: \"wrapped\n    double quoted\"\n",
+    "Foo:\n  a: 1 # comment\n",
+    "Foo:\n  a: &anchor 1\n  b: *anchor\n",
+    "Foo:\n  a: |\n    literal\n    block\n",
+    "Foo:\n  flow: [1, 2, 3]\n",
+    "Foo:\n  key with spaces: value:with colon\n",
+    "Foo:\n  '0': zero\n  -1: minus one\n",
+    "Foo:\n  a: tab\tin a scalar\n  b:\t1\n  c: b]]\n  d: a[b]c}\n",
+    "Foo:\n  ref: {fileID: 1, guid: }\n  m_Color: {r: -1, g: 0.5}\n",
+]
+
+# documents that pyYAML rejects: the fast path has to fall back, so that
+# they're reported as errors
+MALFORMED_DOCUMENTS = [
+    "Foo:\n  ref: {a:}\n",
+    "Foo:\n  ref: {fileID: 1, guid:}\n",
+    "Foo:\n  ref: {a: -:}\n",
+    "Foo:\n  ref: {a: - b}\n",
+    "Foo:\n  ref: {a: ?-}\n",
+    "Foo:\n\ta: 1\n",
+    "Foo:\n  a: 1\n\t\n",
+    "Foo:\n  list:\n  - \t1\n",
+    "Foo:\n  list:\n  -\t1\n",
+    "Foo:\n  a: ?\t1\n",
+    "Foo:\n  a: ]\n",
+    "Foo:\n  a: ]b\n",
+    "Foo:\n  ref: {a: b]}\n",
+    "Foo:\n  list: []]\n",
+]
+
+
+def documents(content):
+    for _, object_id, start, end, _ in find_unity_yaml_document_spans(content):
+        yield object_id, start, end
+
+
+@pytest.mark.parametrize('content', YAML_FILES)
+def test_fast_path_matches_reference_parser(content):
+    assert read_unity_yaml_objects(content) == \
+        read_unity_yaml_objects(content, fast=False)
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_fast_path_matches_reference_document(document):
+    expected = asset_db.read_yaml(document)
+    assert expected[0] is None
+    assert asset_db.read_unity_yaml_document(
+        document, 0, len(document)) == expected
+    try:
+        result = parse_unity_yaml_document(document)
+    except UnityYamlFastPathError:
+        return
+    assert result == expected[1]
+
+
+@pytest.mark.parametrize('document', MALFORMED_DOCUMENTS)
+def test_fast_path_rejects_malformed_documents(document):
+    assert asset_db.read_yaml(document)[0] is not None
+    with pytest.raises(UnityYamlFastPathError):
+        parse_unity_yaml_document(document)
+    error, _ = asset_db.read_unity_yaml_object(document, 0, len(document))
+    assert error is not None
+
+
+def test_fast_path_handles_unity_documents():
+    # everything in the fixture (bar the wrapped scalar) takes the fast path
+    fallbacks = 0
+    for content in YAML_FILES:
+        for _, start, end in documents(content):
+            try:
+                parse_unity_yaml_document(content, start, end)
+            except UnityYamlFastPathError:
+                fallbacks += 1
+    assert fallbacks == 1
+
+
+def parsed_refs(content):
+    error, objects = read_unity_yaml_objects(content, fast=False)
+    assert error is None
+    return sorted(
+        (int(object_id),) + ref
+        for object_id, obj in objects.items()
+        for ref in asset_db._find_raw_yaml_refs(obj['data']))
+
+
+@pytest.mark.parametrize('content', YAML_FILES + [
+    '%YAML 1.1\n--- !u!1 &1\n' + document for document in DOCUMENTS])
+def test_refs_only_scan_matches_full_parse(content):
+    assert sorted(scan_unity_yaml_refs(content)) == parsed_refs(content)
+    assert sorted(scan_unity_yaml_refs(content, fast=False)) == \
+        parsed_refs(content)
+
+
+def test_refs_only_db_matches_full_parse(make_db):
+    def refs(db):
+        return sorted(
+            (ref.asset.path, ref.object_id, ref.name, normalize(ref.ref))
+            for ref in db.get_all_refs())
+    refs_only_db = make_db(lazy=True, refs_only=True)
+    assert refs(refs_only_db) == refs(make_db())
+    assert not any(
+        asset.objects.parsed
+        for asset in refs_only_db.assets_by_path.values()
+        if asset.loadable)
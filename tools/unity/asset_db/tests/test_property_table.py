@@ -0,0 +1,121 @@
+import os
+import array
+import pytest
+import asset_db
+from asset_db import list_flat_properties, read_unity_yaml_object
+from conftest import iter_objects, normalize
+
+
+def raw_properties(asset, object_id):
+    content = asset.objects.load_content()
+    _, start, end, _ = asset.objects.spans[object_id]
+    error, (_, data) = read_unity_yaml_object(content, start, end)
+    assert error is None
+    return asset.parse_properties(data)
+
+
+@pytest.mark.parametrize('lazy_scalars', [False, True])
+@pytest.mark.parametrize('numeric_arrays', [None, 'array'])
+def test_properties_round_trip(make_db, lazy_scalars, numeric_arrays):
+    db = make_db(lazy_scalars=lazy_scalars, numeric_arrays=numeric_arrays)
+    count = 0
+    for asset, object_id, obj in iter_objects(db):
+        expected = raw_properties(asset, object_id)
+        properties = obj.properties
+        assert normalize(properties) == normalize(expected)
+        assert type(properties) == type(expected)
+        assert normalize(list(obj.iter_flat_properties())) == \
+            normalize(list(list_flat_properties(expected)))
+        count += 1
+    assert count == 10
+
+
+def flat_properties(db):
+    return {
+        (asset.path, object_id): normalize(list(obj.iter_flat_properties()))
+        for asset, object_id, obj in iter_objects(db)
+    }
+
+
+def test_numeric_arrays_keep_element_names(make_db, project):
+    db = make_db(numeric_arrays='array')
+    assert flat_properties(db) == flat_properties(make_db())
+    prefab = db.assets_by_path[os.path.join(project, 'Prefabs/thing.prefab')]
+    renderer = prefab.find_object_by_id(23000011)
+    assert isinstance(renderer.properties['m_Weights'], array.array)
+    assert renderer.flat_properties['m_Weights[1]'] == 2.5
+    assert 'm_Weights' not in renderer.flat_properties
+    # the table stores (and selects) the array as one row
+    assert list(prefab.objects.properties.select('m_Weights')) == [
+        (23000011, renderer.properties['m_Weights'])]
+
+
+def test_property_parser_is_shared(make_db):
+    make_db(lazy_scalars=True, numeric_arrays='array')
+    parser = asset_db.get_unity_property_parser(
+        lazy_scalars=True, numeric_arrays='array')
+    assert asset_db.get_unity_property_parser(True, 'array') is parser
+    assert asset_db.get_unity_property_parser() is not parser
+    assert asset_db.UNITY_PROPERTY_PARSERS[(True, 'array')] is parser
+
+
+@pytest.mark.parametrize('lazy_scalars', [False, True])
+def test_columns_round_trip(make_db, lazy_scalars):
+    db = make_db(lazy_scalars=lazy_scalars, numeric_arrays='array')
+    for asset in db.assets_by_path.values():
+        if not asset.loadable:
+            continue
+        table = asset.objects.properties
+        copy = asset_db.UnityPropertyTable.from_columns(
+            table.to_columns(), lambda ref_id, ref_guid: (ref_id, ref_guid),
+            lazy_scalars=lazy_scalars, numeric_arrays='array')
+        assert copy.paths == table.paths
+        assert copy.path_index == table.path_index
+        assert copy.path_column == table.path_column
+        assert copy.object_column == table.object_column
+        assert copy.object_rows == table.object_rows
+        for value, copied in zip(table.values, copy.values):
+            if type(value) == asset_db.UnityFileRef:
+                guid = '{:032x}'.format(value.guid) \
+                    if value.guid is not None else None
+                assert copied == (value.id, guid)
+            else:
+                assert copied == value and type(copied) == type(value)
+
+
+def test_empty_containers_round_trip(make_db, project):
+    db = make_db()
+    prefab = db.assets_by_path[os.path.join(project, 'Prefabs/thing.prefab')]
+    transform = prefab.find_object_by_id(4000011)
+    assert transform.properties['m_Children'] == []
+    assert 'm_Children' not in transform.flat_properties
+    renderer = prefab.find_object_by_id(23000011)
+    assert renderer.properties['m_Nested'] == {'a': {'b': 1}}
+    assert renderer.properties['m_Curve'][1] == {'time': 1, 'value': 0}
+
+
+def test_objects_share_the_table(make_db):
+    db = make_db()
+    for asset, object_id, obj in iter_objects(db):
+        assert not hasattr(obj, '__dict__')
+        table, start, end = obj.rows
+        assert table is asset.objects.properties
+        assert table.object_rows[object_id] == (start, end)
+
+
+def test_select(make_db, project):
+    db = make_db()
+    prefab = db.assets_by_path[os.path.join(project, 'Prefabs/thing.prefab')]
+    table = prefab.objects.properties
+    assert sorted((object_id, ref.id) for object_id, ref
+                  in table.select('m_GameObject')) == [
+        (4000011, 1000011), (11400000, 1000011), (23000011, 1000011)]
+    assert list(table.select('m_Name')) == [
+        (1000011, "thing 'quoted'"), (11400000, 'hello world')]
+    assert list(table.select('m_Nope')) == []
+    for path in table.paths:
+        assert list(table.select(path)) == [
+            (table.object_column[i], table.values[i])
+            for i in range(len(table))
+            if table.paths[table.path_column[i]] == path
+        ]
@@ -0,0 +1,139 @@
+import io
+import os
+import csv
+import json
+import pytest
+from asset_db import UnityMissingRefReport
+from conftest import write_project
+
+A_GUID = '0f000000000000000000000000000b01'
+B_GUID = '0f000000000000000000000000000b02'
+X_GUID = '0f000000000000000000000000000bf1'  # missing
+Y_GUID = '0f000000000000000000000000000bf2'  # missing
+
+
+def asset_file(*refs):
+    return "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n" \
+        "--- !u!114 &11400000\nMonoBehaviour:\n  m_Name: x\n" + "".join(
+            "  {}: {{fileID: {}, guid: {}, type: 2}}\n".format(*ref)
+            for ref in refs)
+
+
+def meta(guid):
+    return "fileFormatVersion: 2\nguid: {}\n".format(guid)
+
+
+REPORT_FILES = {
+    'a.asset': asset_file(
+        ('m_X1', 11400000, X_GUID), ('m_X2', 11400000, X_GUID),
+        ('m_Y', 11400000, Y_GUID), ('m_B', 11400000, B_GUID),
+        ('m_BadB', 99, B_GUID)),
+    'a.asset.meta': meta(A_GUID),
+    'b.asset': asset_file(('m_X', 5, X_GUID), ('m_BadA', 7, A_GUID)),
+    'b.asset.meta': meta(B_GUID),
+    'c.asset': asset_file(('m_A', 11400000, A_GUID)),
+    'c.asset.meta': meta('0f000000000000000000000000000b03'),
+}
+
+
+def ref_record(kind, path, name, guid, file_id):
+    return {
+        'record': kind, 'asset': path, 'object_id': 11400000,
+        'object_type': 'MonoBehaviour', 'property': name, 'guid': guid,
+        'file_id': file_id,
+    }
+
+
+@pytest.fixture
+def report_db(make_db, tmp_path):
+    root = write_project(str(tmp_path / 'Report'), REPORT_FILES)
+    return make_db(root, lazy=True), os.path.join(root, 'a.asset'), \
+        os.path.join(root, 'b.asset')
+
+
+def expected_records(a, b):
+    return [
+        ref_record('missing_asset', a, 'm_X1', X_GUID, 11400000),
+        ref_record('missing_asset', a, 'm_X2', X_GUID, 11400000),
+        ref_record('missing_asset', a, 'm_Y', Y_GUID, 11400000),
+        ref_record('missing_object', a, 'm_BadB', B_GUID, 99),
+        ref_record('missing_asset', b, 'm_X', X_GUID, 5),
+        ref_record('missing_object', b, 'm_BadA', A_GUID, 7),
+    ]
+
+
+TOTALS = {
+    'record': 'total', 'missing_assets': 4, 'missing_objects': 2,
+    'refs': 6, 'assets': 2, 'guids': 2,
+}
+
+
+def expected_summary(a, b):
+    return [
+        {'record': 'asset', 'asset': a, 'missing_assets': 3,
+         'missing_objects': 1},
+        {'record': 'asset', 'asset': b, 'missing_assets': 1,
+         'missing_objects': 1},
+        {'record': 'guid', 'guid': X_GUID, 'refs': 3, 'assets': 2},
+        {'record': 'guid', 'guid': Y_GUID, 'refs': 1, 'assets': 1},
+        TOTALS,
+    ]
+
+
+def sort_key(record):
+    return sorted((key, str(value)) for key, value in record.items())
+
+
+def test_jsonl_report(report_db):
+    db, a, b = report_db
+    out = io.StringIO()
+    totals = db.write_missing_ref_report(UnityMissingRefReport(out))
+    assert totals == TOTALS
+    assert len(db.get_all_missing_refs()) == totals['refs']
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    summary = [record for record in records
+               if not record['record'].startswith('missing_')]
+    refs = records[:len(records) - len(summary)]
+    # refs are streamed first, then the summary
+    assert sorted(refs, key=sort_key) == \
+        sorted(expected_records(a, b), key=sort_key)
+    assert sorted(summary, key=sort_key) == \
+        sorted(expected_summary(a, b), key=sort_key)
+    assert summary[-1] == TOTALS
+
+
+def test_csv_report(report_db):
+    db, a, b = report_db
+    out = io.StringIO()
+    db.write_missing_ref_report(UnityMissingRefReport(out, format='csv'))
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert list(rows[0]) == list(UnityMissingRefReport.CSV_FIELDS)
+    # csv has every field in every row, as strings
+    expected = [
+        {field: str(record.get(field, ''))
+         for field in UnityMissingRefReport.CSV_FIELDS}
+        for record in expected_records(a, b) + expected_summary(a, b)
+    ]
+    assert sorted(rows, key=sort_key) == sorted(expected, key=sort_key)
+
+
+def test_summary_only(report_db):
+    db, a, b = report_db
+    out = io.StringIO()
+    totals = db.write_missing_ref_report(
+        UnityMissingRefReport(out, summary_only=True))
+    assert totals == TOTALS
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(records, key=sort_key) == \
+        sorted(expected_summary(a, b), key=sort_key)
+
+
+def test_totals_without_output(report_db):
+    db, _, _ = report_db
+    assert db.write_missing_ref_report(UnityMissingRefReport()) == TOTALS
+
+
+def test_unknown_format():
+    with pytest.raises(Exception):
+        UnityMissingRefReport(io.StringIO(), format='xml')
@@ -0,0 +1,151 @@
+import pytest
+from asset_db import UnityAssetResidency
+from conftest import iter_objects, normalize
+
+
+class FakeObjects:
+    def __init__(self):
+        self.evicted = 0
+
+    def evict(self):
+        self.evicted += 1
+
+
+class FakeAsset:
+    def __init__(self, path):
+        self.path = path
+        self.objects = FakeObjects()
+
+
+def test_lru_eviction():
+    residency = UnityAssetResidency(budget=100)
+    a, b, c = (FakeAsset(path) for path in 'abc')
+    residency.update(a, 40)
+    residency.update(b, 40)
+    residency.hit(a)  # b is now the least recently used
+    residency.update(c, 40)
+    assert list(residency.sizes) == ['a', 'c']
+    assert residency.total_size == 80
+    assert (a.objects.evicted, b.objects.evicted) == (0, 1)
+    assert residency.evictions == 1
+
+    # the asset being updated is never evicted, even if over budget alone
+    residency.update(b, 150)
+    assert list(residency.sizes) == ['b']
+    assert residency.total_size == 150
+    assert (a.objects.evicted, c.objects.evicted) == (1, 1)
+    assert residency.evictions == 3
+
+    # size 0 (ie. evicted / unloaded) drops the asset
+    residency.update(b, 0)
+    assert residency.total_size == 0
+    assert not residency.sizes and not residency.assets
+
+
+def test_unlimited_budget_never_evicts():
+    residency = UnityAssetResidency()
+    assets = [FakeAsset(str(i)) for i in range(10)]
+    for asset in assets:
+        residency.update(asset, 10 ** 9)
+    assert residency.total_size == 10 ** 10
+    assert residency.evictions == 0
+    residency.remove('3')
+    assert residency.total_size == 9 * 10 ** 9
+    residency.evict()
+    assert residency.total_size == 0
+    assert residency.evictions == 9
+    assert all(asset.objects.evicted == (asset.path != '3')
+               for asset in assets)
+
+
+def resident_sizes(db):
+    return {
+        path: asset.objects.resident_size
+        for path, asset in db.assets_by_path.items()
+        if asset.loadable and asset.objects is not None and
+        asset.objects.resident_size
+    }
+
+
+def parse_everything(db):
+    return {
+        (asset.path, object_id): normalize(obj.properties)
+        for asset, object_id, obj in iter_objects(db)
+    }
+
+
+def test_budget_accounting(make_db):
+    unlimited = make_db(lazy=True)
+    expected = parse_everything(unlimited)
+    sizes = resident_sizes(unlimited)
+    assert len(sizes) == 3
+    assert unlimited.residency.total_size == sum(sizes.values())
+    assert unlimited.residency.evictions == 0
+
+    budget = max(sizes.values())
+    db = make_db(lazy=True, memory_budget=budget)
+    for (path, object_id) in expected:
+        db.assets_by_path[path].objects[object_id]
+        # the residency's view matches the assets' own
+        assert db.residency.total_size == sum(resident_sizes(db).values())
+        assert dict(db.residency.sizes) == resident_sizes(db)
+        assert db.residency.total_size <= budget
+    assert db.residency.evictions > 0
+
+
+def test_reparse_after_eviction(make_db, parse_count):
+    db = make_db(lazy=True, memory_budget=1)
+    expected = parse_everything(make_db(lazy=True))
+    parse_count[0] = 0
+    # every asset evicts the previous one, and is reparsed on the next pass
+    for _ in range(2):
+        assert parse_everything(db) == expected
+    assert parse_count[0] == 2 * len(expected)
+    # evicted assets keep their index, type index and ref table
+    for path, asset in db.assets_by_path.items():
+        if asset.loadable:
+            assert sorted(asset.objects) == sorted(
+                object_id for p, object_id in expected if p == path)
+            assert asset.get_ref_table() is not None
+    assert db.count_objects_by_type() == \
+        make_db(lazy=True).count_objects_by_type()
+
+
+def test_counters(make_db):
+    db = make_db(lazy=True, memory_budget=1)
+    scene = next(asset for path, asset in db.assets_by_path.items()
+                 if path.endswith('.unity'))
+    other = next(asset for path, asset in db.assets_by_path.items()
+                 if path.endswith('.mat'))
+    object_id = next(iter(scene.objects))
+    residency = db.residency
+    hits, misses, evictions = \
+        residency.hits, residency.misses, residency.evictions
+
+    scene.objects[object_id]
+    scene.objects[object_id]
+    assert (residency.hits - hits, residency.misses - misses) == (1, 1)
+    other.objects[next(iter(other.objects))]
+    assert residency.evictions - evictions == 1
+    scene.objects[object_id]
+    assert (residency.hits - hits, residency.misses - misses) == (1, 3)
+    assert residency.evictions - evictions == 2
+    assert db.stats.to_json()['residency'] == {
+        'budget': 1,
+        'resident_assets': 1,
+        'resident_size': scene.objects.resident_size,
+        'hits': residency.hits,
+        'misses': residency.misses,
+        'evictions': residency.evictions,
+    }
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_removed_assets_release_memory(make_db, lazy):
+    db = make_db(lazy=lazy)
+    parse_everything(db)
+    assert db.residency.total_size > 0
+    for asset in list(db.assets_by_path.values()):
+        db.remove_asset(asset)
+    assert db.residency.total_size == 0
+    assert not db.residency.sizes
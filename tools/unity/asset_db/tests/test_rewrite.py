@@ -0,0 +1,102 @@
+import os
+import sys
+import subprocess
+import asset_db
+from conftest import write_project
+from test_unreferenced import YAML_ASSET_FILES
+
+ICON_GUID = '00cdef00000000000000000000000010'
+NEW_ICON_GUID = '00cdef00000000000000000000000012'
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read(project, path):
+    with open(os.path.join(project, path), 'r') as f:
+        return f.read()
+
+
+def test_rewrite_refs_in_yaml_assets(make_db, project):
+    write_project(project, YAML_ASSET_FILES)
+    db = make_db(lazy=True, refs_only=True)
+    changed, errors = db.rewrite_refs({(ICON_GUID, None): (NEW_ICON_GUID, None)})
+    assert errors == {}
+    assert sorted(changed) == [os.path.join(project, 'Resources/config.asset')]
+    assert ('icon: {fileID: 2800000, guid: ' + NEW_ICON_GUID) in \
+        read(project, 'Resources/config.asset')
+    # reloaded + reindexed
+    assert not list(db.iter_referrer_keys(int(ICON_GUID, 16), None))
+    assert list(db.iter_referrer_keys(int(NEW_ICON_GUID, 16), None))
+
+
+def test_prefilter_only_covers_yaml_assets(project):
+    write_project(project, YAML_ASSET_FILES)
+    output = subprocess.check_output([
+        sys.executable, os.path.join(SCRIPT_DIR, 'rewrite_unity_refs.py'),
+        project, '--prefilter-only', '--dry-run', '--executor', 'serial',
+        '--map', '{}={}'.format(ICON_GUID, NEW_ICON_GUID),
+    ], cwd=SCRIPT_DIR, universal_newlines=True)
+    assert output.splitlines() == [
+        'Resources/config.asset:7: '
+        '{fileID: 2800000, guid: 00cdef00000000000000000000000010, type: 3}'
+        ' => {fileID: 2800000, guid: 00cdef00000000000000000000000012, type: 3}',
+        '1 ref(s) in 1 file(s) would be rewritten',
+    ]
+    assert ICON_GUID in read(project, 'Resources/config.asset')
+
+
+OLD_GUID = '0c000000000000000000000000000001'
+NEW_GUID = '0c000000000000000000000000000002'
+OTHER_GUID = '0c000000000000000000000000000003'
+
+
+def patch(data, rewrites):
+    return asset_db.patch_unity_refs(
+        data, asset_db.make_ref_rewrites(rewrites))
+
+
+def test_patch_wrapped_flow_mappings():
+    data = ('  m_Mat: {fileID: 2100000, guid: ' + OLD_GUID + ',\n'
+            '    type: 2}\n'
+            '  m_Other: {fileID: 2100000,\n'
+            '    guid: ' + OLD_GUID + ', type: 2}\n').encode()
+    patched, patches = patch(data, {(OLD_GUID, None): (NEW_GUID, None)})
+    assert patched == data.replace(OLD_GUID.encode(), NEW_GUID.encode())
+    assert [offset for offset, _, _ in patches] == [
+        data.index(b'{'), data.index(b'{', data.index(b'm_Other'))]
+    for offset, old, new in patches:
+        assert data[offset:offset + len(old)] == old
+        assert b'\n' in old and new == old.replace(
+            OLD_GUID.encode(), NEW_GUID.encode())
+
+
+def test_patch_file_id_maps():
+    data = ('a: {fileID: 1, guid: ' + OLD_GUID + ', type: 2}\n'
+            'b: {fileID: 2, guid: ' + OLD_GUID + ', type: 2}\n'
+            'c: {fileID: -3, guid: ' + OLD_GUID + '}\n'
+            'd: {fileID: 1}\n'
+            'e: {fileID: 1, guid: ' + OTHER_GUID + ', type: 2}\n').encode()
+    # fileID-only maps: retarget one object, keep the guid
+    patched, patches = patch(data, {
+        (OLD_GUID, 1): (OLD_GUID, 10),
+        (OLD_GUID, '-3'): (NEW_GUID, 30),
+    })
+    assert patched.decode().splitlines() == [
+        'a: {fileID: 10, guid: ' + OLD_GUID + ', type: 2}',
+        'b: {fileID: 2, guid: ' + OLD_GUID + ', type: 2}',
+        'c: {fileID: 30, guid: ' + NEW_GUID + '}',
+        'd: {fileID: 1}',
+        'e: {fileID: 1, guid: ' + OTHER_GUID + ', type: 2}',
+    ]
+    assert len(patches) == 2
+    # exact (guid, fileID) matches win over (guid, any fileID)
+    patched, patches = patch(data, {
+        (OLD_GUID, None): (NEW_GUID, None),
+        (OLD_GUID, 2): (OTHER_GUID, 20),
+    })
+    assert patched.decode().splitlines()[:3] == [
+        'a: {fileID: 1, guid: ' + NEW_GUID + ', type: 2}',
+        'b: {fileID: 20, guid: ' + OTHER_GUID + ', type: 2}',
+        'c: {fileID: -3, guid: ' + NEW_GUID + '}',
+    ]
+    # no-op rewrites change nothing
+    assert patch(data, {(OLD_GUID, 1): (OLD_GUID, None)}) == (data, [])
@@ -0,0 +1,106 @@
+import os
+import asset_db
+from asset_db import scan_unity_project, UnityAssetPrefab, UnityAssetScene, \
+    UnityAssetMaterial, UnityAssetCSharpScript, UnityAssetSceneGraph, \
+    UnityDirectoryAsset
+from conftest import write_project
+
+
+def scan(root_dir, **kwargs):
+    batch, skipped = scan_unity_project(root_dir, **kwargs)
+    return {
+        os.path.relpath(path, root_dir): (asset_type, file_stat, meta_stat)
+        for path, asset_type, file_stat, meta_stat in batch
+    }, sorted(os.path.relpath(path, root_dir) for path in skipped)
+
+
+def test_pairs_assets_with_metas(project):
+    assets, skipped = scan(project)
+    assert skipped == []
+    assert {path: asset_type for path, (asset_type, _, _) in assets.items()} == {
+        'Materials': UnityDirectoryAsset,
+        'Prefabs': UnityDirectoryAsset,
+        'Scenes': UnityDirectoryAsset,
+        'Scripts': UnityDirectoryAsset,
+        'Textures': UnityDirectoryAsset,
+        'Materials/mat.mat': UnityAssetMaterial,
+        'Prefabs/thing.prefab': UnityAssetPrefab,
+        'Scenes/main.unity': UnityAssetScene,
+        'Scripts/Foo.cs': UnityAssetCSharpScript,
+        'Textures/tex.png': asset_db.UnityAssetTexture,
+    }
+    for path, (asset_type, file_stat, meta_stat) in assets.items():
+        full_path = os.path.join(project, path)
+        assert meta_stat.st_mtime_ns == os.stat(full_path + '.meta').st_mtime_ns
+        # only scene graph assets (which get loaded) need their own stat
+        if issubclass(asset_type, UnityAssetSceneGraph):
+            assert file_stat.st_size == os.stat(full_path).st_size
+        else:
+            assert file_stat is None
+
+
+def test_orphans_and_ignored_files(project):
+    write_project(project, {
+        # orphaned .meta (the asset was deleted), and an asset with no .meta
+        'Prefabs/gone.prefab.meta': "fileFormatVersion: 2\nguid: 0d000000000000000000000000000009\n",
+        'Prefabs/new.prefab': "%YAML 1.1\n",
+        # ignored, and unrecognized extensions
+        'Prefabs/.DS_Store': "",
+        'Scenes/main.unity.orig': "",
+        'Textures/notes.xyz': "",
+        'Textures/Sub/deep.mat': "%YAML 1.1\n",
+    })
+    assets, skipped = scan(project)
+    assert skipped == ['Textures/notes.xyz']
+    gone_type, gone_stat, gone_meta_stat = assets['Prefabs/gone.prefab']
+    assert gone_type == UnityAssetPrefab and gone_stat is None
+    assert gone_meta_stat is not None
+    new_type, new_stat, new_meta_stat = assets['Prefabs/new.prefab']
+    assert new_type == UnityAssetPrefab and new_stat is not None
+    assert new_meta_stat is None
+    # a directory with no .meta, and its contents
+    assert assets['Textures/Sub'][0] == UnityDirectoryAsset
+    assert assets['Textures/Sub/deep.mat'][0] == UnityAssetMaterial
+    for path in ('Prefabs/.DS_Store', 'Scenes/main.unity.orig'):
+        assert path not in assets
+
+
+def test_symlinked_dirs_arent_walked(project, tmp_path):
+    outside = write_project(str(tmp_path / 'Outside'), {
+        'other.prefab': "%YAML 1.1\n",
+    })
+    os.symlink(outside, os.path.join(project, 'Linked'))
+    assets, _ = scan(project)
+    assert assets['Linked'][0] == UnityDirectoryAsset
+    assert 'Linked/other.prefab' not in assets
+
+
+def test_unreadable_dirs_are_skipped(project, monkeypatch):
+    blocked = os.path.join(project, 'Scenes')
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if path == blocked:
+            raise PermissionError(13, 'Permission denied', path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', guarded_scandir)
+    for max_workers in (1, 4):
+        assets, skipped = scan(project, max_workers=max_workers)
+        assert skipped == ['Scenes']
+        assert assets['Scenes'][0] == UnityDirectoryAsset
+        assert 'Scenes/main.unity' not in assets
+        assert 'Prefabs/thing.prefab' in assets
+
+
+def test_scan_all_survives_unreadable_dirs(make_db, project, monkeypatch):
+    blocked = os.path.join(project, 'Textures')
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if path == blocked:
+            raise PermissionError(13, 'Permission denied', path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', guarded_scandir)
+    db = make_db()
+    assert os.path.join(project, 'Textures/tex.png') not in db.assets_by_path
+    assert os.path.join(project, 'Scenes/main.unity') in db.assets_by_path
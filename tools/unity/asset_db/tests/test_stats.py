@@ -0,0 +1,102 @@
+import os
+import json
+import pytest
+from asset_db import UnityAssetDBStats, UNITY_META_HEADER_SIZE, \
+    JOB_LOAD_METAFILE, JOB_LOAD_YAML_OBJECTS, JOB_PARSE_YAML_OBJECTS
+from conftest import PROJECT_FILES
+
+# a .meta file whose guid is in the header, so only the header is read
+BIG_META = "fileFormatVersion: 2\nguid: 00cdef00000000000000000000000002\n" \
+    "TextureImporter:\n" + "  userData: {}\n" * 100
+
+
+def file_sizes(project, suffix):
+    return {
+        path: os.path.getsize(os.path.join(project, path))
+        for path in PROJECT_FILES if path.endswith(suffix)
+    }
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_phase_and_file_counters(make_db, project, lazy):
+    with open(os.path.join(project, 'Textures/tex.png.meta'), 'w') as f:
+        f.write(BIG_META)
+    db = make_db(lazy=lazy)
+    stats = db.stats
+    assert {'walk', 'meta', 'parse'} <= set(stats.phases)
+    assert all(seconds >= 0 for seconds in stats.phases.values())
+
+    meta_sizes = file_sizes(project, '.meta')
+    yaml_sizes = {
+        path: size for path, size in file_sizes(project, '').items()
+        if path.endswith(('.unity', '.prefab', '.mat'))
+    }
+    # .meta jobs only count the header they read
+    meta_bytes = sum(min(size, UNITY_META_HEADER_SIZE)
+                     for size in meta_sizes.values())
+    assert meta_sizes['Textures/tex.png.meta'] > UNITY_META_HEADER_SIZE
+    assert stats.files['count'] == len(meta_sizes) + len(yaml_sizes)
+    assert stats.files['bytes'] == meta_bytes + sum(yaml_sizes.values())
+    assert stats.files['read'] >= 0 and stats.files['parse'] >= 0
+
+    yaml_kind = JOB_LOAD_YAML_OBJECTS if lazy else JOB_PARSE_YAML_OBJECTS
+    loaded = [asset for asset in db.assets_by_path.values()
+              if asset.loadable]
+    assert stats.counters == {
+        JOB_LOAD_METAFILE + ' files': len(meta_sizes),
+        yaml_kind + ' files': len(yaml_sizes),
+        'objects': sum(len(asset.objects) for asset in loaded),
+        'refs': sum(len(asset.get_ref_table()) for asset in loaded),
+        'reused ' + JOB_LOAD_METAFILE: 0,
+        'reused ' + JOB_LOAD_YAML_OBJECTS: 0,
+    }
+
+    slowest = stats.slowest
+    assert len(slowest) == stats.files['count']
+    assert [entry['seconds'] for entry in slowest] == \
+        sorted((entry['seconds'] for entry in slowest), reverse=True)
+    # (jobs are keyed by asset path, .meta jobs included)
+    bytes_by_job = {
+        (os.path.relpath(entry['path'], project), entry['kind']):
+            entry['bytes']
+        for entry in slowest
+    }
+    assert bytes_by_job == dict(
+        [((path[:-5], JOB_LOAD_METAFILE), min(size, UNITY_META_HEADER_SIZE))
+         for path, size in meta_sizes.items()] +
+        [((path, yaml_kind), size) for path, size in yaml_sizes.items()])
+
+
+def test_slowest_keeps_top_n():
+    stats = UnityAssetDBStats(top_n=2)
+    for i, seconds in enumerate([0.3, 0.1, 0.5, 0.2]):
+        stats.add_file('f{}'.format(i), 'meta', seconds, 0.01, 10)
+    assert [entry['path'] for entry in stats.slowest] == ['f2', 'f0']
+    assert stats.slowest[0] == {
+        'path': 'f2', 'kind': 'meta', 'seconds': 0.51, 'read': 0.5,
+        'parse': 0.01, 'bytes': 10}
+    assert stats.files['count'] == 4
+    assert stats.files['bytes'] == 40
+    assert stats.files['read'] == pytest.approx(1.1)
+    assert stats.files['parse'] == pytest.approx(0.04)
+
+
+def test_phases_and_counters_accumulate():
+    stats = UnityAssetDBStats()
+    stats.add_phase('parse', 1.0)
+    stats.add_phase('parse', 0.5)
+    stats.count('objects', 3)
+    stats.count('objects')
+    assert stats.phases == {'parse': 1.5}
+    assert stats.counters == {'objects': 4}
+
+
+def test_dump(make_db, tmp_path):
+    db = make_db(memory_budget=10 ** 6)
+    path = str(tmp_path / 'stats.json')
+    db.stats.dump(path)
+    with open(path) as f:
+        dumped = json.load(f)
+    assert dumped == json.loads(json.dumps(db.stats.to_json()))
+    assert dumped['residency']['budget'] == 10 ** 6
+    assert dumped['counters']['objects'] > 0
@@ -0,0 +1,92 @@
+import os
+import sys
+import contextlib
+import pytest
+from asset_db import UnityFileSystemResponder, UnityType, \
+    index_unity_yaml_objects
+
+
+def type_counts(db):
+    return {
+        unity_type.name: count
+        for unity_type, count in db.count_objects_by_type().items()
+    }
+
+
+def object_keys(db, unity_type):
+    return sorted(
+        (os.path.relpath(asset.path, db.root_dir), object_id)
+        for asset, object_id in db.iter_object_keys_by_type(unity_type))
+
+
+def apply_changes(db, *paths):
+    with contextlib.redirect_stdout(sys.stderr):
+        return UnityFileSystemResponder(db).apply_changes(paths)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_type_index(make_db, lazy):
+    db = make_db(lazy=lazy)
+    assert type_counts(db) == {
+        'GameObject': 2, 'Transform': 1, 'MonoBehaviour': 1,
+        'MeshRenderer': 1, 'Material': 1, 'OcclusionCullingSettings': 1,
+        'PrefabInstance': 1, 'Camera': 1,
+    }
+    # stripped objects are indexed in their source prefabs
+    assert object_keys(db, 'Transform') == [
+        ('Prefabs/thing.prefab', 4000011)]
+    assert object_keys(db, 1) == object_keys(db, 'GameObject') == \
+        object_keys(db, UnityType('GameObject', 1)) == [
+            ('Prefabs/thing.prefab', 1000011), ('Scenes/main.unity', 500)]
+    assert object_keys(db, 'Nope') == object_keys(db, 12345) == []
+    cameras = list(db.find_objects_by_type('Camera'))
+    assert [camera.ref.id for camera in cameras] == [501]
+
+
+def test_type_index_follows_updates(make_db, project):
+    db = make_db(lazy=True)
+    prefab_path = os.path.join(project, 'Prefabs/thing.prefab')
+    with open(prefab_path, 'a') as f:
+        f.write("--- !u!4 &4000012\nTransform:\n"
+                "  m_GameObject: {fileID: 1000011}\n"
+                "--- !u!65 &6500000\nBoxCollider:\n"
+                "  m_GameObject: {fileID: 1000011}\n")
+    apply_changes(db, prefab_path)
+    assert object_keys(db, 'Transform') == [
+        ('Prefabs/thing.prefab', 4000011), ('Prefabs/thing.prefab', 4000012)]
+    assert type_counts(db)['BoxCollider'] == 1
+
+    # rewriting the prefab drops types it no longer has
+    with open(prefab_path, 'w') as f:
+        f.write("%YAML 1.1\n--- !u!1 &1000011\nGameObject:\n  m_Name: x\n")
+    apply_changes(db, prefab_path)
+    counts = type_counts(db)
+    assert counts['GameObject'] == 2
+    for name in ('Transform', 'BoxCollider', 'MonoBehaviour', 'MeshRenderer'):
+        assert name not in counts
+        assert object_keys(db, name) == []
+
+    scene_path = os.path.join(project, 'Scenes/main.unity')
+    os.remove(scene_path)
+    os.remove(scene_path + '.meta')
+    apply_changes(db, scene_path, scene_path + '.meta')
+    assert type_counts(db) == {'GameObject': 1, 'Material': 1}
+    assert scene_path not in db.types_by_path
+    assert all(scene_path not in object_ids_by_path
+               for object_ids_by_path in db.objects_by_type.values())
+
+
+def test_type_names_without_a_key():
+    content = (
+        "%YAML 1.1\n"
+        "--- !u!1 &1\nGameObject:\n  m_Name: a\n"
+        # no key on the first line (but on later ones)
+        "--- !u!4 &2\n- Transform\n  m_Name: b\n"
+        "--- !u!114 &3 stripped\n"
+        "--- !u!21 &4\n  :\n"
+        "--- !u!23 &5\nMeshRenderer")
+    assert [(object_id, object_type, name)
+            for object_id, object_type, name, _, _, _
+            in index_unity_yaml_objects(content)] == [
+        (1, 1, 'GameObject'), (2, 4, '4'), (3, 114, '114'), (4, 21, '21'),
+        (5, 23, '23')]
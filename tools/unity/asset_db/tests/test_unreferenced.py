@@ -0,0 +1,91 @@
+import os
+from conftest import write_project
+
+
+def meta(guid):
+    return "fileFormatVersion: 2\nguid: {}\n".format(guid)
+
+
+# yaml assets other than scenes / prefabs / materials, plus a binary
+# serialized .asset, and a texture that only a ScriptableObject references
+YAML_ASSET_FILES = {
+    'Resources.meta': meta('0a000000000000000000000000000006'),
+    'Data.meta': meta('0a000000000000000000000000000007'),
+    'Anim.meta': meta('0a000000000000000000000000000008'),
+    'Resources/config.asset': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!114 &11400000
+MonoBehaviour:
+  m_Script: {fileID: 11500000, guid: 0bcdef00000000000000000000000001, type: 3}
+  m_Name: config
+  icon: {fileID: 2800000, guid: 00cdef00000000000000000000000010, type: 3}
+  controller: {fileID: 9100000, guid: 0f000000000000000000000000000002, type: 2}
+""",
+    'Resources/config.asset.meta': meta('0f000000000000000000000000000001'),
+    'Anim/player.controller': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!91 &9100000
+AnimatorController:
+  m_Name: player
+  m_AnimatorLayers:
+  - m_Name: Base Layer
+    m_StateMachine: {fileID: 1107000010}
+--- !u!1107 &1107000010
+AnimatorStateMachine:
+  m_Name: Base Layer
+  m_ChildStates:
+  - m_State: {fileID: 1102000010}
+--- !u!1102 &1102000010
+AnimatorState:
+  m_Name: run
+  m_Motion: {fileID: 7400000, guid: 0f000000000000000000000000000003, type: 2}
+""",
+    'Anim/player.controller.meta': meta('0f000000000000000000000000000002'),
+    'Anim/run.anim': """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!74 &7400000
+AnimationClip:
+  m_Name: run
+""",
+    'Anim/run.anim.meta': meta('0f000000000000000000000000000003'),
+    'Textures/icon.png': "PNG",
+    'Textures/icon.png.meta': meta('00cdef00000000000000000000000010'),
+    'Textures/orphan.png': "PNG",
+    'Textures/orphan.png.meta': meta('00cdef00000000000000000000000011'),
+    'Data/baked.asset': b'\x00\x00\x01\x2c\xff\xfe\x00\x11binary',
+    'Data/baked.asset.meta': meta('0f000000000000000000000000000004'),
+}
+
+
+def relative_paths(db, assets):
+    return sorted(
+        os.path.relpath(asset.path, db.root_dir) for asset, _ in assets)
+
+
+def test_refs_from_yaml_assets(make_db, project):
+    write_project(project, YAML_ASSET_FILES)
+    for lazy in (False, True):
+        db = make_db(lazy=lazy, refs_only=lazy)
+        assert relative_paths(db, db.find_unreferenced_assets()) == [
+            'Data/baked.asset', 'Textures/orphan.png']
+        assert relative_paths(db, db.find_unanalyzed_assets()) == [
+            'Data/baked.asset']
+        controller = db.assets_by_path[
+            os.path.join(project, 'Anim/player.controller')]
+        assert controller.has_object(1102000010)
+        assert [ref.name for ref in controller.get_all_refs()] == [
+            'm_AnimatorLayers[0].m_StateMachine', 'm_ChildStates[0].m_State',
+            'm_Motion']
+
+
+def test_unanalyzed_assets_load_in_process(make_db, project):
+    write_project(project, YAML_ASSET_FILES)
+    db = make_db(lazy=True)
+    baked = db.assets_by_path[os.path.join(project, 'Data/baked.asset')]
+    baked.load()
+    assert baked.file.error is not None
+    assert len(baked.objects) == 0
+    assert not baked.has_object(11400000)
@@ -0,0 +1,229 @@
+import os
+import sys
+import shutil
+import contextlib
+import pytest
+import asset_db
+from asset_db import UnityFileSystemResponder, PollingFileWatcher
+from conftest import write_project
+
+NEW_PREFAB = """\
+%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!114 &11400000
+MonoBehaviour:
+  m_Script: {fileID: 11500000, guid: 0bcdef00000000000000000000000001, type: 3}
+  m_Mat: {fileID: 2100000, guid: 0c000000000000000000000000000001, type: 2}
+  m_Thing: {fileID: 4000011, guid: 0d000000000000000000000000000001, type: 3}
+  m_Gone: {fileID: 1, guid: 0f000000000000000000000000000001, type: 3}
+"""
+
+
+def state(db):
+    """ Everything watch mode has to keep up to date: assets (+ guids), the
+    type and referrer indexes, and missing refs """
+    root = db.root_dir
+    db.refresh_missing_refs()
+    return {
+        'assets': {
+            os.path.relpath(path, root): (asset.asset_type, asset.guid)
+            for path, asset in db.assets_by_path.items()
+        },
+        'types': {
+            unity_type.name: sorted(
+                (os.path.relpath(path, root), sorted(ids))
+                for path, ids in ids_by_path.items())
+            for unity_type, ids_by_path in db.objects_by_type.items()
+        },
+        'referrers': {
+            guid: {
+                file_id: sorted(
+                    (os.path.relpath(path, root), object_id, name)
+                    for path, object_id, name in keys)
+                for file_id, keys in by_id.items()
+            }
+            for guid, by_id in db.referrers.items()
+        },
+        'missing_refs': sorted(
+            (os.path.relpath(path, root), ref.object_id, ref.name) +
+            ref.ref.uuid
+            for path, refs in db.missing_refs.items() for ref in refs),
+    }
+
+
+def apply_changes(db, paths):
+    with contextlib.redirect_stdout(sys.stderr):
+        return UnityFileSystemResponder(db).apply_changes(paths)
+
+
+def move(project, src, dst):
+    changed = set()
+    for suffix in ('', '.meta'):
+        src_path = os.path.join(project, src + suffix)
+        dst_path = os.path.join(project, dst + suffix)
+        changed |= {src_path, dst_path}
+        if os.path.isdir(src_path):
+            changed |= {
+                os.path.join(path, name).replace(src_path, dst_path, 1)
+                for path, dirs, files in os.walk(src_path)
+                for name in dirs + files
+            }
+        parent = os.path.dirname(dst_path)
+        while not os.path.exists(parent):
+            changed.add(parent)
+            parent = os.path.dirname(parent)
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        shutil.move(src_path, dst_path)
+    return changed
+
+
+def add(project):
+    write_project(project, {
+        'Prefabs/new.prefab': NEW_PREFAB,
+        'Prefabs/new.prefab.meta':
+            "fileFormatVersion: 2\nguid: 0d000000000000000000000000000002\n",
+    })
+    return {os.path.join(project, 'Prefabs/new.prefab'),
+            os.path.join(project, 'Prefabs/new.prefab.meta')}
+
+
+def delete(project):
+    changed = set()
+    for path in ('Materials/mat.mat', 'Materials/mat.mat.meta'):
+        os.remove(os.path.join(project, path))
+        changed.add(os.path.join(project, path))
+    return changed
+
+
+def move_file(project):
+    return move(project, 'Prefabs/thing.prefab', 'Other/thing.prefab')
+
+
+def move_dir(project):
+    return move(project, 'Prefabs', 'Moved/Prefabs')
+
+
+def change_guid(project):
+    path = os.path.join(project, 'Materials/mat.mat.meta')
+    with open(path, 'w') as f:
+        f.write("fileFormatVersion: 2\n"
+                "guid: 0c000000000000000000000000000009\n")
+    return {path}
+
+
+def edit(project):
+    path = os.path.join(project, 'Scenes/main.unity')
+    with open(path, 'a') as f:
+        f.write("--- !u!108 &502\nLight:\n"
+                "  m_GameObject: {fileID: 500}\n"
+                "  m_Cookie: {fileID: 2800000, guid: 00cdef00000000000000000000000077, type: 3}\n")
+    return {path}
+
+
+CHANGES = [add, delete, move_file, move_dir, change_guid, edit]
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+@pytest.mark.parametrize('change', CHANGES)
+def test_apply_changes_matches_a_fresh_scan(make_db, project, change, lazy):
+    db = make_db(lazy=lazy)
+    before = state(db)
+    changed = change(project)
+    apply_changes(db, changed)
+    after = state(db)
+    assert after == state(make_db(lazy=lazy))
+    assert after != before
+
+
+def test_apply_changes_sequence(make_db, project):
+    db = make_db(lazy=True)
+    state(db)
+    for change in CHANGES:
+        apply_changes(db, change(project))
+    assert state(db) == state(make_db(lazy=True))
+
+
+def test_refresh_keeps_marks_made_while_recomputing(make_db, project,
+                                                    monkeypatch):
+    db = make_db(lazy=True)
+    db.refresh_missing_refs()
+    path = os.path.join(project, 'Scenes/main.unity')
+    db.mark_dirty(path)
+    resolve_refs = db.resolve_refs
+
+    def resolve_and_mark(refs):
+        # ie. an asset loaded (and updated) while resolving
+        db.mark_dirty('reloaded', 42)
+        return resolve_refs(refs)
+    monkeypatch.setattr(db, 'resolve_refs', resolve_and_mark)
+    assert db.refresh_missing_refs() == {path}
+    assert db.dirty_paths == {'reloaded'}
+    assert db.dirty_guids == {42}
+
+
+class StopWatching(Exception):
+    pass
+
+
+def make_watcher(backend, root_dir):
+    if backend == 'poll':
+        return PollingFileWatcher(root_dir, interval=0.05)
+    if not sys.platform.startswith('linux'):
+        pytest.skip("inotify is only available on linux")
+    return asset_db.InotifyFileWatcher(root_dir)
+
+
+REMOVED = {
+    add: [],
+    delete: ['Materials/mat.mat'],
+    move_dir: ['Prefabs', 'Prefabs/thing.prefab'],
+    change_guid: [],
+}
+
+
+@pytest.mark.parametrize('backend', ['poll', 'inotify'])
+@pytest.mark.parametrize('change', list(REMOVED))
+def test_watch(make_db, project, backend, change):
+    db = make_db(lazy=True)
+    state(db)
+    watcher = make_watcher(backend, project)
+    change(project)
+    results = []
+
+    def callback(changes):
+        results.append(changes)
+        raise StopWatching()
+    with pytest.raises(StopWatching), \
+            contextlib.redirect_stdout(sys.stderr):
+        UnityFileSystemResponder(db).watch(
+            watcher, debounce=0.2, callback=callback)
+    assert len(results) == 1
+    assert sorted(
+        os.path.relpath(asset.path, project)
+        for asset in results[0]['removed']) == REMOVED[change]
+    assert state(db) == state(make_db(lazy=True))
+
+
+def test_polling_watcher_reports_changes(project):
+    watcher = PollingFileWatcher(project, interval=0.01)
+    assert watcher.poll(0.05) == set()
+    changed = add(project) | change_guid(project)
+    # (and the dirs they're in)
+    assert watcher.poll(1) >= changed
+    assert watcher.poll(0.05) == set()
+
+
+def test_inotify_watcher_reports_changes(project):
+    watcher = make_watcher('inotify', project)
+    try:
+        assert watcher.poll(0.05) == set()
+        changed = add(project) | change_guid(project)
+        assert watcher.poll(1) >= changed
+        # files in new directories are reported, and the dirs get watched
+        new_dir = os.path.join(project, 'New')
+        os.makedirs(os.path.join(new_dir, 'Sub'))
+        watcher.poll(1)
+        write_project(new_dir, {'Sub/a.mat': "%YAML 1.1\n"})
+        assert os.path.join(new_dir, 'Sub/a.mat') in watcher.poll(1)
+    finally:
+        watcher.close()
@@ -2,8 +2,8 @@
 import os
 import sys
 import yaml
-import multiprocessing as mp
 import re
+from asset_db.asset_db import UnityJobExecutor
 
 
 def get_file_name_and_base_extension(file_name):
@@ -91,23 +91,26 @@ def _load_file(packed_args):
         return file, e, None
 
 
-def bulk_load_files(generator, error_handler, parallel=True, pool=None, *args, **kwargs):
-    if parallel and pool is None:
-        pool = mp.Pool(MP_POOL_THREADS)
-    if parallel:
-        results = pool.map(_load_file, generator(*args, **kwargs))
-    else:
-        results = map(_load_file, generator(*args, **kwargs))
-    if error_handler is not None:
-        for file, error, result in results:
-            if error is not None:
-                error_handler(file, error, result)
-            else:
-                yield result
-    else:
-        for error, result in results:
-            if error is None:
-                yield result
+def bulk_load_files(generator, error_handler, parallel=True, executor=None, *args, **kwargs):
+    owned_executor = executor is None
+    if owned_executor:
+        executor = UnityJobExecutor('process' if parallel else 'serial')
+    try:
+        results = executor.imap_unordered(
+            _load_file, generator(*args, **kwargs))
+        if error_handler is not None:
+            for file, error, result in results:
+                if error is not None:
+                    error_handler(file, error, result)
+                else:
+                    yield result
+        else:
+            for error, result in results:
+                if error is None:
+                    yield result
+    finally:
+        if owned_executor:
+            executor.close()
 
 
 def bulk_load_call(fcn, file, *args, **kwargs):
@@ -239,7 +242,7 @@ def scan_files(base_dir='.', parallel=True):
             generator=generate_file_load_jobs,
             error_handler=handle_file_load_error,
             parallel=parallel,
-            pool=None
+            executor=None
         )
         for file, data in results:
             if file.endswith('.meta'):
@@ -310,9 +313,6 @@ def read_yaml_or_text_file(file_id, path, load_type):
         return file_id, load_type, path, e, None
 
 
-MP_POOL_THREADS = 32
-
-
 def scan_files(base_dir='.'):
     read_file_jobs = []
     file_list = list(list_files())
@@ -326,9 +326,10 @@ def scan_files(base_dir='.'):
             # read asset file (yaml or text)
             read_file_jobs.append((asset_path, asset_path, loader_type))
 
-    # do bulk file reads on N threads
-    pool = mp.Pool(MP_POOL_THREADS)
-    file_data = pool.map(read_yaml_or_text_file, read_file_jobs)
+    # do bulk file reads on N workers
+    with UnityJobExecutor() as executor:
+        file_data = list(executor.imap_unordered(
+            read_yaml_or_text_file, read_file_jobs))
 
     # assign data + check for errors:
     asset_data = {}